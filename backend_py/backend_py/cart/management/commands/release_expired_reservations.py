@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.cart import reservations
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les reservations de stock expirees"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=30.0, help="Pause (s) entre deux passes")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size doit etre positif")
+
+        while True:
+            released = 0
+            while True:
+                count = reservations.release_expired(options["batch_size"])
+                released += count
+                if count < options["batch_size"]:
+                    break
+            self.stdout.write(f"{released} reservations expirees liberees")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -9,3 +9,23 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = ("user", "product")
+
+
+class StockReservation(models.Model):
+    """
+    Reservation temporaire de stock prise au debut du checkout,
+    convertie en decrement a la creation de la commande.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "product")
+        indexes = [
+            # Somme des reservations actives par produit (index-only sous PostgreSQL)
+            models.Index(fields=["product", "expires_at", "quantity"], name="cart_resv_active_idx"),
+            models.Index(fields=["expires_at"], name="cart_resv_expiry_idx"),
+        ]
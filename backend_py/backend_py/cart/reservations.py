@@ -0,0 +1,141 @@
+"""
+Reservations de stock avec expiration.
+
+Au debut du checkout, le panier de l'utilisateur est reserve pour
+STOCK_RESERVATION_TTL secondes. Le stock disponible pour les autres
+utilisateurs est le stock du produit moins la somme (indexee) des
+reservations actives. A la creation de la commande, les reservations de
+l'utilisateur sont supprimees: le stock est alors decremente.
+Les reservations expirees sont ignorees, puis supprimees par lots par
+`release_expired_reservations`.
+
+Pour les produits en mode slotted, dont le stock n'est pas verrouille,
+les unites reservees sont retirees des compteurs (decrement conditionnel)
+et rendues a la liberation ou a l'expiration: la reservation tient sans
+verrou, et la commande de l'acheteur consomme ces unites.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from backend_py.products.models import Product
+from backend_py.products import inventory
+from .models import CartItem, StockReservation
+
+
+class ReservationError(Exception):
+    def __init__(self, errors):
+        super().__init__("Stock insuffisant")
+        self.errors = errors
+
+
+def reserved_quantities(product_ids, exclude_user=None):
+    """Quantites reservees (reservations actives) par produit"""
+    active = StockReservation.objects.filter(product_id__in=product_ids, expires_at__gt=timezone.now())
+    if exclude_user is not None:
+        active = active.exclude(user=exclude_user)
+    return dict(active.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+
+
+def _remove(holds, restock=True):
+    """
+    Supprime des reservations (dans la transaction de l'appelant) et rend aux
+    compteurs les unites mises de cote pour les produits slotted.
+    Retourne {product_id: unites mises de cote}.
+    """
+    rows = list(
+        holds.select_for_update(of=('self',)).values_list('id', 'product_id', 'quantity', 'product__inventory_mode')
+    )
+    StockReservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+    held = defaultdict(int)
+    for _, product_id, quantity, mode in rows:
+        if mode == Product.INVENTORY_SLOTTED:
+            held[product_id] += quantity
+    if restock:
+        for product_id, quantity in held.items():
+            inventory.restock_slotted(product_id, quantity)
+    return held
+
+
+@transaction.atomic
+def hold_cart(user):
+    """
+    Reserve le contenu du panier. Tout ou rien: leve ReservationError
+    si un produit n'a pas assez de stock disponible.
+    """
+    items = {item.product_id: item.quantity for item in CartItem.objects.filter(user=user)}
+    # Verrouiller les produits row dans l'ordre des ids, comme a la creation de commande
+    products = Product.objects.in_bulk(sorted(items))
+    products.update(
+        (product.id, product)
+        for product in Product.objects.select_for_update().filter(
+            id__in=sorted(items), inventory_mode=Product.INVENTORY_ROW
+        ).order_by('id')
+    )
+    reserved = reserved_quantities(items.keys(), exclude_user=user)
+    # Unites deja mises de cote par l'acheteur (expirees comprises tant qu'elles ne sont pas rendues)
+    held = dict(
+        StockReservation.objects.select_for_update().filter(user=user).values_list('product_id', 'quantity')
+    )
+
+    errors = []
+    for product_id, quantity in sorted(items.items()):
+        product = products[product_id]
+        if product.inventory_mode == Product.INVENTORY_SLOTTED:
+            extra = quantity - held.get(product_id, 0)
+            try:
+                if extra > 0:
+                    inventory.decrement_slotted(product_id, extra)
+                elif extra < 0:
+                    inventory.restock_slotted(product_id, -extra)
+            except inventory.InsufficientStock as exc:
+                errors.append({"product": product_id, "available": held.get(product_id, 0) + exc.available})
+            continue
+        available = product.stock - reserved.get(product_id, 0)
+        if available < quantity:
+            errors.append({"product": product_id, "available": max(available, 0)})
+    if errors:
+        raise ReservationError(errors)
+
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    _remove(StockReservation.objects.filter(user=user).exclude(product_id__in=items.keys()))
+    for product_id, quantity in items.items():
+        StockReservation.objects.update_or_create(
+            user=user, product_id=product_id,
+            defaults={'quantity': quantity, 'expires_at': expires_at}
+        )
+    return expires_at, items
+
+
+@transaction.atomic
+def release(user, product_ids=None):
+    """Supprime les reservations de l'utilisateur (toutes ou pour ces produits)"""
+    holds = StockReservation.objects.filter(user=user)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    _remove(holds)
+
+
+def consume(user, product_ids):
+    """
+    Convertit les reservations de l'acheteur en commande (dans la transaction
+    de l'appelant). Retourne {product_id: unites deja retirees des compteurs}
+    pour les produits slotted.
+    """
+    return _remove(StockReservation.objects.filter(user=user, product_id__in=product_ids), restock=False)
+
+
+def release_expired(batch_size=1000):
+    """Supprime un lot de reservations expirees; retourne le nombre supprime"""
+    ids = list(
+        StockReservation.objects.filter(expires_at__lte=timezone.now())
+        .order_by('expires_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    with transaction.atomic():
+        _remove(StockReservation.objects.filter(id__in=ids, expires_at__lte=timezone.now()))
+    return len(ids)
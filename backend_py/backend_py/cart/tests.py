@@ -0,0 +1,131 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from backend_py.products.models import Product
+from backend_py.products import inventory
+from backend_py.users.models import User
+from .models import CartItem, StockReservation
+
+
+class StockReservationTests(TestCase):
+    """Tests pour les reservations de stock au checkout"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(username='buyer', email='buyer@test.com', password='userpass123')
+        self.other = User.objects.create_user(username='other', email='other@test.com', password='userpass123')
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=5
+        )
+        CartItem.objects.create(user=self.buyer, product=self.product, quantity=4)
+
+    def _order(self, user, quantity):
+        self.client.force_authenticate(user=user)
+        return self.client.post(
+            '/orders/', {'items': [{'product_id': self.product.id, 'quantity': quantity}]}, format='json'
+        )
+
+    def test_hold_blocks_other_buyers_and_converts_on_order(self):
+        """Le stock reserve n'est plus disponible pour les autres; la commande consomme la reservation"""
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post('/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['items'], [{'product': self.product.id, 'quantity': 4}])
+
+        self.assertEqual(self._order(self.other, 2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._order(self.other, 1).status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self._order(self.buyer, 4).status_code, status.HTTP_201_CREATED)
+        self.assertFalse(StockReservation.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_hold_rejected_when_stock_reserved(self):
+        """Une reservation depassant le stock disponible est refusee en bloc"""
+        StockReservation.objects.create(
+            user=self.other, product=self.product, quantity=3,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post('/cart/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['items'], [{'product': self.product.id, 'available': 2}])
+        self.assertFalse(StockReservation.objects.filter(user=self.buyer).exists())
+
+    def test_expired_holds_ignored_and_released(self):
+        """Les reservations expirees ne bloquent rien et sont supprimees par le balayage"""
+        StockReservation.objects.create(
+            user=self.other, product=self.product, quantity=5,
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self._order(self.buyer, 5).status_code, status.HTTP_201_CREATED)
+
+        out = StringIO()
+        call_command('release_expired_reservations', batch_size=1, stdout=out)
+        self.assertIn('1 reservations expirees liberees', out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_graphql_create_order_respects_holds(self):
+        """La mutation createOrder passe par le meme checkout que POST /orders/"""
+        mutation = 'mutation { createOrder { success message order { id } } }'
+        hold = StockReservation.objects.create(
+            user=self.other, product=self.product, quantity=3,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.client.force_authenticate(user=None)
+        self.client.force_login(self.buyer)
+        result = self.client.post('/graphql/', {'query': mutation}, format='json').json()['data']['createOrder']
+        self.assertFalse(result['success'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+        hold.delete()
+        StockReservation.objects.create(
+            user=self.buyer, product=self.product, quantity=4,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        result = self.client.post('/graphql/', {'query': mutation}, format='json').json()['data']['createOrder']
+        self.assertTrue(result['success'])
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertFalse(CartItem.objects.filter(user=self.buyer).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_slotted_hold_keeps_units_out_of_slots(self):
+        """En mode slotted, le stock reserve sort des compteurs: les autres acheteurs ne peuvent pas le prendre"""
+        inventory.enable_slotted(self.product.id, slots=2)
+        CartItem.objects.filter(user=self.buyer).update(quantity=5)
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.post('/cart/checkout/').status_code, status.HTTP_200_OK)
+        self.assertEqual(inventory.slotted_stock(self.product.id), 0)
+
+        self.assertEqual(self._order(self.other, 3).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._order(self.buyer, 5).status_code, status.HTTP_201_CREATED)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(inventory.slotted_stock(self.product.id), 0)
+
+    def test_slotted_units_returned_on_expiry_and_disable(self):
+        """Les unites mises de cote reviennent aux compteurs a l'expiration, et au produit en mode row"""
+        inventory.enable_slotted(self.product.id, slots=2)
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post('/cart/checkout/')
+        self.assertEqual(inventory.slotted_stock(self.product.id), 1)
+
+        inventory.disable_slotted(self.product.id)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        inventory.enable_slotted(self.product.id, slots=2)
+        self.assertEqual(inventory.slotted_stock(self.product.id), 1)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('release_expired_reservations', stdout=StringIO())
+        self.assertEqual(inventory.slotted_stock(self.product.id), 5)
@@ -1,5 +1,8 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
+from . import reservations
 from .models import CartItem
 from .serializers import CartItemSerializer
 
@@ -15,3 +18,27 @@ class CartItemViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post', 'delete'])
+    def checkout(self, request):
+        """
+        POST: reserve le contenu du panier pendant STOCK_RESERVATION_TTL secondes.
+        DELETE: libere les reservations (abandon du checkout).
+        """
+        if request.method == 'DELETE':
+            reservations.release(request.user)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            expires_at, items = reservations.hold_cart(request.user)
+        except reservations.ReservationError as exc:
+            return Response(
+                {"error": "Stock insuffisant", "items": exc.errors},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not items:
+            return Response({"error": "Panier vide"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "expires_at": expires_at,
+            "items": [{"product": pid, "quantity": qty} for pid, qty in sorted(items.items())],
+        })
@@ -0,0 +1,128 @@
+"""
+Disjoncteurs (circuit breakers) par service externe.
+
+Etat partage entre workers via le cache (CACHE_URL):
+- ferme: les appels passent; succes et echecs sont comptes par fenetre
+  de `WINDOW` secondes. Au-dela de `MIN_CALLS` appels et d'un taux
+  d'echec >= `FAILURE_RATE`, le disjoncteur s'ouvre;
+- ouvert: les appels echouent immediatement (CircuitOpenError) pendant
+  `OPEN_SECONDS`;
+- semi-ouvert: passe ce delai, un seul appel de sonde est autorise
+  (verrou `cache.add`); son succes referme le circuit, son echec le rouvre.
+
+Sont comptes comme echecs les erreurs de connexion, les timeouts et les
+reponses 5xx; une 4xx est une reponse valide de l'amont.
+"""
+import time
+import requests
+from django.core.cache import cache
+from backend_py import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULTS = {"WINDOW": 30, "MIN_CALLS": 5, "FAILURE_RATE": 0.5, "OPEN_SECONDS": 30}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Appel refuse: le disjoncteur du service est ouvert"""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"Circuit ouvert pour {upstream}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def is_failure(exc):
+    response = getattr(exc, 'response', None)
+    if isinstance(exc, requests.HTTPError) and response is not None:
+        return response.status_code >= 500
+    return not isinstance(exc, CircuitOpenError)
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=30, min_calls=5, failure_rate=0.5, open_seconds=30):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self._prefix = f"breaker:{name}:"
+
+    def _key(self, suffix):
+        return self._prefix + suffix
+
+    def _opened_until(self):
+        return cache.get(self._key("open_until"))
+
+    def state(self):
+        opened_until = self._opened_until()
+        if opened_until is None:
+            return CLOSED
+        return OPEN if time.time() < opened_until else HALF_OPEN
+
+    def before_call(self):
+        """Leve CircuitOpenError si l'appel doit etre refuse; retourne True pour une sonde"""
+        opened_until = self._opened_until()
+        if opened_until is None:
+            return False
+        remaining = opened_until - time.time()
+        if remaining > 0:
+            metrics.increment('circuit_breaker_rejected_total', upstream=self.name)
+            raise CircuitOpenError(self.name, remaining)
+        # Semi-ouvert: une seule sonde a la fois, tous workers confondus
+        if cache.add(self._key("probe"), 1, self.open_seconds):
+            return True
+        metrics.increment('circuit_breaker_rejected_total', upstream=self.name)
+        raise CircuitOpenError(self.name, self.open_seconds)
+
+    def record_success(self, probe=False):
+        if probe:
+            self._transition(CLOSED)
+            cache.delete_many([self._key("open_until"), self._key("probe")])
+            return
+        self._count("calls")
+
+    def record_failure(self, probe=False):
+        if probe:
+            self._open()
+            return
+        calls = self._count("calls")
+        failures = self._count("failures")
+        if calls >= self.min_calls and failures / calls >= self.failure_rate:
+            self._open()
+
+    def _count(self, counter):
+        # Fenetre fixe: les compteurs expirent avec elle
+        key = self._key(f"{counter}:{int(time.time() // self.window)}")
+        cache.add(key, 0, self.window * 2)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Cle expiree entre add et incr
+            cache.set(key, 1, self.window * 2)
+            return 1
+
+    def _open(self):
+        self._transition(OPEN)
+        bucket = int(time.time() // self.window)
+        cache.set(self._key("open_until"), time.time() + self.open_seconds, self.open_seconds * 10)
+        cache.delete_many([
+            self._key("probe"), self._key(f"calls:{bucket}"), self._key(f"failures:{bucket}"),
+        ])
+
+    def _transition(self, target):
+        metrics.increment('circuit_breaker_transitions_total', upstream=self.name, state=target)
+
+    def snapshot(self):
+        bucket = int(time.time() // self.window)
+        calls = cache.get(self._key(f"calls:{bucket}")) or 0
+        failures = cache.get(self._key(f"failures:{bucket}")) or 0
+        opened_until = self._opened_until()
+        return {
+            "state": self.state(),
+            "window_calls": calls,
+            "window_failures": failures,
+            "retry_after": max(0, round(opened_until - time.time(), 1)) if opened_until else None,
+        }
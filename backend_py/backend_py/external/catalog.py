@@ -0,0 +1,94 @@
+"""
+Import incremental du catalogue FakeStore dans Product.
+
+Le catalogue est recupere en un appel, normalise (titre, description,
+prix Decimal, image), dedoublonne sur l'identifiant externe, puis applique
+par lots: creation des nouveaux produits, mise a jour des seuls produits
+dont un champ a change (bulk_update), rien pour les autres. Le stock n'est
+jamais modifie par l'import: il reste gere par les admins (0 a la creation).
+"""
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from backend_py.products.models import Product
+from . import clients
+
+SOURCE = 'fakestore'
+FIELDS = ('title', 'description', 'price', 'image')
+MAX_PRICE = Decimal('99999999.99')
+
+
+def fetch():
+    """Catalogue brut de l'amont; leve requests.RequestException ou ValueError"""
+    data = clients.get('fakestore').get_json('/products')
+    if not isinstance(data, list):
+        raise ValueError("Catalogue inattendu (liste attendue)")
+    return data
+
+
+def normalize(item):
+    """Produit au format Product ({external_id, title, ...}), ou None s'il est inexploitable"""
+    if not isinstance(item, dict) or item.get('id') in (None, ''):
+        return None
+    title = str(item.get('title') or '').strip()[:255]
+    try:
+        price = Decimal(str(item.get('price'))).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    if not title or not price.is_finite() or price < 0 or price > MAX_PRICE:
+        return None
+    image = str(item.get('image') or '').strip()
+    return {
+        'external_id': str(item['id'])[:64],
+        'title': title,
+        'description': str(item.get('description') or '').strip(),
+        'price': price,
+        'image': image if len(image) <= 200 else '',
+    }
+
+
+def upsert(records, batch_size=500):
+    """Applique les produits normalises par lots; retourne les compteurs"""
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0}
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        with transaction.atomic():
+            existing = {
+                product.external_id: product
+                for product in Product.objects.filter(
+                    external_source=SOURCE, external_id__in=[r['external_id'] for r in batch]
+                ).only('id', 'external_id', *FIELDS)
+            }
+            created, changed = [], []
+            now = timezone.now()
+            for record in batch:
+                product = existing.get(record['external_id'])
+                if product is None:
+                    created.append(Product(external_source=SOURCE, **record))
+                elif any(getattr(product, field) != record[field] for field in FIELDS):
+                    for field in FIELDS:
+                        setattr(product, field, record[field])
+                    product.updated_at = now
+                    changed.append(product)
+            Product.objects.bulk_create(created)
+            Product.objects.bulk_update(changed, [*FIELDS, 'updated_at'])
+        stats['created'] += len(created)
+        stats['updated'] += len(changed)
+        stats['unchanged'] += len(batch) - len(created) - len(changed)
+    return stats
+
+
+def run(batch_size=500):
+    """Recupere, normalise, dedoublonne et applique le catalogue"""
+    items = fetch()
+    records, invalid = {}, 0
+    for item in items:
+        record = normalize(item)
+        if record is None:
+            invalid += 1
+            continue
+        # En cas de doublon amont, la derniere occurrence l'emporte
+        records[record['external_id']] = record
+    stats = upsert(list(records.values()), batch_size)
+    stats.update(fetched=len(items), invalid=invalid, duplicates=len(items) - invalid - len(records))
+    return stats
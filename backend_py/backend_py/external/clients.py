@@ -0,0 +1,163 @@
+"""
+Clients HTTP partages pour les API externes (un par service).
+
+Chaque service (`EXTERNAL_HTTP` dans settings) a sa session requests avec
+pool keep-alive borne, timeouts de connexion et de lecture distincts, et
+retries urllib3 (erreurs de connexion et 502/503/504, backoff avec jitter,
+GET uniquement). Les connexions sont reutilisees entre requetes du meme
+processus au lieu d'un handshake TCP+TLS par appel.
+
+`get_json` coalesce les GET identiques en cours (meme service, chemin et
+parametres): un seul appel amont, resultat partage entre threads et, via
+le cache partage, entre workers (voir external/singleflight.py).
+
+Chaque service a aussi un disjoncteur (external/breaker.py): si l'amont
+echoue ou pend, les appels sont refuses immediatement (CircuitOpenError)
+au lieu d'immobiliser les workers pendant le timeout.
+
+Metriques: `external_request_seconds` (latence par service),
+`singleflight_coalesced_total` (appels evites) et, dans /metrics/,
+connexions ouvertes vs requetes servies par pool et etat des disjoncteurs.
+"""
+import hashlib
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from backend_py import metrics
+from . import breaker as breakers
+from .singleflight import SingleFlight
+
+_lock = threading.Lock()
+_clients = {}
+
+
+class UpstreamClient:
+    """Session poolee vers un service externe"""
+
+    def __init__(self, name, base_url, connect_timeout=3.0, read_timeout=10.0, pool_size=10,
+                 retries=2, backoff=0.2, headers=None, coalesce=None, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            # Connexions conservees; au-dela, les connexions en surplus sont fermees apres usage
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=retries,
+                backoff_factor=backoff,
+                backoff_jitter=backoff,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update(headers or {})
+        self.breaker = breakers.CircuitBreaker(name, **{
+            key.lower(): value for key, value in {**breakers.DEFAULTS, **(breaker or {})}.items()
+        })
+        coalesce = coalesce or {}
+        self.flight = SingleFlight(
+            lock_timeout=coalesce.get("LOCK_TIMEOUT", connect_timeout + read_timeout),
+            wait_timeout=coalesce.get("WAIT_TIMEOUT", connect_timeout + read_timeout),
+            result_ttl=coalesce.get("RESULT_TTL", 5),
+            error_class=requests.RequestException,
+        )
+
+    def get(self, path, params=None, **kwargs):
+        """GET sur `base_url + path`; leve requests.RequestException (statut HTTP compris)
+
+        Leve breaker.CircuitOpenError sans appeler l'amont si le disjoncteur est ouvert.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        probe = self.breaker.before_call()
+        try:
+            with metrics.timed('external_request_seconds', upstream=self.name):
+                response = self.session.get(f"{self.base_url}{path}", params=params, **kwargs)
+                response.raise_for_status()
+        except requests.RequestException as exc:
+            metrics.increment('external_errors_total', upstream=self.name, error=type(exc).__name__)
+            if breakers.is_failure(exc):
+                self.breaker.record_failure(probe)
+            else:
+                self.breaker.record_success(probe)
+            raise
+        self.breaker.record_success(probe)
+        return response
+
+    def get_json(self, path, params=None):
+        """GET decode en JSON, partage avec les appels identiques en cours"""
+        canonical = json.dumps([self.name, path, sorted((params or {}).items())], default=str)
+        key = hashlib.sha1(canonical.encode()).hexdigest()
+        return self.flight.do(key, lambda: self.get(path, params=params).json())
+
+    def pool_stats(self):
+        """Connexions ouvertes et requetes servies par le pool (reutilisation)"""
+        opened = served = 0
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                served += pool.num_requests
+        return {
+            "connections_opened": opened,
+            "requests": served,
+            "reuse_ratio": round(1 - opened / served, 4) if served else None,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+def get(name):
+    """Client du service `name` (cle de EXTERNAL_HTTP), cree au premier appel"""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                config = settings.EXTERNAL_HTTP[name]
+                client = _clients[name] = UpstreamClient(
+                    name,
+                    config["BASE_URL"],
+                    connect_timeout=config.get("CONNECT_TIMEOUT", 3.0),
+                    read_timeout=config.get("READ_TIMEOUT", 10.0),
+                    pool_size=config.get("POOL_SIZE", 10),
+                    retries=config.get("RETRIES", 2),
+                    headers=config.get("HEADERS"),
+                    coalesce=config.get("COALESCE"),
+                    breaker=config.get("BREAKER"),
+                )
+    return client
+
+
+def reset():
+    """Ferme et oublie les clients (changement de configuration, tests)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def pool_stats():
+    with _lock:
+        clients = dict(_clients)
+    return {name: client.pool_stats() for name, client in sorted(clients.items())}
+
+
+def breaker_states():
+    """Etat des disjoncteurs de tous les services configures (partage entre workers)"""
+    return {name: get(name).breaker.snapshot() for name in sorted(settings.EXTERNAL_HTTP)}
+
+
+metrics.register_collector('http_pools', pool_stats)
+metrics.register_collector('circuit_breakers', breaker_states)
@@ -0,0 +1,88 @@
+"""
+Conversion de montants en lot sur la matrice de taux locale (rates.py).
+
+Une seule lecture de la matrice pour tout le lot, aucun appel amont.
+Calcul en Decimal: montant * taux croise, arrondi au demi superieur
+(ROUND_HALF_UP) au nombre de decimales de la devise cible (ISO 4217).
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from . import rates
+
+MAX_ITEMS = 5000
+MAX_AMOUNT = Decimal('1e15')
+
+# Decimales par devise (ISO 4217); 2 par defaut
+MINOR_UNITS = {'JPY': 0, 'KRW': 0}
+
+_QUANTUM = {code: Decimal(1).scaleb(-MINOR_UNITS.get(code, 2)) for code in rates.CURRENCIES}
+
+
+class ConversionError(Exception):
+    """Lot invalide; `errors` associe l'index de chaque element refuse a son motif"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+def parse(items):
+    """Valide le lot [{amount, from, to}] et retourne [(Decimal, from, to)]; leve ConversionError"""
+    if not isinstance(items, list) or not items:
+        raise ConversionError("Liste de conversions requise")
+    if len(items) > MAX_ITEMS:
+        raise ConversionError(f"{MAX_ITEMS} conversions maximum par requete")
+
+    parsed, errors = [], {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = "Objet {amount, from, to} attendu"
+            continue
+        source = str(item.get('from', '')).upper()
+        target = str(item.get('to', '')).upper()
+        if source not in _QUANTUM or target not in _QUANTUM:
+            errors[index] = "Devise invalide"
+            continue
+        amount = item.get('amount')
+        try:
+            if isinstance(amount, bool):
+                raise InvalidOperation
+            amount = Decimal(str(amount))
+        except (InvalidOperation, ValueError):
+            errors[index] = "Montant invalide"
+            continue
+        if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+            errors[index] = "Montant invalide"
+            continue
+        parsed.append((amount, source, target))
+    if errors:
+        raise ConversionError("Conversions invalides", errors)
+    return parsed
+
+
+def convert(items):
+    """
+    Convertit le lot valide par `parse`. Retourne {"date", "results"};
+    leve rates.RatesUnavailable sans snapshot, ConversionError si une
+    devise est absente de la table de reference.
+    """
+    matrix = rates.matrix()
+    if matrix is None:
+        raise rates.RatesUnavailable("Aucun snapshot de taux")
+
+    results, errors = [], {}
+    for index, (amount, source, target) in enumerate(items):
+        try:
+            rate = matrix.rate(source, target)
+        except KeyError:
+            errors[index] = "Taux indisponible"
+            continue
+        results.append({
+            "amount": str(amount),
+            "from": source,
+            "to": target,
+            "rate": str(rate),
+            "converted": str((amount * rate).quantize(_QUANTUM[target], rounding=ROUND_HALF_UP)),
+        })
+    if errors:
+        raise ConversionError("Conversions impossibles", errors)
+    return {"date": matrix.date, "results": results}
@@ -0,0 +1,149 @@
+"""
+Cache des recherches de magasins (Nominatim) pour le localisateur.
+
+Cle: nom de ville normalise (accents, casse, ponctuation et espaces
+ignores, remplace par son empreinte SHA-256 s'il depasse la taille de
+GeocodeEntry.key) ou cellule de grille de `GRID` degres pour les coordonnees; la
+recherche amont porte sur le centre de la cellule, si bien que toutes les
+coordonnees d'une meme cellule partagent le resultat.
+
+Deux niveaux: memoire du processus (LRU de `MEMORY_SIZE` entrees) puis
+table GeocodeEntry, commune aux workers. Une recherche sans resultat est
+aussi mise en cache (cache negatif, `NEGATIVE_TTL`); les erreurs amont ne
+le sont pas. Taux de succes par niveau dans /metrics/ (`geocode_cache`).
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from backend_py import metrics
+from . import clients
+from .models import GeocodeEntry
+
+_lock = threading.Lock()
+# cle -> (magasins, instant monotone d'expiration)
+_memory = OrderedDict()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+KEY_MAX_LENGTH = GeocodeEntry._meta.get_field('key').max_length
+
+
+def normalize_city(city):
+    """'  Saint-Étienne ' -> 'saint etienne'"""
+    text = unicodedata.normalize('NFKD', city)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+def city_query(city):
+    """(cle de cache, parametres Nominatim) pour une ville"""
+    name = normalize_city(city)
+    params = {'q': f'shop in {name}', 'format': 'json', 'limit': 10, 'addressdetails': 1}
+    key = f"city:{name}"
+    if len(key) > KEY_MAX_LENGTH:
+        key = f"city#{hashlib.sha256(name.encode()).hexdigest()}"
+    return key, params
+
+
+def cell_query(lat, lon):
+    """(cle de cache, parametres Nominatim) pour la cellule de grille contenant (lat, lon)"""
+    grid = settings.GEOCODE_CACHE["GRID"]
+    row, col = round(lat / grid), round(lon / grid)
+    center_lat, center_lon = round(row * grid, 6), round(col * grid, 6)
+    params = {
+        'q': 'shop',
+        'format': 'json',
+        'limit': 10,
+        'addressdetails': 1,
+        'viewbox': f'{center_lon-0.1},{center_lat-0.1},{center_lon+0.1},{center_lat+0.1}',
+        'bounded': 1,
+    }
+    return f"cell:{grid}:{row}:{col}", params
+
+
+def _format(data):
+    stores = []
+    for item in data:
+        # Utiliser le type ou category pour le nom si disponible, sinon display_name
+        name = item.get('namedetails', {}).get('name') or item.get('type', 'Magasin')
+        stores.append({
+            'name': name,
+            'lat': item.get('lat'),
+            'lon': item.get('lon'),
+            'address': item.get('display_name'),
+            'type': item.get('type', 'shop')
+        })
+    return stores
+
+
+def _remember(key, stores, ttl):
+    with _lock:
+        _memory[key] = (stores, time.monotonic() + ttl)
+        _memory.move_to_end(key)
+        while len(_memory) > settings.GEOCODE_CACHE["MEMORY_SIZE"]:
+            _memory.popitem(last=False)
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def search(key, params):
+    """Magasins pour `key`: memoire, puis base, puis Nominatim; leve requests.RequestException"""
+    with _lock:
+        cached = _memory.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return cached[0]
+
+    now = timezone.now()
+    entry = GeocodeEntry.objects.filter(key=key, expires_at__gt=now).first()
+    if entry is not None:
+        _count("db_hits")
+        _remember(key, entry.stores, (entry.expires_at - now).total_seconds())
+        return entry.stores
+
+    _count("misses")
+    stores = _format(clients.get('nominatim').get_json('/search', params=params))
+    config = settings.GEOCODE_CACHE
+    ttl = config["TTL"] if stores else config["NEGATIVE_TTL"]
+    GeocodeEntry.objects.update_or_create(
+        key=key, defaults={'stores': stores, 'fetched_at': now, 'expires_at': now + timedelta(seconds=ttl)}
+    )
+    _remember(key, stores, ttl)
+    return stores
+
+
+def purge_expired(batch_size=1000):
+    """Supprime un lot d'entrees expirees; retourne le nombre supprime"""
+    ids = list(
+        GeocodeEntry.objects.filter(expires_at__lte=timezone.now()).values_list('id', flat=True)[:batch_size]
+    )
+    return GeocodeEntry.objects.filter(id__in=ids).delete()[0]
+
+
+def stats():
+    """Succes par niveau depuis le demarrage du worker"""
+    with _lock:
+        counts = dict(_stats)
+        counts["memory_entries"] = len(_memory)
+    lookups = counts["memory_hits"] + counts["db_hits"] + counts["misses"]
+    counts["hit_ratio"] = round(1 - counts["misses"] / lookups, 4) if lookups else None
+    return counts
+
+
+def reset():
+    """Vide le niveau memoire et les compteurs (tests)"""
+    with _lock:
+        _memory.clear()
+        for stat in _stats:
+            _stats[stat] = 0
+
+
+metrics.register_collector('geocode_cache', stats)
@@ -0,0 +1,22 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.external import catalog
+
+
+class Command(BaseCommand):
+    help = "Importe le catalogue FakeStore dans les produits (seules les lignes modifiees sont ecrites)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size doit etre positif")
+        try:
+            stats = catalog.run(options["batch_size"])
+        except (requests.RequestException, ValueError) as exc:
+            raise CommandError(f"Catalogue indisponible: {exc}")
+        self.stdout.write(
+            f"{stats['fetched']} produits recus: {stats['created']} crees, {stats['updated']} mis a jour, "
+            f"{stats['unchanged']} inchanges, {stats['invalid']} invalides, {stats['duplicates']} doublons"
+        )
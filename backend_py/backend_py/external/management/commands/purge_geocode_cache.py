@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.external import geocode
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les entrees expirees du cache du localisateur de magasins"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size doit etre positif")
+
+        purged = 0
+        while True:
+            count = geocode.purge_expired(options["batch_size"])
+            purged += count
+            if count < options["batch_size"]:
+                break
+        self.stdout.write(f"{purged} entrees expirees supprimees")
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.external import rates
+
+
+class Command(BaseCommand):
+    help = "Recupere la table de taux de reference et l'enregistre comme snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Tourner en continu")
+        parser.add_argument("--interval", type=float, default=None,
+                            help="Pause (s) entre deux passes (RATES_REFRESH_INTERVAL par defaut)")
+        parser.add_argument("--prune-days", type=int, default=None,
+                            help="Supprimer les snapshots plus anciens (le dernier par devise est conserve)")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or settings.RATES_CACHE["REFRESH_INTERVAL"]
+
+        while True:
+            try:
+                matrix = rates.refresh()
+            except rates.RatesUnavailable as exc:
+                if not options["loop"]:
+                    raise CommandError(f"Table de taux indisponible: {exc}")
+                self.stderr.write(f"Table de taux indisponible: {exc}")
+            else:
+                self.stdout.write(f"Taux du {matrix.date} enregistres ({len(matrix.rows)} devises)")
+            if options["prune_days"] is not None:
+                deleted = rates.prune(options["prune_days"])
+                self.stdout.write(f"{deleted} snapshots anciens supprimes")
+            if not options["loop"]:
+                break
+            time.sleep(interval)
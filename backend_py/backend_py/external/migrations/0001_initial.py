@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=3, unique=True)),
+                ('date', models.CharField(max_length=10)),
+                ('rates', models.JSONField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
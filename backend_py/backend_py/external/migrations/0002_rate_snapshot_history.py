@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('external', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ratesnapshot',
+            name='base',
+            field=models.CharField(max_length=3),
+        ),
+        migrations.AddIndex(
+            model_name='ratesnapshot',
+            index=models.Index(fields=['base', '-fetched_at'], name='external_rates_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('external', '0002_rate_snapshot_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=160, unique=True)),
+                ('stores', models.JSONField(default=list)),
+                ('fetched_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
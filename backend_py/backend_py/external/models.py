@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class RateSnapshot(models.Model):
+    """Table de taux obtenue pour une devise de base a un instant donne"""
+    base = models.CharField(max_length=3)
+    date = models.CharField(max_length=10)
+    rates = models.JSONField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['base', '-fetched_at'], name='external_rates_latest_idx'),
+        ]
+
+
+class GeocodeEntry(models.Model):
+    """Resultat de recherche de magasins mis en cache (ville normalisee ou cellule de grille)"""
+    key = models.CharField(max_length=160, unique=True)
+    stores = models.JSONField(default=list)
+    fetched_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
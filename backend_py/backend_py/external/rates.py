@@ -0,0 +1,179 @@
+"""
+Taux de change (BCE via frankfurter.app, publies une fois par jour).
+
+L'amont n'est jamais appele sur le chemin des requetes: la commande
+`refresh_rates` (ou un ordonnanceur qui la lance) recupere a intervalle
+regulier la seule table de reference EUR et l'enregistre comme snapshot
+horodate (RateSnapshot). `get` ne lit que l'etat local: matrice en memoire
+du processus, rechargee depuis le dernier snapshot au plus tous les
+`RELOAD_INTERVAL` secondes, si bien que tous les workers servent les memes
+taux a ce delai pres. La table codee en dur ne sert que si aucun snapshot
+n'existe.
+
+Taux croises: toutes les paires sont derivees de la table EUR en une
+passe, rate(X -> Y) = eur[Y] / eur[X], en Decimal. La ligne EUR est
+servie telle que publiee. Les taux BCE ont 5 chiffres significatifs ou
+plus (IDR: 7); les taux derives sont arrondis a CROSS_DIGITS (10) chiffres
+significatifs, soit une erreur relative due au calcul <= 5e-10,
+negligeable devant la precision des donnees sources (<= 5e-5).
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Context, Decimal
+import requests
+from django.conf import settings
+from django.utils import timezone
+from . import clients
+from .models import RateSnapshot
+
+logger = logging.getLogger(__name__)
+
+CURRENCIES = (
+    'EUR', 'USD', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'NZD',
+    'CNY', 'HKD', 'SGD', 'SEK', 'NOK', 'DKK', 'PLN', 'CZK',
+    'HUF', 'RON', 'BGN', 'TRY', 'ZAR', 'BRL', 'MXN', 'ILS',
+    'INR', 'KRW', 'THB', 'MYR', 'IDR', 'PHP', 'RUB',
+)
+
+# Devise de la table de reference BCE
+SOURCE_BASE = 'EUR'
+CROSS_DIGITS = 10
+_CONTEXT = Context(prec=28)
+
+# Dernier recours: aucun snapshot enregistre
+FALLBACK_DATE = "2025-12-11"
+FALLBACK_RATES = {
+    "EUR": {"USD": 1.08, "GBP": 0.86, "JPY": 162.5, "CHF": 0.94, "CAD": 1.47, "AUD": 1.65, "CNY": 7.82},
+    "USD": {"EUR": 0.93, "GBP": 0.79, "JPY": 150.2, "CHF": 0.87, "CAD": 1.36, "AUD": 1.53, "CNY": 7.24},
+    "GBP": {"EUR": 1.17, "USD": 1.26, "JPY": 189.8, "CHF": 1.10, "CAD": 1.72, "AUD": 1.93, "CNY": 9.15},
+}
+
+_lock = threading.Lock()
+# (Matrix ou None, instant monotone du dernier chargement)
+_matrix = None
+
+
+class RatesUnavailable(Exception):
+    pass
+
+
+def _significant(value, digits=CROSS_DIGITS):
+    return value.quantize(Decimal(1).scaleb(value.adjusted() - digits + 1), context=_CONTEXT)
+
+
+class Matrix:
+    """Taux croises de toutes les devises, derives d'une table de reference"""
+
+    def __init__(self, date, reference, fetched_at, source=SOURCE_BASE):
+        self.date = date
+        self.fetched_at = fetched_at
+        # Unites de chaque devise pour 1 unite de la devise source
+        units = {source: Decimal(1)}
+        for code, value in reference.items():
+            if code in CURRENCIES and value:
+                units[code] = Decimal(str(value))
+        self.rows = {
+            base: {
+                target: _significant(_CONTEXT.divide(units[target], units[base]))
+                for target in units if target != base
+            }
+            for base in units if base != source
+        }
+        # Table de reference: valeurs amont exactes, sans arrondi
+        self.rows[source] = {code: value for code, value in units.items() if code != source}
+
+    def __contains__(self, base):
+        return base in self.rows
+
+    def rate(self, source, target):
+        """Taux Decimal source -> target (1 pour une meme devise); KeyError si inconnue"""
+        if source == target and source in self.rows:
+            return Decimal(1)
+        return self.rows[source][target]
+
+    def as_dict(self, base):
+        return {"base": base, "date": self.date, "rates": {code: float(rate) for code, rate in self.rows[base].items()}}
+
+
+def _load_snapshot():
+    snapshot = RateSnapshot.objects.filter(base=SOURCE_BASE).order_by('-fetched_at').first()
+    if snapshot is None:
+        return None
+    return Matrix(snapshot.date, snapshot.rates, snapshot.fetched_at)
+
+
+def fetch():
+    """Interroge l'amont (table de reference) et enregistre un snapshot; leve RatesUnavailable"""
+    global _matrix
+    try:
+        data = clients.get('frankfurter').get_json('/latest', params={'from': SOURCE_BASE})
+    except (requests.RequestException, ValueError) as exc:
+        raise RatesUnavailable(str(exc))
+    fetched_at = timezone.now()
+    snapshot = RateSnapshot.objects.create(
+        base=SOURCE_BASE, date=data.get("date"), rates=data.get("rates", {}), fetched_at=fetched_at
+    )
+    matrix = Matrix(snapshot.date, snapshot.rates, fetched_at)
+    with _lock:
+        _matrix = (matrix, time.monotonic())
+    return matrix
+
+
+def refresh():
+    """Recupere la table de reference et recalcule la matrice; leve RatesUnavailable"""
+    try:
+        return fetch()
+    except RatesUnavailable as exc:
+        logger.warning("Rafraichissement des taux impossible: %s", exc)
+        raise
+
+
+def prune(keep_days):
+    """Supprime les snapshots de plus de `keep_days` jours, sauf le dernier de chaque devise"""
+    cutoff = timezone.now() - timedelta(days=keep_days)
+    deleted = 0
+    for base in RateSnapshot.objects.values_list('base', flat=True).distinct():
+        latest = RateSnapshot.objects.filter(base=base).order_by('-fetched_at').values_list('pk', flat=True)[:1]
+        deleted += RateSnapshot.objects.filter(base=base, fetched_at__lt=cutoff).exclude(pk__in=list(latest)).delete()[0]
+    return deleted
+
+
+def matrix():
+    """Matrice en memoire, rechargee depuis le dernier snapshot si plus vieille que RELOAD_INTERVAL"""
+    global _matrix
+    now = time.monotonic()
+    with _lock:
+        cached = _matrix
+    if cached is not None and now - cached[1] < settings.RATES_CACHE["RELOAD_INTERVAL"]:
+        return cached[0]
+    loaded = _load_snapshot()
+    with _lock:
+        _matrix = (loaded, now)
+    return loaded
+
+
+def get(base):
+    """
+    Taux pour `base` ({"base", "date", "rates"}, plus "note" pour la table de
+    secours), sans appel a l'amont. Leve RatesUnavailable si rien n'est disponible.
+    """
+    current = matrix()
+    if current is not None and base in current:
+        return current.as_dict(base)
+    if current is not None or base not in FALLBACK_RATES:
+        raise RatesUnavailable(f"Aucun taux pour {base}")
+    return {
+        "base": base,
+        "date": FALLBACK_DATE,
+        "rates": FALLBACK_RATES[base],
+        "note": "Taux approximatifs (aucun snapshot disponible)"
+    }
+
+
+def reset():
+    """Vide le cache memoire (tests)"""
+    global _matrix
+    with _lock:
+        _matrix = None
@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from backend_py.products.models import Product
+
+
+class ImportedProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ["id", "external_id", "title", "description", "price", "image", "stock", "updated_at"]
@@ -0,0 +1,102 @@
+"""
+Coalescence des appels identiques en cours (single-flight).
+
+Dans un processus, le premier thread qui demande une cle execute l'appel;
+les suivants attendent son resultat. Entre workers, le thread meneur prend
+un verrou court dans le cache partage (`cache.add`): les autres workers
+attendent que le resultat y soit publie au lieu d'appeler l'amont. Sans
+cache partage (LocMemCache par defaut), seule la coalescence par processus
+s'applique; configurer CACHE_URL (Redis, memcached ou base) pour l'etendre.
+
+Les resultats publies dans le cache doivent etre serialisables (pickle).
+"""
+import threading
+import time
+import uuid
+from django.core.cache import cache
+from backend_py import metrics
+
+LOCK_PREFIX = "singleflight:lock:"
+RESULT_PREFIX = "singleflight:result:"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, lock_timeout=10, wait_timeout=5, result_ttl=5, poll_interval=0.05,
+                 error_class=RuntimeError):
+        self.error_class = error_class
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Retourne func() en partageant l'appel avec les demandes identiques en cours"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment("singleflight_coalesced_total", scope="thread")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._across_workers(key, func)
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _across_workers(self, key, func):
+        lock_key = LOCK_PREFIX + key
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, self.lock_timeout):
+            result_key = RESULT_PREFIX + token
+            try:
+                result = func()
+            except Exception as exc:
+                cache.set(result_key, ("error", str(exc)), self.result_ttl)
+                raise
+            else:
+                cache.set(result_key, ("ok", result), self.result_ttl)
+            finally:
+                cache.delete(lock_key)
+            return result
+
+        # Un autre worker mene l'appel: attendre le resultat publie sous son jeton
+        leader_token = cache.get(lock_key)
+        deadline = time.monotonic() + self.wait_timeout
+        while leader_token is not None and time.monotonic() < deadline:
+            published = cache.get(RESULT_PREFIX + leader_token)
+            if published is not None:
+                metrics.increment("singleflight_coalesced_total", scope="worker")
+                outcome, value = published
+                if outcome == "error":
+                    raise self.error_class(value)
+                return value
+            if cache.get(lock_key) != leader_token:
+                # Verrou libere sans resultat lisible: dernier essai puis repli
+                published = cache.get(RESULT_PREFIX + leader_token)
+                if published is None:
+                    break
+                continue
+            time.sleep(self.poll_interval)
+        # Meneur disparu ou trop lent: appeler soi-meme
+        return func()
@@ -0,0 +1,553 @@
+import json
+import threading
+import time
+from decimal import Decimal
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from backend_py import metrics
+from backend_py.products.models import Product
+from backend_py.users.models import User
+from . import clients, geocode, rates
+from .breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_failure
+from .singleflight import LOCK_PREFIX, RESULT_PREFIX, SingleFlight
+from .models import GeocodeEntry, RateSnapshot
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    """API externe locale: reponses JSON en keep-alive, erreurs 503 a la demande"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(self.path)
+        if server.delay:
+            time.sleep(server.delay)
+        if server.fail_next > 0:
+            server.fail_next -= 1
+            return self._send(503, {"error": "indisponible"})
+        return self._send(200, server.routes.get(self.path.split('?')[0], {}))
+
+    def _send(self, code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamServerMixin:
+    """Services externes servis par un serveur local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = ThreadingHTTPServer(('127.0.0.1', 0), _UpstreamHandler)
+        cls.upstream.daemon_threads = True
+        cls.upstream.routes = {}
+        threading.Thread(target=cls.upstream.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{cls.upstream.server_address[1]}'
+        service = {"BASE_URL": base_url, "CONNECT_TIMEOUT": 1, "READ_TIMEOUT": 2, "POOL_SIZE": 2, "RETRIES": 1}
+        cls.settings = override_settings(EXTERNAL_HTTP={
+            name: service for name in ('fakestore', 'frankfurter', 'nominatim')
+        })
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        clients.reset()
+        cls.upstream.shutdown()
+        cls.upstream.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        clients.reset()
+        self.upstream.hits = []
+        self.upstream.fail_next = 0
+        self.upstream.delay = 0
+        rates.reset()
+        geocode.reset()
+        self.client = APIClient()
+
+
+class ExternalTestCase(UpstreamServerMixin, TestCase):
+    pass
+
+
+class UpstreamClientTests(ExternalTestCase):
+    """Tests des sessions poolees vers les API externes"""
+
+    def test_connections_reused_across_requests(self):
+        """Les appels successifs reutilisent la meme connexion keep-alive"""
+        self.upstream.routes['/products'] = [{"id": 1, "title": "Produit externe"}]
+        for _ in range(3):
+            response = clients.get('fakestore').get('/products')
+        self.assertEqual(response.json()[0]['title'], "Produit externe")
+
+        pool = clients.pool_stats()['fakestore']
+        self.assertEqual(pool['requests'], 3)
+        self.assertEqual(pool['connections_opened'], 1)
+
+        admin = User.objects.create_user(username='admin', email='admin@test.com', password='adminpass123', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        snapshot = self.client.get('/metrics/').data
+        self.assertEqual(snapshot['http_pools']['fakestore']['reuse_ratio'], round(1 - 1 / 3, 4))
+        latency = [h for h in snapshot['histograms'] if h['name'] == 'external_request_seconds']
+        self.assertEqual(latency[0]['labels'], {'upstream': 'fakestore'})
+
+    def test_transient_error_retried(self):
+        """Un 503 de l'amont est rejoue une fois avant d'echouer"""
+        self.upstream.routes['/search'] = []
+        self.upstream.fail_next = 1
+        response = self.client.get('/external/stores/', {'city': 'Paris'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.upstream.hits), 2)
+
+        self.upstream.fail_next = 2
+        response = self.client.get('/external/stores/', {'city': 'Lyon'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class SingleFlightTests(ExternalTestCase):
+    """Tests de la coalescence des appels identiques"""
+
+    def _concurrently(self, func, count=5):
+        results, errors = [], []
+
+        def worker():
+            try:
+                results.append(func())
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results, errors
+
+    def test_identical_requests_share_one_upstream_call(self):
+        """Des GET identiques simultanes ne font qu'un appel amont"""
+        self.upstream.routes['/products'] = [{"id": 1}]
+        self.upstream.delay = 0.3
+        client = clients.get('fakestore')
+        results, errors = self._concurrently(lambda: client.get_json('/products', {'limit': 10}))
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[{"id": 1}]] * 5)
+        self.assertEqual(len(self.upstream.hits), 1)
+
+        # Parametres differents: appels distincts
+        self.upstream.delay = 0
+        client.get_json('/products', {'limit': 5})
+        self.assertEqual(len(self.upstream.hits), 2)
+
+    def test_upstream_error_shared_by_waiters(self):
+        """L'echec de l'appel partage est remonte a tous les demandeurs"""
+        self.upstream.delay = 0.3
+        self.upstream.fail_next = 2
+        client = clients.get('fakestore')
+        results, errors = self._concurrently(lambda: client.get_json('/products'), count=3)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(isinstance(e, requests.RequestException) for e in errors))
+        self.assertEqual(len(self.upstream.hits), 2)
+
+    def test_waits_for_result_published_by_other_worker(self):
+        """Verrou tenu par un autre worker: son resultat est reutilise"""
+        flight = SingleFlight(wait_timeout=2, poll_interval=0.01)
+        cache.add(LOCK_PREFIX + 'k', 'other', 10)
+
+        def publish():
+            time.sleep(0.1)
+            cache.set(RESULT_PREFIX + 'other', ('ok', {"rates": 1}), 5)
+            cache.delete(LOCK_PREFIX + 'k')
+
+        threading.Thread(target=publish).start()
+        calls = []
+        self.assertEqual(flight.do('k', lambda: calls.append(1)), {"rates": 1})
+        self.assertEqual(calls, [])
+
+    def test_calls_upstream_when_other_worker_vanishes(self):
+        """Verrou libere sans resultat: l'appel est fait localement"""
+        flight = SingleFlight(wait_timeout=2, poll_interval=0.01)
+        cache.add(LOCK_PREFIX + 'k', 'other', 10)
+        threading.Timer(0.05, cache.delete, args=[LOCK_PREFIX + 'k']).start()
+        self.assertEqual(flight.do('k', lambda: 'local'), 'local')
+
+
+class CircuitBreakerTests(ExternalTestCase):
+    """Tests des disjoncteurs par service"""
+
+    def test_opens_after_failures_and_fails_fast(self):
+        """Apres MIN_CALLS echecs, les appels sont refuses sans toucher l'amont"""
+        self.upstream.fail_next = 100
+        for _ in range(5):
+            response = self.client.get('/external/stores/', {'city': 'Paris'})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        hits = len(self.upstream.hits)
+
+        response = self.client.get('/external/stores/', {'city': 'Lyon'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(len(self.upstream.hits), hits)
+
+        # Les autres services ne sont pas affectes
+        self.upstream.fail_next = 0
+        self.assertEqual(clients.get('fakestore').get_json('/products'), {})
+
+        admin = User.objects.create_user(username='admin', email='admin@test.com', password='adminpass123', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        states = self.client.get('/metrics/').data['circuit_breakers']
+        self.assertEqual(states['nominatim']['state'], OPEN)
+        self.assertEqual(states['fakestore']['state'], CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        """Passe le delai d'ouverture, une seule sonde; son succes referme le circuit"""
+        breaker = CircuitBreaker('test', min_calls=2, open_seconds=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state(), HALF_OPEN)
+        self.assertTrue(breaker.before_call())
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success(probe=True)
+        self.assertEqual(breaker.state(), CLOSED)
+        self.assertFalse(breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker('test', min_calls=1, open_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.before_call())
+        breaker.record_failure(probe=True)
+        self.assertEqual(breaker.state(), OPEN)
+
+    def test_client_errors_do_not_trip(self):
+        """Une 4xx est une reponse valide: seules les erreurs serveur comptent"""
+        breaker = CircuitBreaker('test', min_calls=1)
+        response = requests.Response()
+        response.status_code = 404
+        self.assertFalse(is_failure(requests.HTTPError(response=response)))
+        response.status_code = 502
+        self.assertTrue(is_failure(requests.HTTPError(response=response)))
+        breaker.record_success()
+        self.assertEqual(breaker.state(), CLOSED)
+
+
+class RatesTests(ExternalTestCase):
+    """Tests des taux de change servis depuis les snapshots locaux"""
+
+    def setUp(self):
+        super().setUp()
+        self.upstream.routes['/latest'] = {"base": "EUR", "date": "2026-10-16", "rates": {"USD": 1.1}}
+
+    def test_request_path_never_calls_upstream(self):
+        """Les taux sont lus en memoire ou dans le dernier snapshot, jamais chez l'amont"""
+        RateSnapshot.objects.create(base='EUR', date='2026-10-15', rates={"USD": 1.2}, fetched_at=timezone.now())
+        for _ in range(3):
+            response = self.client.get('/external/rates/', {'base': 'EUR'})
+            self.assertEqual(response.data, {"base": "EUR", "date": "2026-10-15", "rates": {"USD": 1.2}})
+        self.assertEqual(self.upstream.hits, [])
+
+    def test_latest_snapshot_served(self):
+        RateSnapshot.objects.create(
+            base='EUR', date='2026-10-14', rates={"USD": 1.0}, fetched_at=timezone.now() - timedelta(days=1)
+        )
+        RateSnapshot.objects.create(base='EUR', date='2026-10-15', rates={"USD": 1.2}, fetched_at=timezone.now())
+        self.assertEqual(rates.get('EUR')['date'], '2026-10-15')
+
+    @override_settings(RATES_CACHE={"BASES": [], "REFRESH_INTERVAL": 3600, "RELOAD_INTERVAL": 0})
+    def test_workers_pick_up_new_snapshot(self):
+        """Chaque worker relit le dernier snapshot apres RELOAD_INTERVAL"""
+        self.assertIn('note', rates.get('EUR'))
+        rates.refresh()
+        self.assertEqual(rates.get('EUR')['date'], '2026-10-16')
+
+    def test_fallback_only_without_snapshot(self):
+        """La table de secours ne sert qu'en dernier recours"""
+        response = self.client.get('/external/rates/', {'base': 'EUR'})
+        self.assertIn('note', response.data)
+        response = self.client.get('/external/rates/', {'base': 'SEK'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.upstream.hits, [])
+
+    def test_refresh_command_stores_snapshots(self):
+        """refresh_rates enregistre un snapshot horodate par passe, un appel amont chacune"""
+        out = StringIO()
+        call_command('refresh_rates', stdout=out)
+        call_command('refresh_rates', stdout=out)
+        self.assertEqual(RateSnapshot.objects.filter(base='EUR').count(), 2)
+        self.assertIn('Taux du 2026-10-16 enregistres (2 devises)', out.getvalue())
+        self.assertEqual(len(self.upstream.hits), 2)
+
+        self.upstream.fail_next = 10
+        with self.assertRaises(CommandError):
+            call_command('refresh_rates', stdout=out)
+
+    def test_cross_rates_derived_from_reference_table(self):
+        """Toute devise de base est servie depuis la seule table EUR"""
+        RateSnapshot.objects.create(
+            base='EUR', date='2026-10-15', fetched_at=timezone.now(),
+            rates={"USD": 1.0845, "GBP": 0.8571, "JPY": 162.45, "IDR": 17654.09, "XXX": 2.0},
+        )
+        # La table de reference est servie sans arrondi
+        eur = self.client.get('/external/rates/', {'base': 'EUR'}).data
+        self.assertEqual(eur['rates'], {"USD": 1.0845, "GBP": 0.8571, "JPY": 162.45, "IDR": 17654.09})
+        usd = self.client.get('/external/rates/', {'base': 'USD'}).data
+        self.assertEqual(usd['date'], '2026-10-15')
+        # 0.8571 / 1.0845 = 0.79031811894..., arrondi a 10 chiffres significatifs
+        self.assertEqual(
+            usd['rates'], {"EUR": 0.9220839096, "GBP": 0.7903181189, "JPY": 149.7925311, "IDR": 16278.55233}
+        )
+        jpy = self.client.get('/external/rates/', {'base': 'JPY'}).data
+        self.assertEqual(jpy['rates']['EUR'], 0.006155740228)
+
+        matrix = rates.matrix()
+        self.assertEqual(sorted(matrix.rows), ['EUR', 'GBP', 'IDR', 'JPY', 'USD'])
+        self.assertEqual(matrix.rate('USD', 'USD'), Decimal(1))
+        self.assertEqual(matrix.rate('EUR', 'IDR'), Decimal("17654.09"))
+        self.assertEqual(matrix.rate('GBP', 'USD'), Decimal("1.265313266"))
+        # Devise absente de la table de reference
+        response = self.client.get('/external/rates/', {'base': 'SEK'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.upstream.hits, [])
+
+    def test_prune_keeps_latest_snapshot(self):
+        old = timezone.now() - timedelta(days=30)
+        RateSnapshot.objects.create(base='EUR', date='2026-09-01', rates={}, fetched_at=old)
+        RateSnapshot.objects.create(base='EUR', date='2026-09-02', rates={}, fetched_at=old + timedelta(days=1))
+        RateSnapshot.objects.create(base='USD', date='2026-09-01', rates={}, fetched_at=old)
+        self.assertEqual(rates.prune(7), 1)
+        self.assertEqual(
+            sorted(RateSnapshot.objects.values_list('base', 'date')),
+            [('EUR', '2026-09-02'), ('USD', '2026-09-01')]
+        )
+
+
+class ConvertTests(ExternalTestCase):
+    """Tests de la conversion en lot"""
+
+    def setUp(self):
+        super().setUp()
+        RateSnapshot.objects.create(
+            base='EUR', date='2026-10-15', fetched_at=timezone.now(),
+            rates={"USD": 1.0845, "GBP": 0.8571, "JPY": 162.45},
+        )
+
+    def test_bulk_conversion_rounded_per_currency(self):
+        items = [
+            {"amount": "100", "from": "EUR", "to": "USD"},
+            {"amount": 19.99, "from": "usd", "to": "JPY"},
+            {"amount": "0.005", "from": "GBP", "to": "GBP"},
+        ]
+        response = self.client.post('/external/convert/', {"items": items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['date'], '2026-10-15')
+        results = response.data['results']
+        self.assertEqual(results[0]['converted'], '108.45')
+        # 19.99 * 149.7925311 = 2994.35... -> 0 decimale pour le yen
+        self.assertEqual(results[1], {
+            "amount": "19.99", "from": "USD", "to": "JPY", "rate": "149.7925311", "converted": "2994",
+        })
+        self.assertEqual(results[2]['converted'], '0.01')
+        self.assertEqual(self.upstream.hits, [])
+
+    def test_thousands_of_items_in_one_request(self):
+        items = [{"amount": i, "from": "GBP", "to": "EUR"} for i in range(5000)]
+        response = self.client.post('/external/convert/', {"items": items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5000)
+
+        items.append(items[0])
+        response = self.client.post('/external/convert/', {"items": items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_items_reported_by_index(self):
+        items = [
+            {"amount": "10", "from": "EUR", "to": "USD"},
+            {"amount": "abc", "from": "EUR", "to": "USD"},
+            {"amount": "10", "from": "EUR", "to": "XXX"},
+            {"amount": "NaN", "from": "EUR", "to": "USD"},
+            "EUR",
+        ]
+        response = self.client.post('/external/convert/', {"items": items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sorted(response.data['items']), [1, 2, 3, 4])
+
+        response = self.client.post('/external/convert/', {"items": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Devise acceptee mais absente de la table de reference
+        response = self.client.post(
+            '/external/convert/', {"items": [{"amount": 1, "from": "EUR", "to": "SEK"}]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'], {0: "Taux indisponible"})
+
+    def test_unavailable_without_snapshot(self):
+        RateSnapshot.objects.all().delete()
+        response = self.client.post(
+            '/external/convert/', {"items": [{"amount": 1, "from": "EUR", "to": "USD"}]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class CatalogImportTests(ExternalTestCase):
+    """Tests de l'import du catalogue FakeStore"""
+
+    def setUp(self):
+        super().setUp()
+        self.upstream.routes['/products'] = [
+            {"id": 1, "title": "Sac a dos", "description": "Sac", "price": 109.95, "image": "https://img/1.jpg"},
+            {"id": 2, "title": " T-shirt ", "description": "Coton", "price": "22.3", "image": "https://img/2.jpg"},
+            {"id": 2, "title": "T-shirt", "description": "Coton bio", "price": 22.3, "image": "https://img/2.jpg"},
+            {"id": 3, "title": "", "price": 10},
+            {"id": 4, "title": "Prix invalide", "price": "abc"},
+        ]
+
+    def _import(self):
+        out = StringIO()
+        call_command('import_fakestore', stdout=out)
+        return out.getvalue()
+
+    def test_import_normalizes_and_dedups(self):
+        output = self._import()
+        self.assertIn('5 produits recus: 2 crees, 0 mis a jour, 0 inchanges, 2 invalides, 1 doublons', output)
+        product = Product.objects.get(external_source='fakestore', external_id='2')
+        self.assertEqual((product.title, product.description, product.price), ('T-shirt', 'Coton bio', Decimal('22.30')))
+        self.assertEqual(product.stock, 0)
+
+    def test_reimport_writes_only_changed_rows(self):
+        self._import()
+        Product.objects.filter(external_id='1').update(stock=7)
+        before = dict(Product.objects.values_list('external_id', 'updated_at'))
+
+        self.upstream.routes['/products'][0]['price'] = 99.5
+        with self.assertNumQueries(4):
+            # SELECT des existants, UPDATE du seul produit modifie, savepoint/commit
+            output = self._import()
+        self.assertIn('0 crees, 1 mis a jour, 1 inchanges', output)
+        product = Product.objects.get(external_id='1')
+        self.assertEqual((product.price, product.stock), (Decimal('99.50'), 7))
+        self.assertEqual(Product.objects.get(external_id='2').updated_at, before['2'])
+
+    def test_products_served_from_imported_copy(self):
+        """L'endpoint pagine la copie locale, sans appel amont"""
+        self._import()
+        Product.objects.create(title="Produit local", description="", price=1)
+        hits = len(self.upstream.hits)
+        self.upstream.fail_next = 100
+
+        response = self.client.get('/external/products/', {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['external_id'], '1')
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(len(self.upstream.hits), hits)
+
+    def test_upstream_unavailable(self):
+        self.upstream.fail_next = 100
+        with self.assertRaises(CommandError):
+            self._import()
+        self.assertFalse(Product.objects.exists())
+
+
+class GeocodeCacheTests(ExternalTestCase):
+    """Tests du cache du localisateur de magasins"""
+
+    def setUp(self):
+        super().setUp()
+        self.upstream.routes['/search'] = [
+            {"lat": "48.85", "lon": "2.35", "display_name": "Rue de Rivoli, Paris", "type": "supermarket"},
+        ]
+
+    def test_repeated_city_lookups_stay_in_process(self):
+        """Apres le premier appel, 'Paris' et ses variantes ne quittent plus le processus"""
+        for city in ('Paris', ' paris ', 'PARIS'):
+            response = self.client.get('/external/stores/', {'city': city})
+            self.assertEqual(response.data['count'], 1)
+        self.assertEqual(len(self.upstream.hits), 1)
+        self.assertEqual(GeocodeEntry.objects.get().key, 'city:paris')
+        self.assertEqual(geocode.stats()['memory_hits'], 2)
+        self.assertEqual(geocode.normalize_city('  Saint-Étienne '), 'saint etienne')
+
+        # Worker sans cache memoire: la base sert le resultat
+        geocode.reset()
+        self.client.get('/external/stores/', {'city': 'Paris'})
+        self.assertEqual(len(self.upstream.hits), 1)
+        self.assertEqual(geocode.stats()['db_hits'], 1)
+
+    def test_long_city_name_hashed_into_key(self):
+        """Un nom de ville plus long que GeocodeEntry.key est cache sous son empreinte"""
+        city = 'Llanfair ' * 40
+        self.assertEqual(self.client.get('/external/stores/', {'city': city}).data['count'], 1)
+        self.client.get('/external/stores/', {'city': city.upper()})
+        self.assertEqual(len(self.upstream.hits), 1)
+        key = GeocodeEntry.objects.get().key
+        self.assertTrue(key.startswith('city#'))
+        self.assertLessEqual(len(key), GeocodeEntry._meta.get_field('key').max_length)
+
+    def test_coordinates_share_grid_cell(self):
+        self.client.get('/external/stores/', {'lat': '48.8566', 'lon': '2.3522'})
+        self.client.get('/external/stores/', {'lat': '48.8601', 'lon': '2.3489'})
+        self.assertEqual(len(self.upstream.hits), 1)
+        self.client.get('/external/stores/', {'lat': '45.7640', 'lon': '4.8357'})
+        self.assertEqual(len(self.upstream.hits), 2)
+
+        response = self.client.get('/external/stores/', {'lat': '91', 'lon': '2'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_results_cached_with_negative_ttl(self):
+        self.upstream.routes['/search'] = []
+        self.client.get('/external/stores/', {'city': 'Nulle-Part'})
+        response = self.client.get('/external/stores/', {'city': 'Nulle-Part'})
+        self.assertEqual(response.data, {'count': 0, 'stores': []})
+        self.assertEqual(len(self.upstream.hits), 1)
+        entry = GeocodeEntry.objects.get()
+        self.assertLessEqual((entry.expires_at - entry.fetched_at).total_seconds(), 3600)
+
+    def test_errors_not_cached_and_expired_entries_refetched(self):
+        self.upstream.fail_next = 2
+        response = self.client.get('/external/stores/', {'city': 'Paris'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(GeocodeEntry.objects.exists())
+
+        self.assertEqual(self.client.get('/external/stores/', {'city': 'Paris'}).data['count'], 1)
+        GeocodeEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        geocode.reset()
+        self.client.get('/external/stores/', {'city': 'Paris'})
+        self.assertEqual(len(self.upstream.hits), 4)
+
+        GeocodeEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_geocode_cache', stdout=out)
+        self.assertIn('1 entrees expirees supprimees', out.getvalue())
+
+    def test_hit_ratio_exposed(self):
+        self.client.get('/external/stores/', {'city': 'Paris'})
+        self.client.get('/external/stores/', {'city': 'Paris'})
+        admin = User.objects.create_user(username='admin', email='admin@test.com', password='adminpass123', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        stats = self.client.get('/metrics/').data['geocode_cache']
+        self.assertEqual((stats['misses'], stats['memory_hits'], stats['hit_ratio']), (1, 1, 0.5))
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import ExternalProducts, Rates, Health, StoreLocator
+from .views import ExternalProducts, Rates, Convert, Health, StoreLocator
 
 urlpatterns = [
     path('products/', ExternalProducts.as_view(), name='external_products'),
     path('rates/', Rates.as_view(), name='external_rates'),
+    path('convert/', Convert.as_view(), name='external_convert'),
     path('health/', Health.as_view(), name='external_health'),
     path('stores/', StoreLocator.as_view(), name='store_locator'),
 ]
@@ -1,9 +1,16 @@
+import math
 import re
 import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.throttling import AnonRateThrottle
+from backend_py import metrics
+from backend_py.products.models import Product
+from . import catalog, convert, geocode, rates
+from .breaker import CircuitOpenError
+from .serializers import ImportedProductSerializer
 
 
 class ExternalAPIThrottle(AnonRateThrottle):
@@ -11,36 +18,37 @@ class ExternalAPIThrottle(AnonRateThrottle):
     rate = '30/min'
 
 
-VALID_CURRENCIES = {
-    'EUR', 'USD', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'NZD',
-    'CNY', 'HKD', 'SGD', 'SEK', 'NOK', 'DKK', 'PLN', 'CZK',
-    'HUF', 'RON', 'BGN', 'TRY', 'ILS', 'ZAR', 'MXN', 'BRL',
-    'INR', 'KRW', 'THB', 'MYR', 'IDR', 'PHP', 'RUB'
-}
+def _unavailable(message, exc):
+    """503; avec Retry-After si le disjoncteur du service est ouvert"""
+    response = Response({"error": message}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if isinstance(exc, CircuitOpenError):
+        response['Retry-After'] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+
+VALID_CURRENCIES = set(rates.CURRENCIES)
+
+
+class ImportedProductPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class ExternalProducts(APIView):
-    """Recupere des produits depuis une API externe"""
+    """Produits du catalogue externe, servis depuis la copie importee (`import_fakestore`)"""
     permission_classes = [permissions.AllowAny]
     throttle_classes = [ExternalAPIThrottle]
 
     def get(self, request):
-        try:
-            r = requests.get(
-                'https://fakestoreapi.com/products?limit=10',
-                timeout=10
-            )
-            r.raise_for_status()
-            return Response(r.json())
-        except requests.RequestException:
-            return Response(
-                {"error": "Service indisponible"},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
+        queryset = Product.objects.filter(external_source=catalog.SOURCE).order_by('id')
+        paginator = ImportedProductPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(ImportedProductSerializer(page, many=True).data)
 
 
 class Rates(APIView):
-    """Recupere les taux de change"""
+    """Taux de change servis depuis les snapshots locaux (voir rates.py)"""
     permission_classes = [permissions.AllowAny]
     throttle_classes = [ExternalAPIThrottle]
 
@@ -60,31 +68,28 @@ class Rates(APIView):
             )
         
         try:
-            # Utiliser l'API gratuite frankfurter.app (basée sur la BCE)
-            url = f'https://api.frankfurter.app/latest?from={base}'
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            # Reformater pour correspondre au format attendu
-            return Response({
-                "base": data.get("base", base),
-                "date": data.get("date"),
-                "rates": data.get("rates", {})
-            })
-        except requests.RequestException:
-            # Fallback avec des taux statiques si l'API est indisponible
-            fallback_rates = {
-                "EUR": {"USD": 1.08, "GBP": 0.86, "JPY": 162.5, "CHF": 0.94, "CAD": 1.47, "AUD": 1.65, "CNY": 7.82},
-                "USD": {"EUR": 0.93, "GBP": 0.79, "JPY": 150.2, "CHF": 0.87, "CAD": 1.36, "AUD": 1.53, "CNY": 7.24},
-                "GBP": {"EUR": 1.17, "USD": 1.26, "JPY": 189.8, "CHF": 1.10, "CAD": 1.72, "AUD": 1.93, "CNY": 9.15},
-            }
-            if base in fallback_rates:
-                return Response({
-                    "base": base,
-                    "date": "2025-12-11",
-                    "rates": fallback_rates[base],
-                    "note": "Taux approximatifs (API externe indisponible)"
-                })
+            # Etat local uniquement: l'amont est interroge par `refresh_rates`
+            return Response(rates.get(base))
+        except rates.RatesUnavailable:
+            return Response(
+                {"error": "Service indisponible"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+
+class Convert(APIView):
+    """Conversion de montants en lot ({"items": [{amount, from, to}, ...]})"""
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ExternalAPIThrottle]
+
+    def post(self, request):
+        try:
+            items = convert.parse(request.data.get('items') if isinstance(request.data, dict) else None)
+            # Une lecture de la matrice locale pour tout le lot
+            return Response(convert.convert(items))
+        except convert.ConversionError as exc:
+            return Response({"error": str(exc), "items": exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except rates.RatesUnavailable:
             return Response(
                 {"error": "Service indisponible"},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
@@ -99,8 +104,16 @@ class Health(APIView):
         return Response({"ok": True})
 
 
+class Metrics(APIView):
+    """Metriques du worker courant: latences et erreurs des appels externes (admins)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
 class StoreLocator(APIView):
-    """Localiser des points de retrait/magasins pres d'un lieu via OpenStreetMap"""
+    """Localiser des points de retrait/magasins pres d'un lieu via OpenStreetMap (resultats en cache, voir geocode.py)"""
     permission_classes = [permissions.AllowAny]
     throttle_classes = [ExternalAPIThrottle]
 
@@ -116,72 +129,34 @@ class StoreLocator(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if city:
+            if not geocode.normalize_city(city):
+                return Response({"error": "Ville invalide"}, status=status.HTTP_400_BAD_REQUEST)
+            key, params = geocode.city_query(city)
+        else:
+            # Valider et convertir les coordonnees
+            try:
+                lat_float = float(lat)
+                lon_float = float(lon)
+            except ValueError:
+                return Response(
+                    {"error": "Coordonnees invalides"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not (-90 <= lat_float <= 90 and -180 <= lon_float <= 180):
+                return Response(
+                    {"error": "Coordonnees invalides"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            key, params = geocode.cell_query(lat_float, lon_float)
+
         try:
-            # Utiliser l'API Nominatim d'OpenStreetMap
-            if city:
-                # Rechercher par ville
-                search_url = f'https://nominatim.openstreetmap.org/search'
-                params = {
-                    'q': f'shop in {city}',
-                    'format': 'json',
-                    'limit': 10,
-                    'addressdetails': 1
-                }
-            else:
-                # Valider et convertir les coordonnees
-                try:
-                    lat_float = float(lat)
-                    lon_float = float(lon)
-                except ValueError:
-                    return Response(
-                        {"error": "Coordonnees invalides"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Rechercher par coordonnees
-                search_url = f'https://nominatim.openstreetmap.org/search'
-                params = {
-                    'q': 'shop',
-                    'format': 'json',
-                    'limit': 10,
-                    'addressdetails': 1,
-                    'viewbox': f'{lon_float-0.1},{lat_float-0.1},{lon_float+0.1},{lat_float+0.1}',
-                    'bounded': 1
-                }
-            
-            headers = {
-                'User-Agent': 'E-Commerce-API/1.0 (Educational Project)'
-            }
-            
-            r = requests.get(
-                search_url,
-                params=params,
-                headers=headers,
-                timeout=10
-            )
-            r.raise_for_status()
-            data = r.json()
-            
-            # Formater les resultats
-            stores = []
-            for item in data:
-                # Utiliser le type ou category pour le nom si disponible, sinon display_name
-                name = item.get('namedetails', {}).get('name') or item.get('type', 'Magasin')
-                stores.append({
-                    'name': name,
-                    'lat': item.get('lat'),
-                    'lon': item.get('lon'),
-                    'address': item.get('display_name'),
-                    'type': item.get('type', 'shop')
-                })
-            
-            return Response({
-                'count': len(stores),
-                'stores': stores
-            })
-            
-        except requests.RequestException:
-            return Response(
-                {"error": "Service de geolocalisation indisponible"},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
+            # Cache memoire puis base; Nominatim seulement en cas d'absence
+            stores = geocode.search(key, params)
+        except requests.RequestException as exc:
+            return _unavailable("Service de geolocalisation indisponible", exc)
+
+        return Response({
+            'count': len(stores),
+            'stores': stores
+        })
@@ -10,9 +10,12 @@ import graphene
 from graphene_django import DjangoObjectType
 from graphene_django.filter import DjangoFilterConnectionField
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import serializers
 
 from backend_py.products.models import Product
 from backend_py.orders.models import Order, OrderItem
+from backend_py.orders import checkout, customer_stats
 from backend_py.cart.models import CartItem
 from backend_py.reviews.models import Review
 
@@ -23,13 +26,29 @@ User = get_user_model()
 # TYPES GRAPHQL
 # ========================================
 
+class OrderStatsType(graphene.ObjectType):
+    """Statistiques de commandes d'un client"""
+    order_count = graphene.Int()
+    lifetime_spend = graphene.Decimal()
+    last_order_at = graphene.DateTime()
+
+
 class UserType(DjangoObjectType):
     """Type GraphQL pour les utilisateurs"""
+    order_stats = graphene.Field(OrderStatsType)
+
     class Meta:
         model = User
         # Ne pas exposer le mot de passe ! On liste explicitement les champs autorisés
         fields = ("id", "username", "email")
 
+    def resolve_order_stats(self, info):
+        # Sécurité: visibles uniquement par l'utilisateur lui-même ou un admin
+        viewer = info.context.user
+        if viewer.is_anonymous or (viewer.pk != self.pk and not viewer.is_staff):
+            return None
+        return customer_stats.for_user(self)
+
 
 class ProductType(DjangoObjectType):
     """Type GraphQL pour les produits"""
@@ -228,35 +247,22 @@ class CreateOrder(graphene.Mutation):
             return CreateOrder(success=False, message="Authentification requise")
         
         cart_items = CartItem.objects.filter(user=user)
-        if not cart_items.exists():
+        items = [{'product_id': item.product_id, 'quantity': item.quantity} for item in cart_items]
+        if not items:
             return CreateOrder(success=False, message="Panier vide")
         
-        # Calculer le total et vérifier le stock
-        total = 0
-        for item in cart_items:
-            if item.product.stock < item.quantity:
-                return CreateOrder(
-                    success=False, 
-                    message=f"Stock insuffisant pour {item.product.title}"
-                )
-            total += item.product.price * item.quantity
-        
-        # Créer la commande
-        order = Order.objects.create(user=user, total=total, status='pending')
-        
-        # Créer les items et décrémenter le stock
-        for item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price * item.quantity
-            )
-            item.product.stock -= item.quantity
-            item.product.save()
-        
-        # Vider le panier
-        cart_items.delete()
+        try:
+            with transaction.atomic():
+                # Meme parcours que POST /orders/: stock verrouille, reservations
+                # des autres deduites, celles de l'acheteur consommees
+                products = checkout.lock_products(item['product_id'] for item in items)
+                order, touched = checkout.place_order(user, items, products)
+                checkout.save_stock(touched)
+                
+                # Vider le panier
+                cart_items.delete()
+        except serializers.ValidationError as exc:
+            return CreateOrder(success=False, message=str(exc.detail[0]))
         
         return CreateOrder(order=order, success=True, message="Commande créée")
 
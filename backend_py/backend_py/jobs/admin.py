@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Administration des taches (inspection des dead letters)"""
+    list_display = ['id', 'name', 'status', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedup_key', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'locked_by', 'locked_at', 'last_error']
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend_py.jobs'
+
+    def ready(self):
+        # Enregistre les taches declarees dans les modules `jobs.py` des apps
+        autodiscover_modules('jobs')
@@ -0,0 +1,94 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from backend_py.jobs import worker
+
+
+class Command(BaseCommand):
+    help = "Execute les taches differees (file en base), avec concurrence bornee"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Taches executees en parallele")
+        parser.add_argument("--poll", type=float, default=1.0, help="Pause (s) quand la file est vide")
+        parser.add_argument("--once", action="store_true", help="Vider la file puis s'arreter")
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=600,
+            help="Duree (s) apres laquelle une tache `running` est consideree abandonnee",
+        )
+        parser.add_argument("--requeue-dead", action="store_true", help="Relancer les taches en dead letter")
+        parser.add_argument("--prune-days", type=int, default=None, help="Supprimer les taches terminees")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency doit etre positif")
+
+        if options["requeue_dead"]:
+            self.stdout.write(f"{worker.requeue_dead()} taches relancees")
+        if options["prune_days"] is not None:
+            self.stdout.write(f"{worker.prune(timedelta(days=options['prune_days']))} taches supprimees")
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        visibility = timedelta(seconds=options["visibility_timeout"])
+        lock = threading.Lock()
+        in_flight = 0
+        counts = {}
+
+        def run(job):
+            nonlocal in_flight
+            try:
+                result = worker.execute(job)
+            finally:
+                connection.close()
+            with lock:
+                in_flight -= 1
+                counts[result] = counts.get(result, 0) + 1
+
+        if options["concurrency"] == 1:
+            # Execution dans le thread principal, sans pool
+            while True:
+                close_old_connections()
+                worker.requeue_stale(visibility)
+                jobs = worker.claim(worker_id, 1)
+                for job in jobs:
+                    result = worker.execute(job)
+                    counts[result] = counts.get(result, 0) + 1
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+            self._summary(counts)
+            return
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            while True:
+                close_old_connections()
+                worker.requeue_stale(visibility)
+
+                # Ne reserver que ce que les threads libres peuvent executer
+                with lock:
+                    free = options["concurrency"] - in_flight
+                jobs = worker.claim(worker_id, free) if free > 0 else []
+                for job in jobs:
+                    with lock:
+                        in_flight += 1
+                    pool.submit(run, job)
+
+                if not jobs:
+                    with lock:
+                        idle = in_flight == 0
+                    if options["once"] and idle:
+                        break
+                    time.sleep(options["poll"])
+
+        self._summary(counts)
+
+    def _summary(self, counts):
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "aucune tache"
+        self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
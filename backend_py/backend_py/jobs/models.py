@@ -0,0 +1,38 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Job(models.Model):
+    """Tache differee, executee par `run_jobs`"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    DEAD = "dead"
+    STATUSES = [
+        (QUEUED, "En attente"),
+        (RUNNING, "En cours"),
+        (DONE, "Terminee"),
+        (DEAD, "Abandonnee (dead letter)"),
+    ]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField()
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["dedup_key", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,62 @@
+"""
+Declaration et mise en file des taches.
+
+    @job(max_attempts=5)
+    def send_confirmation(order_id):
+        ...
+
+    send_confirmation.delay(order_id=order.id)
+
+`delay` insere la tache dans la transaction courante: elle n'est visible
+par les workers qu'apres le COMMIT, et disparait si la transaction est
+annulee. Les arguments doivent etre serialisables en JSON.
+"""
+from datetime import timedelta
+from django.utils import timezone
+from .models import Job
+
+_registry = {}
+
+
+class JobSpec:
+    def __init__(self, name, func, max_attempts, backoff_seconds):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+
+def job(name=None, max_attempts=5, backoff_seconds=5):
+    """Declare une tache executable par le worker et lui ajoute `.delay(**kwargs)`"""
+    def decorator(func):
+        spec = JobSpec(name or f"{func.__module__}.{func.__name__}", func, max_attempts, backoff_seconds)
+        _registry[spec.name] = spec
+
+        def delay(dedup_key=None, countdown=0, **kwargs):
+            return enqueue(spec.name, kwargs, dedup_key=dedup_key, countdown=countdown)
+
+        func.job_name = spec.name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def get(name):
+    return _registry.get(name)
+
+
+def enqueue(name, payload=None, dedup_key=None, countdown=0):
+    """
+    Ajoute une tache a la file. Avec `dedup_key`, la tache n'est pas ajoutee
+    si une tache de meme cle attend deja.
+    """
+    if dedup_key and Job.objects.filter(dedup_key=dedup_key, status=Job.QUEUED).exists():
+        return None
+    spec = _registry.get(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=spec.max_attempts if spec else 5,
+        run_after=timezone.now() + timedelta(seconds=countdown),
+        dedup_key=dedup_key,
+    )
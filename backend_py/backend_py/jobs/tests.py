@@ -0,0 +1,87 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+from .models import Job
+from .registry import job
+from . import worker
+
+CALLS = []
+
+
+@job(name='tests.record', max_attempts=3, backoff_seconds=1)
+def record(value):
+    CALLS.append(value)
+
+
+@job(name='tests.fail', max_attempts=2, backoff_seconds=1)
+def fail():
+    raise RuntimeError("echec")
+
+
+class JobPipelineTests(TestCase):
+    """Tests pour la file de taches en base"""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def _claim_one(self):
+        Job.objects.filter(status=Job.QUEUED).update(run_after=timezone.now())
+        jobs = worker.claim('test-worker', 10)
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def test_delay_is_transactional(self):
+        """Une tache mise en file dans une transaction annulee disparait avec elle"""
+        try:
+            with transaction.atomic():
+                record.delay(value=1)
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+        record.delay(value=2)
+        self.assertEqual(Job.objects.get().payload, {'value': 2})
+
+    def test_dedup_key(self):
+        """Une tache de meme cle deja en attente n'est pas dupliquee"""
+        record.delay(value=1, dedup_key='k')
+        record.delay(value=1, dedup_key='k')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_success(self):
+        record.delay(value=42)
+        self.assertEqual(worker.execute(self._claim_one()), Job.DONE)
+        self.assertEqual(CALLS, [42])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_retry_with_backoff_then_dead_letter(self):
+        """Un echec est retente plus tard, puis abandonne apres max_attempts"""
+        fail.delay()
+
+        self.assertEqual(worker.execute(self._claim_one()), Job.QUEUED)
+        queued = Job.objects.get()
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreater(queued.run_after, timezone.now())
+        self.assertIn('RuntimeError', queued.last_error)
+
+        self.assertEqual(worker.execute(self._claim_one()), Job.DEAD)
+        self.assertEqual(Job.objects.get().status, Job.DEAD)
+
+        self.assertEqual(worker.requeue_dead(), 1)
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_claim_is_exclusive(self):
+        """Une tache reservee n'est pas reservee une seconde fois"""
+        record.delay(value=1)
+        self.assertEqual(len(worker.claim('a', 10)), 1)
+        self.assertEqual(worker.claim('b', 10), [])
+
+    def test_run_jobs_command(self):
+        for i in range(3):
+            record.delay(value=i)
+        call_command('run_jobs', once=True, concurrency=1, poll=0.01, stdout=StringIO())
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
@@ -0,0 +1,91 @@
+"""
+Execution des taches: reservation par lots, nouvelles tentatives avec
+backoff exponentiel et dead letter apres `max_attempts` echecs.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+def claim(worker_id, limit):
+    """Reserve jusqu'a `limit` taches pretes pour ce worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # La condition sur le statut evite une double reservation sans SKIP LOCKED (SQLite)
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+        )
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker_id, locked_at=now))
+
+
+def backoff(spec, attempts):
+    """Delai avant la prochaine tentative: exponentiel, plafonne, avec jitter"""
+    base = spec.backoff_seconds if spec else 5
+    delay = min(base * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def execute(job):
+    """Execute une tache reservee et enregistre son resultat"""
+    spec = registry.get(job.name)
+    if spec is None:
+        Job.objects.filter(pk=job.pk).update(status=Job.DEAD, last_error="Tache inconnue", locked_by='')
+        return Job.DEAD
+
+    try:
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            logger.error("Tache %s #%s abandonnee apres %s tentatives", job.name, job.id, job.attempts)
+            Job.objects.filter(pk=job.pk).update(status=Job.DEAD, last_error=error, locked_by='')
+            return Job.DEAD
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED,
+            last_error=error,
+            locked_by='',
+            run_after=timezone.now() + backoff(spec, job.attempts),
+        )
+        return Job.QUEUED
+
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, last_error='', locked_by='')
+    return Job.DONE
+
+
+def requeue_stale(visibility_timeout):
+    """Remet en file les taches restees `running` (worker arrete en cours d'execution)"""
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=timezone.now() - visibility_timeout
+    ).update(status=Job.QUEUED, locked_by='', run_after=timezone.now())
+
+
+def requeue_dead(name=None):
+    """Relance les taches en dead letter"""
+    dead = Job.objects.filter(status=Job.DEAD)
+    if name:
+        dead = dead.filter(name=name)
+    return dead.update(status=Job.QUEUED, attempts=0, run_after=timezone.now())
+
+
+def prune(older_than):
+    """Supprime les taches terminees plus anciennes que `older_than`"""
+    deleted, _ = Job.objects.filter(status=Job.DONE, updated_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,115 @@
+"""
+Metriques en memoire du processus (histogrammes de latence, compteurs).
+
+Chaque worker gunicorn a son propre registre: /metrics/ expose celui du
+worker qui repond. Suffisant pour comparer des latences ou suivre des taux
+d'erreur; un agregateur externe reste necessaire pour des vues globales.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Bornes superieures (secondes) des seaux des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+# Fonctions appelees a chaque snapshot (etat calcule a la demande: pools, disjoncteurs...)
+_collectors = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Histogram:
+    """Repartition d'observations par seaux cumulables, avec somme et nombre"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Borne superieure du seau contenant le quantile q (approximation)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def increment(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timed(name, **labels):
+    """Mesure la duree du bloc dans l'histogramme `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def register_collector(name, func):
+    """Ajoute `func()` au snapshot sous la cle `name`"""
+    _collectors[name] = func
+
+
+def snapshot():
+    """Etat courant: {"histograms": [...], "counters": [...]} avec leurs labels, plus les collecteurs"""
+    with _lock:
+        data = {
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.as_dict()}
+                for (name, labels), histogram in sorted(_histograms.items())
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_counters.items())
+            ],
+        }
+    for name, func in sorted(_collectors.items()):
+        data[name] = func()
+    return data
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
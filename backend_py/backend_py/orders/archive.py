@@ -0,0 +1,122 @@
+"""
+Archivage des commandes terminees.
+
+Les commandes livrees ou annulees plus anciennes qu'un seuil sont deplacees
+par lots vers ArchivedOrder/ArchivedOrderItem (partitionnee par mois sous
+PostgreSQL, simple table sous SQLite). Les lectures ne consultent
+l'archive que si la plage demandee commence avant `archived_before`.
+"""
+from datetime import timezone as dt_timezone
+from django.db import connection, transaction
+from . import rollups
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem, OrderArchiveState
+
+FINAL_STATUSES = ('delivered', 'cancelled')
+
+
+def _month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(start):
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def ensure_partitions(created_ats):
+    """Cree les partitions mensuelles necessaires (PostgreSQL uniquement)"""
+    if connection.vendor != 'postgresql':
+        return
+    table = ArchivedOrder._meta.db_table
+    with connection.cursor() as cursor:
+        for start in sorted({_month_start(value) for value in created_ats}):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}_p{start:%Y%m}" '
+                f'PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                [start, _next_month(start)]
+            )
+
+
+def archived_before():
+    """Date avant laquelle des commandes peuvent etre archivees (ou None)"""
+    return OrderArchiveState.objects.filter(pk=1).values_list('archived_before', flat=True).first()
+
+
+def _advance_watermark(cutoff):
+    state, _ = OrderArchiveState.objects.select_for_update().get_or_create(pk=1)
+    if state.archived_before is None or state.archived_before < cutoff:
+        state.archived_before = cutoff
+        state.save()
+
+
+@transaction.atomic
+def archive_batch(cutoff, batch_size):
+    """
+    Deplace un lot de commandes terminees anterieures a `cutoff`.
+    Leve RebuildInProgress pendant une reconstruction des agregats.
+    """
+    rollups.lock_out_rebuild()
+    rows = list(
+        Order.objects.select_for_update()
+        .filter(status__in=FINAL_STATUSES, created_at__lt=cutoff)
+        .order_by('id')
+        .values(
+            'id', 'user_id', 'total', 'status', 'created_at',
+            'payment_intent_id', 'payment_client_secret', 'payment_amount',
+        )[:batch_size]
+    )
+    if not rows:
+        return 0
+    ids = [row['id'] for row in rows]
+
+    ensure_partitions(row['created_at'] for row in rows)
+    ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in rows])
+    items = OrderItem.objects.filter(order_id__in=ids).values('id', 'order_id', 'product_id', 'quantity', 'price')
+    ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+
+    OrderItem.objects.filter(order_id__in=ids).delete()
+    Order.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(cutoff, batch_size=1000, dry_run=False, stdout=None):
+    """Archive toutes les commandes terminees anterieures a `cutoff`, par lots"""
+    candidates = Order.objects.filter(status__in=FINAL_STATUSES, created_at__lt=cutoff)
+    if dry_run:
+        return candidates.count()
+
+    # Publier la borne avant de deplacer: les lectures consultent l'archive
+    # des qu'une commande peut s'y trouver
+    with transaction.atomic():
+        _advance_watermark(cutoff)
+
+    moved = 0
+    while True:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        if stdout is not None:
+            stdout.write(f"  {moved} commandes archivees")
+    return moved
+
+
+def archived_orders(user, created_after=None, created_before=None):
+    """
+    Commandes archivees visibles par `user` dans la plage demandee,
+    ou None si la plage ne peut pas toucher l'archive.
+    """
+    boundary = archived_before()
+    if boundary is None or (created_after is not None and created_after >= boundary):
+        return None
+
+    queryset = ArchivedOrder.objects.all()
+    if not user.is_staff:
+        queryset = queryset.filter(user=user)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset.prefetch_related('items__product').order_by('-created_at')
@@ -0,0 +1,131 @@
+"""
+Creation de commande a partir d'items valides.
+
+Utilise par OrderCreateSerializer (une commande par transaction) et par le
+committer de groupe (plusieurs commandes par transaction, voir
+group_commit.py). Le stock des produits en mode row est decremente en
+memoire puis ecrit une seule fois par produit avec `save_stock`.
+Les reservations actives des autres utilisateurs (cart.reservations) sont
+deduites du stock disponible; celles de l'acheteur sont consommees. En mode
+slotted, les unites reservees sont deja hors des compteurs: seul le
+complement est decremente.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from backend_py.products.models import Product
+from backend_py.products import inventory
+from backend_py.cart import reservations
+from . import lifecycle
+from .models import Order, OrderItem
+
+
+def lock_products(product_ids):
+    """
+    Charge les produits et verrouille ceux en mode row, dans l'ordre des ids.
+    Les produits en mode slotted ne verrouillent pas leur ligne (voir products.inventory).
+    """
+    product_ids = sorted(set(product_ids))
+    products = Product.objects.in_bulk(product_ids)
+    row_ids = [pid for pid in product_ids if pid in products and products[pid].inventory_mode == Product.INVENTORY_ROW]
+    products.update(
+        (product.id, product)
+        for product in Product.objects.select_for_update().filter(id__in=row_ids).order_by('id')
+    )
+    return products
+
+
+def save_stock(products):
+    """Ecrit le stock des produits en mode row (un UPDATE par produit)"""
+    now = timezone.now()
+    rows = [p for p in products if p.inventory_mode == Product.INVENTORY_ROW]
+    for product in rows:
+        product.updated_at = now
+    Product.objects.bulk_update(rows, ['stock', 'updated_at'])
+
+
+@transaction.atomic
+def place_order(user, items_data, products):
+    """
+    Sécurité: Création atomique avec vérification du stock.
+    `products` provient de lock_products; le stock des produits row est
+    decremente en memoire seulement si la commande aboutit.
+    Retourne (order, produits touches).
+    """
+    # Traiter les produits dans l'ordre des ids: ordre de verrouillage stable entre commandes
+    items_data = sorted(items_data, key=lambda item: item['product_id'])
+
+    for item_data in items_data:
+        if item_data['product_id'] not in products:
+            raise serializers.ValidationError(f"Produit {item_data['product_id']} introuvable.")
+
+    # Sécurité: Vérifier le stock disponible des produits row avant toute modification,
+    # hors quantites reservees par d'autres utilisateurs
+    reserved = reservations.reserved_quantities(
+        [item_data['product_id'] for item_data in items_data], exclude_user=user
+    )
+    for item_data in items_data:
+        product = products[item_data['product_id']]
+        if product.inventory_mode != Product.INVENTORY_ROW:
+            continue
+        available = product.stock - reserved.get(product.id, 0)
+        if available < item_data['quantity']:
+            raise serializers.ValidationError(
+                f"Stock insuffisant pour {product.title}. Disponible: {max(available, 0)}"
+            )
+
+    # Les reservations de l'acheteur sont converties en decrement de stock
+    held = reservations.consume(user, [item_data['product_id'] for item_data in items_data])
+
+    total = 0
+    order_items = []
+
+    for item_data in items_data:
+        product = products[item_data['product_id']]
+        quantity = item_data['quantity']
+
+        if product.inventory_mode == Product.INVENTORY_SLOTTED:
+            # Décrément conditionnel sur un compteur: pas de survente possible.
+            # Les unites reservees par l'acheteur sont deja retirees des compteurs
+            extra = quantity - held.get(product.id, 0)
+            try:
+                if extra > 0:
+                    inventory.decrement_slotted(product.id, extra)
+                elif extra < 0:
+                    inventory.restock_slotted(product.id, -extra)
+            except inventory.InsufficientStock as exc:
+                raise serializers.ValidationError(
+                    f"Stock insuffisant pour {product.title}. "
+                    f"Disponible: {exc.available + held.get(product.id, 0)}"
+                )
+
+        # Sécurité: Calculer le prix côté serveur (ne jamais faire confiance au client)
+        item_price = product.price * quantity
+        total += item_price
+
+        order_items.append({
+            'product': product,
+            'quantity': quantity,
+            'price': item_price
+        })
+
+    # Créer la commande
+    order = Order.objects.create(user=user, total=total, status='pending')
+
+    # Créer les items
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=item['product'], quantity=item['quantity'], price=item['price'])
+        for item in order_items
+    ])
+
+    lifecycle.order_created(
+        order,
+        [(item['product'].id, item['quantity'], item['price']) for item in order_items]
+    )
+
+    # Diminuer le stock (en memoire, ecrit par save_stock)
+    for item in order_items:
+        if item['product'].inventory_mode == Product.INVENTORY_ROW:
+            item['product'].stock -= item['quantity']
+
+    return order, [item['product'] for item in order_items]
@@ -0,0 +1,85 @@
+"""
+Statistiques de commandes par client (nombre, depenses, derniere commande).
+
+Mises a jour dans la transaction de creation et de changement de statut
+(via lifecycle), pour que le profil soit servi en une lecture de ligne
+quel que soit l'historique du client. Les commandes annulees ne sont pas
+comptees; `last_order_at` est la date de la derniere commande passee.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Order, ArchivedOrder, UserOrderStats
+from .rollups import CANCELLED, _increment
+
+
+def _apply(user_id, count, spend, last_order_at=None):
+    """UPDATE incremental de la ligne du client, creee si absente"""
+    latest = {'last_order_at': last_order_at} if last_order_at is not None else None
+    _increment(UserOrderStats, {'user_id': user_id},
+               {'order_count': count, 'lifetime_spend': spend}, latest=latest)
+
+
+def record_order(order):
+    """Ajoute une commande qui vient d'etre creee"""
+    _apply(order.user_id, 1, order.total, order.created_at)
+
+
+def apply_status_change(queryset, source, target):
+    """Retire (annulation) ou reintegre (sortie d'annulation) des commandes, une requete par client"""
+    if source != CANCELLED and target == CANCELLED:
+        sign = -1
+    elif source == CANCELLED and target != CANCELLED:
+        sign = 1
+    else:
+        return
+    per_user = queryset.order_by().values('user_id').annotate(count=Count('id'), spend=Sum('total'))
+    for row in per_user.order_by('user_id'):
+        _apply(row['user_id'], sign * row['count'], sign * row['spend'])
+
+
+def for_user(user):
+    """Statistiques du client (zeros s'il n'a jamais commande)"""
+    return UserOrderStats.objects.filter(user=user).first() or UserOrderStats(user=user)
+
+
+def rebuild(user_ids=None, chunk_size=1000, stdout=None):
+    """
+    Recalcule les statistiques depuis les commandes et l'archive,
+    par tranches de clients. Les lignes de la tranche sont verrouillees
+    avant le calcul: une commande concurrente attend la fin de la tranche
+    puis applique son increment sur la valeur recalculee.
+    """
+    if user_ids is None:
+        user_ids = set(Order.objects.values_list('user_id', flat=True).distinct())
+        user_ids.update(ArchivedOrder.objects.values_list('user_id', flat=True).distinct())
+    user_ids = sorted(set(user_ids))
+    kept = ~Q(status=CANCELLED)
+
+    processed = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        totals = {user_id: [0, 0, None] for user_id in chunk}
+        with transaction.atomic():
+            list(UserOrderStats.objects.select_for_update().filter(user_id__in=chunk).values_list('pk'))
+            for model in (Order, ArchivedOrder):
+                rows = model.objects.filter(user_id__in=chunk).values('user_id').annotate(
+                    last=Max('created_at'),
+                    count=Count('id', filter=kept),
+                    spend=Coalesce(Sum('total', filter=kept), Value(0), output_field=DecimalField()),
+                )
+                for row in rows.order_by():
+                    entry = totals[row['user_id']]
+                    entry[0] += row['count']
+                    entry[1] += row['spend']
+                    if entry[2] is None or row['last'] > entry[2]:
+                        entry[2] = row['last']
+            UserOrderStats.objects.filter(user_id__in=chunk).delete()
+            UserOrderStats.objects.bulk_create([
+                UserOrderStats(user_id=user_id, order_count=count, lifetime_spend=spend, last_order_at=last)
+                for user_id, (count, spend, last) in totals.items()
+            ])
+        processed += len(chunk)
+        if stdout:
+            stdout.write(f"{processed}/{len(user_ids)} clients")
+    return processed
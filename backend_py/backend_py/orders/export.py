@@ -0,0 +1,81 @@
+"""
+Export comptable des commandes (une ligne par article).
+
+Les lignes sont lues par tranches (`iterator`, curseur cote serveur sous
+PostgreSQL) avec une seule jointure Order/OrderItem/Product, puis
+serialisees au fil de l'eau: la memoire reste constante quelle que soit
+la periode exportee. Les commandes archivees sont ajoutees apres les
+commandes courantes lorsque la plage peut toucher l'archive.
+"""
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import OrderItem, ArchivedOrderItem
+from . import archive
+
+COLUMNS = (
+    'order_id', 'user_id', 'status', 'order_total', 'created_at',
+    'item_id', 'product_id', 'product_title', 'quantity', 'price',
+)
+_FIELDS = (
+    'order_id', 'order__user_id', 'order__status', 'order__total', 'order__created_at',
+    'id', 'product_id', 'product__title', 'quantity', 'price',
+)
+
+
+def _lines(model, created_after, created_before, statuses, chunk_size):
+    queryset = model.objects.all()
+    if created_after is not None:
+        queryset = queryset.filter(order__created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(order__created_at__lt=created_before)
+    if statuses:
+        queryset = queryset.filter(order__status__in=statuses)
+    return queryset.order_by('order__created_at', 'order_id', 'id').values_list(*_FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+
+
+def rows(created_after=None, created_before=None, statuses=None, chunk_size=2000):
+    """Lignes (tuples dans l'ordre de COLUMNS) des commandes courantes puis archivees"""
+    yield from _lines(OrderItem, created_after, created_before, statuses, chunk_size)
+    boundary = archive.archived_before()
+    if boundary is not None and (created_after is None or created_after < boundary):
+        yield from _lines(ArchivedOrderItem, created_after, created_before, statuses, chunk_size)
+
+
+class _Buffer:
+    """Pseudo-fichier pour csv.writer: renvoie la ligne au lieu de l'ecrire"""
+
+    def write(self, value):
+        return value
+
+
+def _batched(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_stream(lines, batch_size=500):
+    writer = csv.writer(_Buffer())
+    yield writer.writerow(COLUMNS)
+    yield from _batched((writer.writerow(row) for row in lines), batch_size)
+
+
+def ndjson_stream(lines, batch_size=500):
+    yield from _batched(
+        (json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder) + '\n' for row in lines),
+        batch_size
+    )
+
+
+FORMATS = {
+    'csv': (csv_stream, 'text/csv', 'csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson', 'ndjson'),
+}
@@ -0,0 +1,148 @@
+"""
+Commit de groupe des commandes (mode optionnel pour les pics de trafic).
+
+Les requetes POST /orders/ deposent leurs items dans une file; un thread
+committer regroupe jusqu'a MAX_BATCH requetes (ou attend au plus
+MAX_WAIT_MS) et les traite dans une seule transaction: les produits
+concernes sont verrouilles une fois, chaque commande est creee dans son
+propre savepoint (un refus n'echoue que la requete concernee) et le stock
+est ecrit une fois par produit. Chaque requete HTTP attend son Future,
+resolu apres le COMMIT. Une requete abandonnee sur timeout avant d'etre
+prise dans un lot est annulee: la commande n'est pas creee.
+
+Le regroupement suppose plusieurs requetes simultanees par processus
+(gunicorn `gthread` ou ASGI): avec des workers `sync`, les lots ont une
+seule commande.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from . import checkout
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutRequest:
+    def __init__(self, user, items):
+        self.user = user
+        self.items = items
+        self.future = Future()
+
+
+class GroupCommitter:
+    def __init__(self, max_batch=32, max_wait_ms=5):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, user, items):
+        """Ajoute une commande a la file; retourne un Future (order)"""
+        self._ensure_started()
+        request = CheckoutRequest(user, items)
+        self.queue.put(request)
+        return request.future
+
+    def _ensure_started(self):
+        # Demarrage paresseux: le thread est cree dans le worker, apres le fork
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="order-group-commit", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            try:
+                self.process(batch)
+            except Exception:
+                logger.exception("Echec du commit de groupe")
+            finally:
+                close_old_connections()
+
+    def process(self, batch):
+        """Traite un lot de commandes dans une seule transaction"""
+        # Ignorer les requetes annulees (client deja repondu sur timeout)
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            with transaction.atomic():
+                products = checkout.lock_products(
+                    item['product_id'] for request in batch for item in request.items
+                )
+                touched = {}
+                for request in batch:
+                    # Stock en memoire a restaurer si la commande est refusee
+                    snapshot = {pid: product.stock for pid, product in products.items()}
+                    try:
+                        order, order_products = checkout.place_order(request.user, request.items, products)
+                    except Exception as exc:
+                        for pid, stock in snapshot.items():
+                            products[pid].stock = stock
+                        results.append((request, None, exc))
+                        continue
+                    touched.update((product.id, product) for product in order_products)
+                    results.append((request, order, None))
+                checkout.save_stock(touched.values())
+        except Exception as exc:
+            # Le COMMIT a echoue: aucune commande du lot n'existe
+            for request in batch:
+                request.future.set_exception(exc)
+            raise
+
+        for request, order, exc in results:
+            if exc is not None:
+                request.future.set_exception(exc)
+            else:
+                request.future.set_result(order)
+
+
+_committer = None
+_committer_lock = threading.Lock()
+
+
+def get_committer():
+    """Committer du processus, configure par settings.ORDER_GROUP_COMMIT"""
+    global _committer
+    with _committer_lock:
+        if _committer is None:
+            config = settings.ORDER_GROUP_COMMIT
+            _committer = GroupCommitter(config["MAX_BATCH"], config["MAX_WAIT_MS"])
+        return _committer
+
+
+def enabled():
+    return settings.ORDER_GROUP_COMMIT["ENABLED"]
+
+
+def submit_and_wait(user, items):
+    """Soumet la commande au committer et attend le resultat; leve TimeoutError si elle est annulee"""
+    future = get_committer().submit(user, items)
+    try:
+        return future.result(timeout=settings.ORDER_GROUP_COMMIT["RESULT_TIMEOUT"])
+    except FutureTimeout:
+        if future.cancel():
+            raise
+        # Deja prise dans un lot en cours: la commande sera creee, attendre l'issue du COMMIT
+        return future.result()
@@ -0,0 +1,42 @@
+"""
+Point d'entree unique des evenements du cycle de vie des commandes.
+
+Toutes les voies de creation (REST, GraphQL) et de changement de statut
+(PATCH admin, transitions en masse) passent par ces fonctions, appelees
+dans la transaction de l'operation: agregats et evenements outbox sont
+valides ou annules avec elle.
+"""
+from backend_py.outbox import events
+from . import customer_stats, rollups
+
+
+def order_created(order, lines):
+    """
+    Commande creee. `lines`: iterable de (product_id, quantity, price)
+    """
+    lines = list(lines)
+    rollups.record_order(order, lines)
+    customer_stats.record_order(order)
+    events.publish('order.created', order.id, {
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "total": order.total,
+        "status": order.status,
+        "created_at": order.created_at,
+        "items": [
+            {"product_id": product_id, "quantity": quantity, "price": price}
+            for product_id, quantity, price in lines
+        ],
+    })
+
+
+def status_changed(queryset, source, target):
+    """Les commandes de `queryset` sont passees de `source` a `target`"""
+    if source == target:
+        return
+    rollups.apply_status_change(queryset, source, target)
+    customer_stats.apply_status_change(queryset, source, target)
+    events.publish_many('order.status_changed', (
+        (order_id, {"order_id": order_id, "user_id": user_id, "from": source, "to": target})
+        for order_id, user_id in queryset.values_list('id', 'user_id').iterator(chunk_size=2000)
+    ))
@@ -0,0 +1,46 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from backend_py.orders import archive, rollups
+
+
+class Command(BaseCommand):
+    help = "Deplace les commandes livrees ou annulees anciennes vers l'archive, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=180,
+            help="Age minimum (en jours) des commandes a archiver",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Nombre de commandes deplacees par transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Compter les commandes concernees sans les deplacer",
+        )
+
+    def handle(self, *args, **options):
+        if options["older_than_days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--older-than-days et --batch-size doivent etre positifs")
+
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        try:
+            count = archive.archive_orders(
+                cutoff,
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+                stdout=self.stdout,
+            )
+        except rollups.RebuildInProgress as exc:
+            raise CommandError(str(exc))
+        if options["dry_run"]:
+            self.stdout.write(f"{count} commandes seraient archivees (avant {cutoff:%Y-%m-%d})")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {count} commandes archivees (avant {cutoff:%Y-%m-%d})"))
@@ -0,0 +1,44 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.orders import rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agregats de ventes depuis l'historique des commandes, par tranches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Ne reconstruire qu'a partir de cette date (AAAA-MM-JJ)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Nombre de commandes traitees par transaction",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Reprendre une reconstruction interrompue (marquee en cours)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("Date invalide, format attendu: AAAA-MM-JJ")
+
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size doit etre positif")
+
+        self.stdout.write("Reconstruction des agregats de ventes...")
+        try:
+            processed = rollups.rebuild(
+                since=since, chunk_size=options["chunk_size"], stdout=self.stdout, force=options["force"]
+            )
+        except rollups.RebuildInProgress as exc:
+            raise CommandError(f"{exc} (--force si elle a ete interrompue)")
+        self.stdout.write(self.style.SUCCESS(f"✅ {processed} commandes agregees"))
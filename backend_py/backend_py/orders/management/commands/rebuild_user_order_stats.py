@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.orders import customer_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques de commandes par client (commandes et archive), par tranches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="Ne recalculer que ce client (option repetable)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Nombre de clients traites par transaction",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size doit etre positif")
+
+        self.stdout.write("Recalcul des statistiques clients...")
+        processed = customer_stats.rebuild(
+            user_ids=options["users"], chunk_size=options["chunk_size"], stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ {processed} clients recalcules"))
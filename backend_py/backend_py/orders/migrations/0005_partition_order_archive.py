@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Sous PostgreSQL, l'archive est partitionnee par mois sur created_at.
+# La cle primaire doit inclure la cle de partition: (id, created_at).
+# Les partitions mensuelles sont creees a la demande par archive_orders.
+PARTITIONED_ARCHIVE_SQL = """
+DROP TABLE orders_archivedorder;
+CREATE TABLE orders_archivedorder (
+    id bigint NOT NULL,
+    total numeric(10, 2) NOT NULL,
+    status varchar(50) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    archived_at timestamp with time zone NOT NULL,
+    user_id bigint NOT NULL REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX orders_arch_user_id_101d40_idx ON orders_archivedorder (user_id, created_at);
+"""
+
+
+def partition_archive(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(PARTITIONED_ARCHIVE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
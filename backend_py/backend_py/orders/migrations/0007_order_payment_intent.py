@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_user_order_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_client_secret',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_intent_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+    ]
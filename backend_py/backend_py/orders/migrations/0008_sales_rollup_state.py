@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_payment_intent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rebuilding_since', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
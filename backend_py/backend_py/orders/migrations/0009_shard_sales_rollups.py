@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_sales_rollup_state'),
+        ('products', '0003_external_reference'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='productsalesdaily',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='productsalesdaily',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salesrollupdaily',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salesrolluphourly',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='salesrollupdaily',
+            name='day',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='salesrolluphourly',
+            name='hour',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productsalesdaily',
+            unique_together={('day', 'product', 'shard')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='salesrollupdaily',
+            unique_together={('day', 'shard')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='salesrolluphourly',
+            unique_together={('hour', 'shard')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_shard_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='payment_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='payment_client_secret',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='payment_intent_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+    ]
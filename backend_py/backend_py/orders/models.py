@@ -2,14 +2,131 @@ from django.db import models
 from django.conf import settings
 from backend_py.products.models import Product
 
+# Statuts possibles d'une commande, dans l'ordre du cycle de vie
+ORDER_STATUSES = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
+
+# Machine a etats: statut courant -> statuts cibles autorises
+# pending -> confirmed -> shipped -> delivered, annulation possible avant expedition
+ORDER_TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+
 class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     total = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=50, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    # PaymentIntent Stripe courant, reutilise tant que le montant ne change pas
+    payment_intent_id = models.CharField(max_length=255, blank=True, default="", db_index=True)
+    payment_client_secret = models.CharField(max_length=255, blank=True, default="")
+    payment_amount = models.PositiveIntegerField(null=True, blank=True)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class SalesRollupDaily(models.Model):
+    """Agregat des ventes par jour (commandes non annulees), reparti sur des shards"""
+    day = models.DateField()
+    shard = models.PositiveSmallIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("day", "shard")
+
+
+class SalesRollupHourly(models.Model):
+    """Agregat des ventes par heure (commandes non annulees), reparti sur des shards"""
+    hour = models.DateTimeField()
+    shard = models.PositiveSmallIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("hour", "shard")
+
+
+class ProductSalesDaily(models.Model):
+    """Unites vendues et chiffre d'affaires par produit et par jour, reparti sur des shards"""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("day", "product", "shard")
+
+
+class SalesRollupState(models.Model):
+    """
+    Etat des agregats de ventes (ligne unique): `rebuilding_since` est
+    renseigne pendant une reconstruction.
+    """
+    rebuilding_since = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class UserOrderStats(models.Model):
+    """
+    Statistiques de commandes d'un client (commandes non annulees),
+    maintenues a la creation et a l'annulation des commandes.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, related_name="order_stats", on_delete=models.CASCADE
+    )
+    order_count = models.IntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(null=True)
+
+
+class ArchivedOrder(models.Model):
+    """
+    Commande terminee (livree ou annulee) deplacee hors de la table chaude.
+    Conserve l'id d'origine. Partitionnee par mois sous PostgreSQL.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=50)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    # Dernier PaymentIntent de la commande (rapprochement Stripe)
+    payment_intent_id = models.CharField(max_length=255, blank=True, default="", db_index=True)
+    payment_client_secret = models.CharField(max_length=255, blank=True, default="")
+    payment_amount = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "created_at"])]
+
+
+class ArchivedOrderItem(models.Model):
+    """Ligne d'une commande archivee"""
+    id = models.BigIntegerField(primary_key=True)
+    # Pas de contrainte FK: sous PostgreSQL la cle de la table partitionnee est (id, created_at)
+    order = models.ForeignKey(
+        ArchivedOrder, related_name="items", on_delete=models.CASCADE, db_constraint=False
+    )
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class OrderArchiveState(models.Model):
+    """
+    Etat de l'archivage (ligne unique): les commandes creees avant
+    `archived_before` peuvent se trouver dans l'archive.
+    """
+    archived_before = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
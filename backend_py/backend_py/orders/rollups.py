@@ -0,0 +1,296 @@
+"""
+Agregats de ventes incrementaux (jour, heure, produit/jour).
+
+Les agregats sont mis a jour dans la transaction de creation de commande
+et lors des passages au statut `cancelled`, pour que les rapports soient
+servis sans parcourir Order/OrderItem.
+
+Chaque agregat est reparti sur SALES_ROLLUP_SHARDS lignes (colonne
+`shard`), comme le stock des produits en mode slotted: les commandes
+concurrentes incrementent des lignes differentes au lieu d'attendre le
+verrou d'une ligne unique du jour. Les lectures somment les shards.
+"""
+import random
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import (
+    Order, OrderItem, ArchivedOrder, ArchivedOrderItem,
+    SalesRollupDaily, SalesRollupHourly, ProductSalesDaily, SalesRollupState,
+)
+
+CANCELLED = 'cancelled'
+
+_local = threading.local()
+
+
+class RebuildInProgress(Exception):
+    """Operation refusee pendant une reconstruction des agregats"""
+
+
+def rebuilding():
+    """Vrai si une reconstruction des agregats est en cours"""
+    return SalesRollupState.objects.filter(pk=1, rebuilding_since__isnull=False).exists()
+
+
+def lock_out_rebuild():
+    """
+    Verrouille l'etat des agregats dans la transaction de l'appelant et leve
+    RebuildInProgress si une reconstruction est en cours. Une reconstruction
+    lancee ensuite attend la fin de cette transaction.
+    """
+    state, _ = SalesRollupState.objects.select_for_update().get_or_create(pk=1)
+    if state.rebuilding_since is not None:
+        raise RebuildInProgress(
+            f"Reconstruction des agregats en cours depuis {state.rebuilding_since:%Y-%m-%d %H:%M}"
+        )
+
+
+def _buckets(created_at):
+    """Jour et heure (heure locale) d'une commande"""
+    local = timezone.localtime(created_at)
+    return local.date(), local.replace(minute=0, second=0, microsecond=0)
+
+
+def _increment(model, lookup, values, latest=None):
+    """
+    UPDATE ... SET col = col + x, ou creation de la ligne si absente.
+    `latest`: colonnes ne gardant que la valeur la plus recente (col = GREATEST(col, x)).
+    """
+    latest = latest or {}
+    increments = {field: F(field) + value for field, value in values.items()}
+    for field, value in latest.items():
+        # Coalesce: GREATEST renvoie NULL sous SQLite si un argument est NULL
+        increments[field] = Greatest(Coalesce(field, Value(value)), Value(value))
+    if model.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **values, **latest)
+    except IntegrityError:
+        # Creee entre-temps par une transaction concurrente
+        model.objects.filter(**lookup).update(**increments)
+
+
+def _shard():
+    """
+    Shard du thread courant, tire au hasard puis stable: une transaction
+    (lot du commit de groupe compris) n'ecrit que sur un shard, sans
+    interblocage entre shards.
+    """
+    if not hasattr(_local, 'shard'):
+        _local.shard = random.randrange(1 << 16)
+    return _local.shard % settings.SALES_ROLLUP_SHARDS
+
+
+class RollupDelta:
+    """Accumule des variations d'agregats puis les applique en une passe"""
+
+    def __init__(self):
+        self.daily = defaultdict(lambda: [Decimal('0'), 0, 0])
+        self.hourly = defaultdict(lambda: [Decimal('0'), 0, 0])
+        self.products = defaultdict(lambda: [0, Decimal('0')])
+
+    def add_order(self, created_at, total, sign=1):
+        day, hour = _buckets(created_at)
+        for bucket in (self.daily[day], self.hourly[hour]):
+            bucket[0] += sign * Decimal(total)
+            bucket[1] += sign
+
+    def add_line(self, created_at, product_id, quantity, price, sign=1):
+        day, hour = _buckets(created_at)
+        self.daily[day][2] += sign * quantity
+        self.hourly[hour][2] += sign * quantity
+        line = self.products[(day, product_id)]
+        line[0] += sign * quantity
+        line[1] += sign * Decimal(price)
+
+    def flush(self):
+        shard = _shard()
+        for day, (revenue, count, units) in sorted(self.daily.items()):
+            _increment(SalesRollupDaily, {'day': day, 'shard': shard},
+                       {'revenue': revenue, 'order_count': count, 'units': units})
+        for hour, (revenue, count, units) in sorted(self.hourly.items()):
+            _increment(SalesRollupHourly, {'hour': hour, 'shard': shard},
+                       {'revenue': revenue, 'order_count': count, 'units': units})
+        for (day, product_id), (units, revenue) in sorted(self.products.items()):
+            _increment(ProductSalesDaily, {'day': day, 'product_id': product_id, 'shard': shard},
+                       {'units': units, 'revenue': revenue})
+        self.__init__()
+
+
+def record_order(order, lines):
+    """
+    Ajoute une commande qui vient d'etre creee aux agregats.
+    `lines`: iterable de (product_id, quantity, price)
+    """
+    delta = RollupDelta()
+    delta.add_order(order.created_at, order.total)
+    for product_id, quantity, price in lines:
+        delta.add_line(order.created_at, product_id, quantity, price)
+    delta.flush()
+
+
+def add_orders(queryset, delta, sign=1, chunk_size=2000, item_model=OrderItem):
+    """Accumule les commandes de `queryset` (et leurs lignes de `item_model`) dans `delta`"""
+    for created_at, total in queryset.values_list('created_at', 'total').iterator(chunk_size=chunk_size):
+        delta.add_order(created_at, total, sign)
+    lines = item_model.objects.filter(order__in=queryset).values_list(
+        'order__created_at', 'product_id', 'quantity', 'price'
+    )
+    for created_at, product_id, quantity, price in lines.iterator(chunk_size=chunk_size):
+        delta.add_line(created_at, product_id, quantity, price, sign)
+
+
+def apply_status_change(queryset, source, target):
+    """
+    Retire (annulation) ou reintegre (sortie d'annulation) des commandes.
+    Leve RebuildInProgress pendant une reconstruction: la commande pourrait
+    etre retiree ici puis ignoree par le parcours (ou comptee deux fois).
+    """
+    if source != CANCELLED and target == CANCELLED:
+        sign = -1
+    elif source == CANCELLED and target != CANCELLED:
+        sign = 1
+    else:
+        return
+    lock_out_rebuild()
+    delta = RollupDelta()
+    add_orders(queryset, delta, sign)
+    delta.flush()
+
+
+def rebuild(since=None, chunk_size=5000, stdout=None, force=False):
+    """
+    Reconstruit les agregats depuis l'historique par tranches d'ids.
+    `since` (date): ne reconstruit que les jours a partir de cette date.
+
+    Le parcours s'arrete au plus grand id present a la purge: les commandes
+    creees ensuite sont deja comptees par `record_order`. Les commandes
+    archivees (ArchivedOrder) sont incluses.
+
+    Pendant la reconstruction (SalesRollupState.rebuilding_since renseigne),
+    les agregats sont partiels: le rapport n'est pas servi, et les
+    annulations, sorties d'annulation et l'archivage levent
+    RebuildInProgress. `force` reprend une reconstruction interrompue.
+    """
+    orders = Order.objects.exclude(status=CANCELLED)
+    archived = ArchivedOrder.objects.exclude(status=CANCELLED)
+    daily = SalesRollupDaily.objects.all()
+    hourly = SalesRollupHourly.objects.all()
+    products = ProductSalesDaily.objects.all()
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+        orders = orders.filter(created_at__gte=start)
+        archived = archived.filter(created_at__gte=start)
+        daily = daily.filter(day__gte=since)
+        hourly = hourly.filter(hour__gte=start)
+        products = products.filter(day__gte=since)
+
+    with transaction.atomic():
+        state, _ = SalesRollupState.objects.select_for_update().get_or_create(pk=1)
+        if state.rebuilding_since is not None and not force:
+            raise RebuildInProgress(
+                f"Reconstruction deja en cours depuis {state.rebuilding_since:%Y-%m-%d %H:%M}"
+            )
+        state.rebuilding_since = timezone.now()
+        state.save()
+        daily.delete()
+        hourly.delete()
+        products.delete()
+        max_id = Order.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+
+    try:
+        return _scan(archived, orders.filter(id__lte=max_id), chunk_size, stdout)
+    finally:
+        SalesRollupState.objects.filter(pk=1).update(rebuilding_since=None, updated_at=timezone.now())
+
+
+def _scan(archived, orders, chunk_size, stdout):
+    """Ajoute aux agregats l'archive puis les commandes, par tranches d'ids"""
+    processed = 0
+    for model, queryset, item_model in (
+        (ArchivedOrder, archived, ArchivedOrderItem),
+        (Order, orders, OrderItem),
+    ):
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                delta = RollupDelta()
+                add_orders(model.objects.filter(id__in=ids), delta, item_model=item_model)
+                delta.flush()
+            processed += len(ids)
+            last_id = ids[-1]
+            if stdout is not None:
+                stdout.write(f"  {processed} commandes traitees ({model.__name__}, id <= {last_id})")
+    return processed
+
+
+def _money(value):
+    return str((value or Decimal('0')).quantize(Decimal('0.01')))
+
+
+def _point(revenue, order_count, units):
+    revenue = revenue or Decimal('0')
+    order_count = order_count or 0
+    return {
+        "revenue": _money(revenue),
+        "order_count": order_count,
+        "units": units or 0,
+        "average_basket": _money(revenue / order_count if order_count else None),
+    }
+
+
+def report(start, end, granularity='day', top=10):
+    """Rapport de ventes sur [start, end] servi uniquement depuis les agregats"""
+    daily = SalesRollupDaily.objects.filter(day__gte=start, day__lte=end)
+    totals = daily.aggregate(revenue=Sum('revenue'), order_count=Sum('order_count'), units=Sum('units'))
+
+    if granularity == 'hour':
+        period = 'hour'
+        rows = SalesRollupHourly.objects.filter(
+            hour__gte=timezone.make_aware(datetime.combine(start, time.min)),
+            hour__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+    else:
+        period = 'day'
+        rows = daily
+    # Somme des shards de chaque periode
+    rows = rows.values(period).annotate(
+        period_revenue=Sum('revenue'), period_orders=Sum('order_count'), period_units=Sum('units')
+    ).order_by(period).values_list(period, 'period_revenue', 'period_orders', 'period_units')
+
+    series = [
+        {"period": period.isoformat(), **_point(revenue, count, units)}
+        for period, revenue, count, units in rows
+    ]
+
+    products = ProductSalesDaily.objects.filter(day__gte=start, day__lte=end).values(
+        'product_id', 'product__title'
+    ).annotate(total_units=Sum('units'), total_revenue=Sum('revenue')).order_by('-total_revenue')[:top]
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "totals": _point(totals['revenue'], totals['order_count'], totals['units']),
+        "series": series,
+        "top_products": [
+            {
+                "product_id": row['product_id'],
+                "title": row['product__title'],
+                "units": row['total_units'],
+                "revenue": _money(row['total_revenue']),
+            }
+            for row in products
+        ],
+    }
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.db import transaction
-from .models import Order, OrderItem
-from backend_py.products.models import Product
+from . import checkout, lifecycle
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem, ORDER_STATUSES
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -13,6 +13,15 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ["price"]
 
 
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product_title = serializers.CharField(source='product.title', read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ["id", "product", "product_title", "quantity", "price"]
+        read_only_fields = fields
+
+
 class OrderItemCreateSerializer(serializers.Serializer):
     """Serializer pour créer des items de commande"""
     product_id = serializers.IntegerField()
@@ -28,6 +37,34 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ["user", "status", "created_at"]
 
 
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """Meme representation qu'OrderSerializer pour une commande archivee"""
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ["id", "user", "total", "status", "created_at", "items"]
+        read_only_fields = fields
+
+
+class OrderRangeQuerySerializer(serializers.Serializer):
+    """Plage de dates optionnelle pour la liste des commandes"""
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class OrderExportQuerySerializer(OrderRangeQuerySerializer):
+    """Parametres de l'export comptable (`fmt`: le parametre `format` est reserve par DRF)"""
+    fmt = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    status = serializers.MultipleChoiceField(choices=ORDER_STATUSES, required=False)
+
+    def validate(self, attrs):
+        if 'created_after' in attrs and 'created_before' in attrs \
+                and attrs['created_before'] <= attrs['created_after']:
+            raise serializers.ValidationError("'created_before' doit etre posterieure a 'created_after'.")
+        return attrs
+
+
 class OrderCreateSerializer(serializers.Serializer):
     """
     Serializer sécurisé pour créer une commande
@@ -58,56 +95,16 @@ class OrderCreateSerializer(serializers.Serializer):
         user = self.context['request'].user
         items_data = validated_data['items']
         
-        total = 0
-        order_items = []
-        
-        for item_data in items_data:
-            # Récupérer le produit avec verrou pour éviter les race conditions
-            try:
-                product = Product.objects.select_for_update().get(id=item_data['product_id'])
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(f"Produit {item_data['product_id']} introuvable.")
-            
-            quantity = item_data['quantity']
-            
-            # Sécurité: Vérifier le stock disponible
-            if product.stock < quantity:
-                raise serializers.ValidationError(
-                    f"Stock insuffisant pour {product.title}. Disponible: {product.stock}"
-                )
-            
-            # Sécurité: Calculer le prix côté serveur (ne jamais faire confiance au client)
-            item_price = product.price * quantity
-            total += item_price
-            
-            # Diminuer le stock
-            product.stock -= quantity
-            product.save()
-            
-            order_items.append({
-                'product': product,
-                'quantity': quantity,
-                'price': item_price
-            })
-        
-        # Créer la commande
-        order = Order.objects.create(user=user, total=total, status='pending')
-        
-        # Créer les items
-        for item in order_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                price=item['price']
-            )
-        
+        # Récupérer les produits avec verrou pour éviter les race conditions
+        products = checkout.lock_products(item['product_id'] for item in items_data)
+        order, touched = checkout.place_order(user, items_data, products)
+        checkout.save_stock(touched)
         return order
 
 
 class OrderUpdateSerializer(serializers.ModelSerializer):
     """Serializer pour la mise a jour du statut de commande par les admins"""
-    VALID_STATUSES = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
+    VALID_STATUSES = ORDER_STATUSES
     
     class Meta:
         model = Order
@@ -120,3 +117,88 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
                 f"Statut invalide. Valeurs autorisees: {', '.join(self.VALID_STATUSES)}"
             )
         return value
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        previous = instance.status
+        instance = super().update(instance, validated_data)
+        lifecycle.status_changed(Order.objects.filter(pk=instance.pk), previous, instance.status)
+        return instance
+
+
+class OrderBulkFilterSerializer(serializers.Serializer):
+    """Filtre de selection des commandes pour une transition en masse"""
+    status = serializers.ChoiceField(choices=ORDER_STATUSES, required=False)
+    user = serializers.IntegerField(required=False, min_value=1)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Le filtre doit contenir au moins un critere.")
+        return attrs
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """
+    Serializer pour la transition de statut en masse (admins)
+    - Selection par liste d'ids ou par filtre (exclusifs)
+    - Statut cible valide selon la machine a etats
+    """
+    MAX_IDS = 20000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_IDS
+    )
+    filter = OrderBulkFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=ORDER_STATUSES)
+
+    def validate_ids(self, value):
+        if len(value) != len(set(value)):
+            raise serializers.ValidationError("Identifiants en double detectes.")
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Fournir soit 'ids', soit 'filter'.")
+        return attrs
+
+    def get_queryset(self):
+        """Commandes candidates a la transition"""
+        if 'ids' in self.validated_data:
+            return Order.objects.filter(id__in=self.validated_data['ids'])
+
+        criteria = self.validated_data['filter']
+        queryset = Order.objects.all()
+        if 'status' in criteria:
+            queryset = queryset.filter(status=criteria['status'])
+        if 'user' in criteria:
+            queryset = queryset.filter(user_id=criteria['user'])
+        if 'created_after' in criteria:
+            queryset = queryset.filter(created_at__gte=criteria['created_after'])
+        if 'created_before' in criteria:
+            queryset = queryset.filter(created_at__lt=criteria['created_before'])
+        return queryset
+
+
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+    """Parametres du rapport de ventes (bornes incluses)"""
+    MAX_DAYS = {'day': 366, 'hour': 31}
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    granularity = serializers.ChoiceField(choices=['day', 'hour'], default='day')
+    top = serializers.IntegerField(min_value=0, max_value=50, default=10)
+
+    def validate(self, attrs):
+        span = (attrs['end'] - attrs['start']).days
+        if span < 0:
+            raise serializers.ValidationError("'end' doit etre posterieure a 'start'.")
+        if span >= self.MAX_DAYS[attrs['granularity']]:
+            raise serializers.ValidationError(
+                f"Periode trop longue (maximum {self.MAX_DAYS[attrs['granularity']]} jours)."
+            )
+        return attrs
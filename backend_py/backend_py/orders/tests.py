@@ -1,12 +1,42 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from backend_py.orders.models import Order
+from rest_framework.exceptions import ValidationError
+from backend_py.orders import group_commit, rollups, transitions
+from backend_py.orders.group_commit import GroupCommitter, CheckoutRequest
+from backend_py.orders.models import (
+    Order, OrderItem, SalesRollupDaily, SalesRollupHourly, ProductSalesDaily, SalesRollupState,
+    ArchivedOrder, UserOrderStats
+)
 from backend_py.products.models import Product
 from backend_py.users.models import User
 
 
+def _daily_rows():
+    """Agregats par jour sommes sur les shards: [(day, revenue, order_count, units)]"""
+    return list(SalesRollupDaily.objects.values('day').annotate(
+        day_revenue=Sum('revenue'), day_orders=Sum('order_count'), day_units=Sum('units')
+    ).order_by('day').values_list('day', 'day_revenue', 'day_orders', 'day_units'))
+
+
+def _product_rows():
+    """Ventes par produit et par jour sommees sur les shards: [(day, units, revenue)]"""
+    return list(ProductSalesDaily.objects.values('day', 'product').annotate(
+        day_units=Sum('units'), day_revenue=Sum('revenue')
+    ).order_by('day', 'product').values_list('day', 'day_units', 'day_revenue'))
+
+
 class OrderStatusUpdateTests(TestCase):
     """Tests pour la mise à jour du statut des commandes"""
     
@@ -122,3 +152,558 @@ class OrderStatusUpdateTests(TestCase):
         data = {'status': 'invalid_status'}
         response = self.client.patch(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderBulkStatusTests(TestCase):
+    """Tests pour les transitions de statut en masse"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='adminpass123',
+            is_staff=True
+        )
+        self.normal_user = User.objects.create_user(
+            username='user',
+            email='user@test.com',
+            password='userpass123'
+        )
+        self.url = reverse('order-bulk-status')
+
+    def _order(self, order_status):
+        return Order.objects.create(user=self.normal_user, total=10, status=order_status)
+
+    def test_normal_user_forbidden(self):
+        """Les utilisateurs normaux ne peuvent pas faire de transition en masse"""
+        order = self._order('confirmed')
+        self.client.force_authenticate(user=self.normal_user)
+        response = self.client.post(self.url, {'ids': [order.id], 'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_transition_by_ids_with_rejections(self):
+        """Les transitions autorisees sont appliquees, les autres rejetees par id"""
+        confirmed = [self._order('confirmed') for _ in range(3)]
+        pending = self._order('pending')
+        delivered = self._order('delivered')
+
+        self.client.force_authenticate(user=self.admin_user)
+        ids = [o.id for o in confirmed] + [pending.id, delivered.id, 999999]
+        response = self.client.post(self.url, {'ids': ids, 'status': 'shipped'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['updated'], 3)
+        rejected_ids = [r['id'] for r in response.json()['rejected']]
+        self.assertEqual(rejected_ids, sorted([pending.id, delivered.id, 999999]))
+        self.assertEqual(Order.objects.filter(status='shipped').count(), 3)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'pending')
+
+    def test_transition_by_filter(self):
+        """Selection par filtre: toutes les commandes confirmees passent a expediees"""
+        for _ in range(4):
+            self._order('confirmed')
+        self._order('pending')
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            self.url,
+            {'filter': {'status': 'confirmed'}, 'status': 'shipped'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['updated'], 4)
+        self.assertEqual(response.json()['rejected'], [])
+        self.assertEqual(Order.objects.filter(status='pending').count(), 1)
+
+    def test_filter_update_limited_to_locked_rows(self):
+        """Une commande validee apres la lecture verrouillee n'est pas deplacee"""
+        for _ in range(2):
+            self._order('confirmed')
+        late = []
+        real_sources = transitions.allowed_sources
+
+        def sources_after_late_commit(target):
+            late.append(self._order('confirmed'))
+            return real_sources(target)
+
+        self.client.force_authenticate(user=self.admin_user)
+        with mock.patch.object(transitions, 'allowed_sources', sources_after_late_commit):
+            response = self.client.post(
+                self.url,
+                {'filter': {'status': 'confirmed'}, 'status': 'shipped'},
+                format='json'
+            )
+        self.assertEqual(response.json()['updated'], 2)
+        late[0].refresh_from_db()
+        self.assertEqual(late[0].status, 'confirmed')
+
+    def test_cancel_rules(self):
+        """L'annulation n'est possible qu'avant l'expedition"""
+        pending = self._order('pending')
+        confirmed = self._order('confirmed')
+        shipped = self._order('shipped')
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            self.url,
+            {'ids': [pending.id, confirmed.id, shipped.id], 'status': 'cancelled'},
+            format='json'
+        )
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual([r['id'] for r in response.json()['rejected']], [shipped.id])
+
+    def test_ids_and_filter_exclusive(self):
+        """Il faut fournir soit des ids, soit un filtre"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            self.url,
+            {'ids': [1], 'filter': {'status': 'pending'}, 'status': 'confirmed'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SalesRollupTests(TestCase):
+    """Tests pour les agregats de ventes incrementaux"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='adminpass123',
+            is_staff=True
+        )
+        self.normal_user = User.objects.create_user(
+            username='user',
+            email='user@test.com',
+            password='userpass123'
+        )
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=100
+        )
+
+    def _create_order(self, quantity):
+        self.client.force_authenticate(user=self.normal_user)
+        response = self.client.post(
+            reverse('order-list'),
+            {'items': [{'product_id': self.product.id, 'quantity': quantity}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['id']
+
+    def test_order_creation_updates_rollups(self):
+        """La creation de commande alimente les agregats jour, heure et produit"""
+        self._create_order(2)
+        self._create_order(3)
+
+        [(_, revenue, order_count, units)] = _daily_rows()
+        self.assertEqual((order_count, units, revenue), (2, 5, Decimal('50.00')))
+        self.assertEqual(SalesRollupHourly.objects.aggregate(total=Sum('order_count'))['total'], 2)
+        self.assertEqual(_product_rows()[0][1], 5)
+
+    def test_concurrent_writers_use_separate_shards(self):
+        """Deux threads ecrivent sur des lignes differentes; le rapport somme les shards"""
+        self.addCleanup(lambda: rollups._local.__dict__.pop('shard', None))
+        for shard in (0, 1):
+            rollups._local.shard = shard
+            self._create_order(shard + 1)
+
+        self.assertEqual(SalesRollupDaily.objects.count(), 2)
+        self.assertEqual(ProductSalesDaily.objects.count(), 2)
+        today = timezone.localdate().isoformat()
+        self.client.force_authenticate(user=self.admin_user)
+        data = self.client.get(reverse('order-analytics'), {'start': today, 'end': today}).json()
+        self.assertEqual(data['totals']['order_count'], 2)
+        self.assertEqual([(p['order_count'], p['units']) for p in data['series']], [(2, 3)])
+        self.assertEqual(data['top_products'][0]['units'], 3)
+
+    def test_cancellation_removes_order_from_rollups(self):
+        """Le passage a cancelled retire la commande des agregats"""
+        order_id = self._create_order(2)
+        self._create_order(1)
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.post(reverse('order-bulk-status'), {'ids': [order_id], 'status': 'cancelled'}, format='json')
+
+        [(_, revenue, order_count, units)] = _daily_rows()
+        self.assertEqual((order_count, units, revenue), (1, 1, Decimal('10.00')))
+
+    def test_analytics_endpoint(self):
+        """Le rapport admin est servi depuis les agregats"""
+        self._create_order(2)
+        self._create_order(4)
+        today = timezone.localdate().isoformat()
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('order-analytics'), {'start': today, 'end': today})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['totals']['order_count'], 2)
+        self.assertEqual(data['totals']['average_basket'], '30.00')
+        self.assertEqual(data['top_products'][0]['units'], 6)
+
+        self.client.force_authenticate(user=self.normal_user)
+        response = self.client.get(reverse('order-analytics'), {'start': today, 'end': today})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_rebuild_command_matches_incremental(self):
+        """La reconstruction depuis l'historique donne les memes agregats"""
+        self._create_order(2)
+        self._create_order(3)
+        before = _daily_rows()
+
+        SalesRollupDaily.objects.all().delete()
+        call_command('rebuild_sales_rollups', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(_daily_rows(), before)
+        self.assertEqual(_product_rows()[0][1], 5)
+
+    def test_order_created_during_rebuild_counted_once(self):
+        """Une commande creee pendant la reconstruction n'est pas comptee deux fois"""
+        self._create_order(2)
+        self._create_order(3)
+        test = self
+
+        class PlaceOrderAfterFirstChunk(StringIO):
+            placed = False
+
+            def write(self, text):
+                if not self.placed:
+                    self.placed = True
+                    test._create_order(1)
+                return super().write(text)
+
+        rollups.rebuild(chunk_size=1, stdout=PlaceOrderAfterFirstChunk())
+
+        [(_, _, order_count, units)] = _daily_rows()
+        self.assertEqual((order_count, units), (3, 6))
+
+    def test_cancel_and_report_refused_during_rebuild(self):
+        """Pendant la reconstruction, le rapport et les annulations repondent 503"""
+        order_id = self._create_order(2)
+        self._create_order(3)
+        today = timezone.localdate().isoformat()
+        self.client.force_authenticate(user=self.admin_user)
+        responses = []
+        test = self
+
+        class CancelDuringRebuild(StringIO):
+            def write(self, text):
+                if not responses:
+                    responses.append(test.client.patch(
+                        reverse('order-detail', args=[order_id]), {'status': 'cancelled'}, format='json'
+                    ))
+                    responses.append(test.client.get(reverse('order-analytics'), {'start': today, 'end': today}))
+                return super().write(text)
+
+        rollups.rebuild(chunk_size=1, stdout=CancelDuringRebuild())
+
+        self.assertEqual([r.status_code for r in responses], [status.HTTP_503_SERVICE_UNAVAILABLE] * 2)
+        self.assertEqual(Order.objects.get(pk=order_id).status, 'pending')
+        self.assertFalse(rollups.rebuilding())
+        response = self.client.get(reverse('order-analytics'), {'start': today, 'end': today})
+        self.assertEqual(response.json()['totals']['order_count'], 2)
+
+        # Une reconstruction interrompue bloque la suivante sans --force
+        SalesRollupState.objects.filter(pk=1).update(rebuilding_since=timezone.now())
+        with self.assertRaises(rollups.RebuildInProgress):
+            rollups.rebuild()
+        rollups.rebuild(force=True)
+        self.assertFalse(rollups.rebuilding())
+
+
+class OrderArchiveTests(TestCase):
+    """Tests pour l'archivage des commandes terminees"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@test.com',
+            password='userpass123'
+        )
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=100
+        )
+        old = timezone.now() - timedelta(days=400)
+        self.old_delivered = self._order('delivered', old)
+        self.old_pending = self._order('pending', old)
+        self.recent = self._order('delivered', timezone.now())
+
+    def _order(self, order_status, created_at):
+        order = Order.objects.create(user=self.user, total=10, status=order_status)
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=10)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def test_archive_moves_only_old_final_orders(self):
+        """Seules les commandes terminees et anciennes sont deplacees"""
+        call_command('archive_orders', older_than_days=180, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(ArchivedOrder.objects.values_list('id', flat=True)), [self.old_delivered.id])
+        self.assertEqual(ArchivedOrder.objects.get().items.count(), 1)
+        self.assertFalse(Order.objects.filter(pk=self.old_delivered.pk).exists())
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_reads_fall_through_to_archive(self):
+        """La liste et le detail incluent les commandes archivees si la plage le demande"""
+        call_command('archive_orders', older_than_days=180, stdout=StringIO())
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse('order-list'))
+        ids = [order['id'] for order in response.json()]
+        self.assertEqual(sorted(ids), sorted([self.old_delivered.id, self.old_pending.id, self.recent.id]))
+        self.assertEqual(ids[0], self.recent.id)
+
+        recent_only = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('order-list'), {'created_after': recent_only})
+        self.assertEqual([order['id'] for order in response.json()], [self.recent.id])
+
+        response = self.client.get(reverse('order-detail', args=[self.old_delivered.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['items'][0]['product_title'], 'Test Product')
+
+    def test_rebuild_after_archive_keeps_archived_revenue(self):
+        """La reconstruction des agregats inclut les commandes archivees"""
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        before = _daily_rows()
+        products_before = _product_rows()
+
+        call_command('archive_orders', older_than_days=180, stdout=StringIO())
+        call_command('rebuild_sales_rollups', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(_daily_rows(), before)
+        self.assertEqual(_product_rows(), products_before)
+        self.assertEqual(sum(row[2] for row in before), 3)
+
+    def test_archived_orders_not_visible_to_other_users(self):
+        """Un utilisateur ne voit pas les commandes archivees des autres"""
+        call_command('archive_orders', older_than_days=180, stdout=StringIO())
+        other = User.objects.create_user(username='other', email='other@test.com', password='otherpass123')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(reverse('order-list')).json(), [])
+        response = self.client.get(reverse('order-detail', args=[self.old_delivered.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GroupCommitTests(TestCase):
+    """Tests pour le commit de groupe des commandes"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@test.com', password='userpass123')
+            for i in range(3)
+        ]
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=5
+        )
+
+    def test_batch_commits_together_and_rejects_only_failing_request(self):
+        """Un refus de stock n'echoue que la requete concernee"""
+        committer = GroupCommitter()
+        batch = [
+            CheckoutRequest(self.users[0], [{'product_id': self.product.id, 'quantity': 3}]),
+            CheckoutRequest(self.users[1], [{'product_id': self.product.id, 'quantity': 3}]),
+            CheckoutRequest(self.users[2], [{'product_id': self.product.id, 'quantity': 2}]),
+        ]
+        committer.process(batch)
+
+        self.assertEqual(batch[0].future.result().user, self.users[0])
+        with self.assertRaises(ValidationError):
+            batch[1].future.result()
+        self.assertEqual(batch[2].future.result().total, 20)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(Order.objects.filter(user=self.users[1]).exists())
+
+    def test_unknown_product_rejected(self):
+        """Un produit inexistant n'empeche pas les autres commandes du lot"""
+        committer = GroupCommitter()
+        batch = [
+            CheckoutRequest(self.users[0], [{'product_id': 999999, 'quantity': 1}]),
+            CheckoutRequest(self.users[1], [{'product_id': self.product.id, 'quantity': 1}]),
+        ]
+        committer.process(batch)
+
+        self.assertIsInstance(batch[0].future.exception(), ValidationError)
+        self.assertIsNotNone(batch[1].future.result())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 4)
+
+    @override_settings(ORDER_GROUP_COMMIT={"ENABLED": True, "MAX_BATCH": 32, "MAX_WAIT_MS": 5, "RESULT_TIMEOUT": 0.05})
+    def test_timed_out_request_not_committed(self):
+        """Une requete en echec sur timeout n'est pas commitee ensuite"""
+
+        class StalledCommitter(GroupCommitter):
+            def _ensure_started(self):
+                pass
+
+        cache.clear()
+        committer = group_commit._committer = StalledCommitter()
+        try:
+            client = APIClient()
+            client.force_authenticate(user=self.users[0])
+            response = client.post(
+                reverse('order-list'),
+                {'items': [{'product_id': self.product.id, 'quantity': 1}]},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '2')
+
+            # Le committer reprend et traite la file: la requete annulee est ignoree
+            committer.process(committer._next_batch())
+        finally:
+            group_commit._committer = None
+
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+
+class UserOrderStatsTests(TestCase):
+    """Tests pour les statistiques de commandes par client"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin', email='admin@test.com', password='adminpass123', is_staff=True
+        )
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=100
+        )
+
+    def _create_order(self, quantity):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            '/orders/', {'items': [{'product_id': self.product.id, 'quantity': quantity}]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def _stats(self):
+        self.client.force_authenticate(user=self.user)
+        return self.client.get('/auth/me/').data['order_stats']
+
+    def test_stats_follow_creation_and_cancellation(self):
+        """Creation et annulation mettent a jour la ligne du client"""
+        self.assertEqual(self._stats()['order_count'], 0)
+        first = self._create_order(2)
+        self._create_order(3)
+
+        stats = self._stats()
+        self.assertEqual(stats['order_count'], 2)
+        self.assertEqual(stats['lifetime_spend'], '50.00')
+        self.assertIsNotNone(stats['last_order_at'])
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            '/orders/bulk-status/', {'status': 'cancelled', 'ids': [first]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = self._stats()
+        self.assertEqual(stats['order_count'], 1)
+        self.assertEqual(stats['lifetime_spend'], '30.00')
+
+    def test_rebuild_matches_incremental_stats(self):
+        """La reconstruction donne les memes valeurs que la maintenance incrementale"""
+        self._create_order(1)
+        self._create_order(4)
+        expected = UserOrderStats.objects.values('order_count', 'lifetime_spend', 'last_order_at').get(user=self.user)
+
+        UserOrderStats.objects.all().delete()
+        call_command('rebuild_user_order_stats', stdout=StringIO())
+        rebuilt = UserOrderStats.objects.values('order_count', 'lifetime_spend', 'last_order_at').get(user=self.user)
+        self.assertEqual(rebuilt, expected)
+
+    def test_graphql_stats_only_visible_to_owner(self):
+        """Les statistiques ne sont exposees qu'a l'utilisateur lui-meme (ou un admin)"""
+        self._create_order(2)
+        self.client.force_authenticate(user=None)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            '/graphql/', {'query': '{ me { orderStats { orderCount lifetimeSpend } } }'}, format='json'
+        )
+        self.assertEqual(response.json()['data']['me']['orderStats'], {'orderCount': 1, 'lifetimeSpend': '20.00'})
+
+
+class OrderExportTests(TestCase):
+    """Tests pour l'export comptable en flux"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin', email='admin@test.com', password='adminpass123', is_staff=True
+        )
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+        self.product = Product.objects.create(
+            title="Produit, avec virgule",
+            description="Test Description",
+            price="10.00",
+            stock=100
+        )
+        self.old = self._order('delivered', timezone.now() - timedelta(days=400), lines=2)
+        self.pending = self._order('pending', timezone.now())
+        self.cancelled = self._order('cancelled', timezone.now())
+
+    def _order(self, order_status, created_at, lines=1):
+        order = Order.objects.create(user=self.user, total=10 * lines, status=order_status)
+        for _ in range(lines):
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=10)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def _export(self, **params):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/orders/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_includes_archived_orders(self):
+        """Une ligne par article, commandes archivees comprises"""
+        call_command('archive_orders', older_than_days=180, stdout=StringIO())
+        rows = list(csv.reader(self._export().splitlines()))
+
+        self.assertEqual(rows[0][:3], ['order_id', 'user_id', 'status'])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(sorted({int(row[0]) for row in rows[1:]}), sorted([self.old.id, self.pending.id, self.cancelled.id]))
+        self.assertEqual(rows[1][7], "Produit, avec virgule")
+
+    def test_ndjson_export_filters_status_and_range(self):
+        """Filtres de statut et de dates appliques cote base"""
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        body = self._export(fmt='ndjson', status=['pending', 'delivered'], created_after=since)
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([line['order_id'] for line in lines], [self.pending.id])
+        self.assertEqual(lines[0]['price'], '10.00')
+
+    def test_export_requires_admin(self):
+        """Seuls les admins peuvent exporter"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/orders/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,60 @@
+"""
+Transitions de statut des commandes en masse.
+
+Chaque transition autorisee (statut source -> statut cible) est appliquee
+par un seul UPDATE ensembliste; les commandes refusees sont renvoyees
+avec la raison du refus.
+"""
+from collections import defaultdict
+from django.db import transaction
+from . import lifecycle
+from .models import Order, ORDER_TRANSITIONS
+
+
+def allowed_sources(target):
+    """Statuts a partir desquels on peut atteindre `target`"""
+    return [source for source, targets in ORDER_TRANSITIONS.items() if target in targets]
+
+
+@transaction.atomic
+def bulk_transition(queryset, target, requested_ids=None):
+    """
+    Applique la transition vers `target` a toutes les commandes de `queryset`.
+
+    Retourne (updated, rejected):
+    - updated: {statut_source: nombre} de commandes mises a jour
+    - rejected: [{"id", "reason"}] des commandes refusees
+    """
+    # Verrouiller les lignes candidates pour que les UPDATE portent
+    # exactement sur l'ensemble lu
+    rows = list(queryset.select_for_update().values_list('id', 'status'))
+
+    by_status = defaultdict(list)
+    for order_id, current in rows:
+        by_status[current].append(order_id)
+
+    rejected = []
+    if requested_ids is not None:
+        found = {order_id for order_id, _ in rows}
+        rejected.extend(
+            {"id": order_id, "reason": "Commande introuvable"}
+            for order_id in requested_ids if order_id not in found
+        )
+
+    sources = allowed_sources(target)
+    updated = {}
+    for current, ids in by_status.items():
+        if current not in sources:
+            reason = (
+                f"Deja au statut {target}" if current == target
+                else f"Transition {current} -> {target} non autorisee"
+            )
+            rejected.extend({"id": order_id, "reason": reason} for order_id in ids)
+            continue
+        # Un seul UPDATE par transition autorisee, restreint aux lignes verrouillees:
+        # re-filtrer `queryset` inclurait des commandes validees depuis la lecture
+        updated[current] = Order.objects.filter(id__in=ids, status=current).update(status=target)
+        lifecycle.status_changed(Order.objects.filter(id__in=ids), current, target)
+
+    rejected.sort(key=lambda r: r["id"])
+    return updated, rejected
@@ -1,9 +1,18 @@
+from concurrent.futures import TimeoutError as FutureTimeout
 from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
 from .models import Order
-from .serializers import OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer
+from .serializers import (
+    OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer, OrderBulkStatusSerializer,
+    SalesAnalyticsQuerySerializer, ArchivedOrderSerializer, OrderRangeQuerySerializer,
+    OrderExportQuerySerializer
+)
+from . import archive, export, group_commit, rollups
+from .transitions import bulk_transition
 
 
 class OrderThrottle(UserRateThrottle):
@@ -11,6 +20,16 @@ class OrderThrottle(UserRateThrottle):
     rate = '10/hour'
 
 
+def _rebuild_in_progress():
+    """503 pendant une reconstruction des agregats de ventes"""
+    response = Response(
+        {"error": "Reconstruction des agregats de ventes en cours, reessayez"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = '30'
+    return response
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     """ViewSet pour les commandes"""
     permission_classes = [permissions.IsAuthenticated]
@@ -21,6 +40,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return OrderUpdateSerializer
+        elif self.action == 'bulk_status':
+            return OrderBulkStatusSerializer
         return OrderSerializer
 
     def get_queryset(self):
@@ -28,17 +49,63 @@ class OrderViewSet(viewsets.ModelViewSet):
             # Les admins peuvent voir toutes les commandes
             return Order.objects.all().order_by('-created_at')
         return Order.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        query = OrderRangeQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        created_after = query.validated_data.get('created_after')
+        created_before = query.validated_data.get('created_before')
+
+        queryset = self.get_queryset().prefetch_related('items__product')
+        if created_after is not None:
+            queryset = queryset.filter(created_at__gte=created_after)
+        if created_before is not None:
+            queryset = queryset.filter(created_at__lt=created_before)
+        data = OrderSerializer(queryset, many=True).data
+
+        # L'archive n'est consultee que si la plage demandee peut la toucher
+        archived = archive.archived_orders(request.user, created_after, created_before)
+        if archived is not None:
+            data = sorted(
+                list(data) + list(ArchivedOrderSerializer(archived, many=True).data),
+                key=lambda order: order['created_at'],
+                reverse=True
+            )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Commande deplacee dans l'archive
+            archived = archive.archived_orders(request.user)
+            pk = str(kwargs.get('pk', ''))
+            order = archived.filter(pk=pk).first() if archived is not None and pk.isdigit() else None
+            if order is None:
+                raise
+            return Response(ArchivedOrderSerializer(order).data)
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         try:
-            order = serializer.save()
+            if group_commit.enabled():
+                order = group_commit.submit_and_wait(request.user, serializer.validated_data['items'])
+            else:
+                order = serializer.save()
             return Response(
                 OrderSerializer(order).data,
                 status=status.HTTP_201_CREATED
             )
+        except FutureTimeout:
+            # Committer de groupe sature: la requete a ete annulee, pas refusee
+            response = Response(
+                {"error": "Service de commande surcharge, reessayez"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '2'
+            return response
         except Exception:
             return Response(
                 {"error": "Erreur lors de la creation"},
@@ -58,7 +125,10 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         # Permettre aux admins de mettre a jour le statut de la commande
-        return super().update(request, *args, **kwargs)
+        try:
+            return super().update(request, *args, **kwargs)
+        except rollups.RebuildInProgress:
+            return _rebuild_in_progress()
 
     def partial_update(self, request, *args, **kwargs):
         if not request.user.is_staff:
@@ -67,4 +137,71 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         # Permettre aux admins de mettre a jour partiellement le statut
-        return super().partial_update(request, *args, **kwargs)
+        try:
+            return super().partial_update(request, *args, **kwargs)
+        except rollups.RebuildInProgress:
+            return _rebuild_in_progress()
+
+    @action(detail=False, methods=['post'], url_path='bulk-status',
+            throttle_classes=[UserRateThrottle])
+    def bulk_status(self, request):
+        """Transition de statut en masse selon la machine a etats (admins)"""
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Operation non autorisee"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        target = serializer.validated_data['status']
+        try:
+            updated, rejected = bulk_transition(
+                serializer.get_queryset(),
+                target,
+                requested_ids=serializer.validated_data.get('ids')
+            )
+        except rollups.RebuildInProgress:
+            return _rebuild_in_progress()
+        return Response({
+            "status": target,
+            "updated": sum(updated.values()),
+            "rejected": rejected
+        })
+
+    @action(detail=False, methods=['get'], throttle_classes=[UserRateThrottle])
+    def analytics(self, request):
+        """Rapport de ventes sur une periode, servi depuis les agregats (admins)"""
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Operation non autorisee"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        query = SalesAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        # Agregats partiels pendant une reconstruction: ne pas servir de faux totaux
+        if rollups.rebuilding():
+            return _rebuild_in_progress()
+        return Response(rollups.report(**query.validated_data))
+
+    @action(detail=False, methods=['get'], throttle_classes=[UserRateThrottle])
+    def export(self, request):
+        """Export CSV ou NDJSON des commandes et de leurs articles, en flux (admins)"""
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Operation non autorisee"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        query = OrderExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        stream, content_type, extension = export.FORMATS[params['fmt']]
+        lines = export.rows(
+            created_after=params.get('created_after'),
+            created_before=params.get('created_before'),
+            statuses=sorted(params.get('status', [])),
+        )
+        response = StreamingHttpResponse(stream(lines), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders.{extension}"'
+        return response
@@ -0,0 +1,27 @@
+"""
+Publication d'evenements dans l'outbox.
+
+Les evenements sont inseres dans la transaction courante: ils ne sont
+visibles par le relais que si l'operation metier est validee.
+"""
+from .models import OutboxEvent
+
+
+def publish(event_type, aggregate_id, payload):
+    """Ajoute un evenement a l'outbox"""
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        aggregate_id=str(aggregate_id),
+        payload=payload
+    )
+
+
+def publish_many(event_type, events, batch_size=1000):
+    """Ajoute des evenements en masse. `events`: iterable de (aggregate_id, payload)"""
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(event_type=event_type, aggregate_id=str(aggregate_id), payload=payload)
+            for aggregate_id, payload in events
+        ],
+        batch_size=batch_size
+    )
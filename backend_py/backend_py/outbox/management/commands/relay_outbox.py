@@ -0,0 +1,61 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.outbox import relay
+from backend_py.outbox.sinks import SinkError, get_sink
+
+
+class Command(BaseCommand):
+    help = "Relaie les evenements de l'outbox vers une destination, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sink",
+            default=getattr(settings, "OUTBOX_SINK", None),
+            help="Destination (ex: file:/tmp/events.ndjson ou http://localhost:9000/events)",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--interval", type=float, default=1.0, help="Pause (s) quand l'outbox est vide")
+        parser.add_argument("--once", action="store_true", help="Vider l'outbox puis s'arreter")
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            default=None,
+            help="Supprimer ensuite les evenements livres plus vieux que N jours",
+        )
+
+    def handle(self, *args, **options):
+        if not options["sink"]:
+            raise CommandError("Aucune destination: utiliser --sink ou OUTBOX_SINK")
+        try:
+            sink = get_sink(options["sink"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        total = 0
+        try:
+            while True:
+                try:
+                    sent = relay.relay_batch(sink, batch_size=options["batch_size"])
+                except SinkError as exc:
+                    # Lot non marque livre: il sera renvoye
+                    self.stderr.write(f"Echec de livraison: {exc}")
+                    if options["once"]:
+                        raise CommandError("Livraison interrompue")
+                    time.sleep(options["interval"])
+                    continue
+
+                total += sent
+                if sent:
+                    self.stdout.write(f"  {sent} evenements livres")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            sink.close()
+
+        if options["prune_days"] is not None:
+            pruned = relay.prune(options["prune_days"])
+            self.stdout.write(f"{pruned} evenements supprimes")
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} evenements livres"))
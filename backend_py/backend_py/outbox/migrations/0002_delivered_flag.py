@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:06
+
+from django.db import migrations, models
+from django.db.models import F, Min
+
+
+def mark_relayed_events(apps, schema_editor):
+    """Les evenements deja passes par tous les curseurs sont marques livres"""
+    RelayCursor = apps.get_model('outbox', 'RelayCursor')
+    OutboxEvent = apps.get_model('outbox', 'OutboxEvent')
+    last_event_id = RelayCursor.objects.aggregate(last=Min('last_event_id'))['last']
+    if last_event_id:
+        OutboxEvent.objects.filter(id__lte=last_event_id).update(delivered_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outbox', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_relayed_events, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='RelayCursor',
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['id'], name='outbox_pending_idx'),
+        ),
+    ]
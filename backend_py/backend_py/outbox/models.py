@@ -0,0 +1,18 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """Evenement metier ecrit dans la transaction qui le produit"""
+    event_type = models.CharField(max_length=100)
+    aggregate_id = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Renseigne quand le relais a livre l'evenement
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(delivered_at__isnull=True), name="outbox_pending_idx"),
+        ]
@@ -0,0 +1,50 @@
+"""
+Relais de l'outbox vers une destination, livraison au moins une fois.
+
+Chaque evenement non livre porte `delivered_at` NULL. Un lot est reclame
+avec `select_for_update(skip_locked=True)`, envoye, puis marque livre dans
+la meme transaction: un arret ou un echec de la destination annule le
+marquage et le lot sera renvoye (les consommateurs dedupliquent par `id`).
+Un evenement commite tardivement par une longue transaction, avec un id
+inferieur a des evenements deja livres, reste en attente et sera livre au
+lot suivant. Plusieurs relais peuvent tourner en parallele sans se
+bloquer; l'ordre des ids n'est garanti qu'a l'interieur d'un lot.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboxEvent
+
+
+def _serialize(event):
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_id": event.aggregate_id,
+        "payload": event.payload,
+        "created_at": event.created_at,
+    }
+
+
+def relay_batch(sink, batch_size=500):
+    """Livre le prochain lot d'evenements en attente; retourne le nombre livre"""
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(delivered_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        sink.send([_serialize(event) for event in events])
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(delivered_at=timezone.now())
+    return len(events)
+
+
+def prune(older_than_days):
+    """Supprime les evenements livres plus vieux que `older_than_days` jours"""
+    deleted, _ = OutboxEvent.objects.filter(
+        delivered_at__isnull=False,
+        created_at__lt=timezone.now() - timedelta(days=older_than_days)
+    ).delete()
+    return deleted
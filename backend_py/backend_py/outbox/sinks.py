@@ -0,0 +1,76 @@
+"""
+Destinations des evenements relayes depuis l'outbox.
+
+Une destination est choisie par une spec `schema:cible`; le schema est
+resolu via le registre settings.OUTBOX_SINKS (schema -> classe).
+"""
+import json
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class SinkError(Exception):
+    """La destination n'a pas accepte le lot"""
+
+
+class BaseSink:
+    def __init__(self, spec):
+        self.spec = spec
+
+    def send(self, events):
+        """Livre un lot d'evenements (liste de dicts). Leve SinkError en cas d'echec."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileSink(BaseSink):
+    """Ajoute chaque evenement en NDJSON a un fichier (`file:/chemin/events.ndjson`)"""
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.path = spec.split(':', 1)[1]
+
+    def send(self, events):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, cls=DjangoJSONEncoder) + '\n')
+        except OSError as exc:
+            raise SinkError(str(exc)) from exc
+
+
+class HttpSink(BaseSink):
+    """POST JSON `{"events": [...]}` vers une URL (`http://...` ou `https://...`)"""
+    timeout = (3, 10)
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.session = requests.Session()
+
+    def send(self, events):
+        try:
+            response = self.session.post(
+                self.spec,
+                data=json.dumps({"events": events}, cls=DjangoJSONEncoder),
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            raise SinkError(str(exc)) from exc
+
+    def close(self):
+        self.session.close()
+
+
+def get_sink(spec):
+    """Instancie la destination correspondant a `spec`"""
+    scheme = spec.split(':', 1)[0]
+    registry = getattr(settings, 'OUTBOX_SINKS', {})
+    if scheme not in registry:
+        raise ValueError(f"Destination inconnue: {scheme}")
+    return import_string(registry[scheme])(spec)
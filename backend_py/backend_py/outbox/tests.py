@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from backend_py.orders.models import Order
+from backend_py.products.models import Product
+from backend_py.users.models import User
+from .models import OutboxEvent
+from .sinks import FileSink, SinkError
+from . import relay
+
+
+class OutboxTests(TestCase):
+    """Tests pour l'outbox transactionnelle et son relais"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@test.com',
+            password='userpass123'
+        )
+        self.admin_user = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='adminpass123',
+            is_staff=True
+        )
+        self.product = Product.objects.create(
+            title="Test Product",
+            description="Test Description",
+            price="10.00",
+            stock=10
+        )
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def _create_order(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse('order-list'),
+            {'items': [{'product_id': self.product.id, 'quantity': 2}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['id']
+
+    def _read_events(self):
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_order_creation_writes_event(self):
+        """La creation de commande ecrit un evenement dans la meme transaction"""
+        order_id = self._create_order()
+        event = OutboxEvent.objects.get(event_type='order.created')
+        self.assertEqual(event.aggregate_id, str(order_id))
+        self.assertEqual(event.payload['items'][0]['quantity'], 2)
+
+    def test_failed_order_writes_no_event(self):
+        """Une commande refusee (stock insuffisant) ne produit aucun evenement"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(
+            reverse('order-list'),
+            {'items': [{'product_id': self.product.id, 'quantity': 50}]},
+            format='json'
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_bulk_transition_writes_one_event_per_order(self):
+        """Une transition en masse produit un evenement par commande"""
+        orders = [Order.objects.create(user=self.user, total=10, status='pending') for _ in range(3)]
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.post(
+            reverse('order-bulk-status'),
+            {'ids': [o.id for o in orders], 'status': 'confirmed'},
+            format='json'
+        )
+        events = OutboxEvent.objects.filter(event_type='order.status_changed')
+        self.assertEqual(events.count(), 3)
+        self.assertEqual(events.first().payload['to'], 'confirmed')
+
+    def test_relay_delivers_once_and_marks_events(self):
+        """Le relais livre les evenements puis les marque livres"""
+        self._create_order()
+        self._create_order()
+
+        call_command('relay_outbox', sink=f'file:{self.path}', once=True, stdout=StringIO())
+        call_command('relay_outbox', sink=f'file:{self.path}', once=True, stdout=StringIO())
+
+        delivered = self._read_events()
+        self.assertEqual([e['type'] for e in delivered], ['order.created', 'order.created'])
+        self.assertFalse(OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_late_commit_below_delivered_ids_is_relayed(self):
+        """Un evenement commite apres des ids superieurs deja livres est quand meme livre"""
+        self._create_order()
+        self._create_order()
+        late, delivered = OutboxEvent.objects.order_by('id')
+        # Le second evenement a ete livre pendant que la transaction du premier etait ouverte
+        OutboxEvent.objects.filter(pk=delivered.pk).update(delivered_at=timezone.now())
+
+        self.assertEqual(relay.relay_batch(FileSink(f'file:{self.path}')), 1)
+        self.assertEqual([e['id'] for e in self._read_events()], [late.id])
+
+    def test_batch_not_marked_on_sink_failure(self):
+        """En cas d'echec de la destination, le lot sera renvoye"""
+        self._create_order()
+
+        class FailingSink(FileSink):
+            def send(self, events):
+                raise SinkError("indisponible")
+
+        with self.assertRaises(SinkError):
+            relay.relay_batch(FailingSink(f'file:{self.path}'))
+        self.assertFalse(OutboxEvent.objects.filter(delivered_at__isnull=False).exists())
+
+        self.assertEqual(relay.relay_batch(FileSink(f'file:{self.path}')), 1)
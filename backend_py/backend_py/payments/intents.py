@@ -0,0 +1,186 @@
+"""
+Creation (ou reutilisation) du PaymentIntent Stripe d'une commande.
+
+`ensure_intent` est appele directement par la vue (mode synchrone), ou
+depuis un pool de threads borne (mode asynchrone, PAYMENT_INTENT_ASYNC):
+la requete HTTP repond 202 avec l'id d'une PaymentIntentRequest et le
+client interroge GET /payment/intent/<id>/ (attente optionnelle `wait`)
+au lieu de bloquer un worker pendant l'appel Stripe.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import stripe
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from backend_py.orders.models import Order
+from backend_py.outbox import events
+from . import stripe_client
+from .models import PaymentIntentRequest
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+# Reveil des attentes (long polling) servies par le meme processus
+_done = {}
+
+
+def amount_for(order):
+    """Montant de la commande en centimes"""
+    return int((order.total * 100).to_integral_value())
+
+
+def reusable(order, amount):
+    """L'intent enregistre peut-il etre renvoye sans appel Stripe ?"""
+    return bool(order.payment_intent_id) and order.payment_amount == amount
+
+
+def ensure_intent(order, user_id):
+    """
+    Cree, met a jour ou reutilise l'intent de `order` et l'enregistre sur la
+    commande. Leve stripe.StripeError si Stripe echoue.
+    """
+    amount = amount_for(order)
+    if reusable(order, amount):
+        return order
+
+    intent = None
+    if order.payment_intent_id:
+        # Montant modifie: mettre a jour l'intent existant plutot qu'en laisser un orphelin
+        try:
+            intent = stripe_client.update_payment_intent(
+                order.payment_intent_id,
+                amount,
+                idempotency_key=f"order-{order.id}-intent-{order.payment_intent_id}-{amount}"
+            )
+        except stripe.InvalidRequestError:
+            # Intent plus modifiable (annule, deja confirme...): en creer un nouveau
+            intent = None
+
+    if intent is None:
+        intent = stripe_client.create_payment_intent(
+            amount=amount,
+            currency="eur",
+            metadata={'order_id': order.id, 'user_id': user_id},
+            # Rejouable sans doublon tant que le montant ne change pas
+            idempotency_key=f"order-{order.id}-intent-{amount}"
+        )
+        events.publish('payment.intent_created', order.id, {
+            "order_id": order.id,
+            "user_id": user_id,
+            "payment_intent_id": intent.id,
+            "amount": amount,
+            "currency": "eur",
+        })
+
+    order.payment_intent_id = intent.id
+    order.payment_client_secret = intent.client_secret
+    order.payment_amount = amount
+    Order.objects.filter(id=order.id).update(
+        payment_intent_id=intent.id,
+        payment_client_secret=intent.client_secret,
+        payment_amount=amount
+    )
+    return order
+
+
+# ========================================
+# MODE ASYNCHRONE
+# ========================================
+
+def async_enabled():
+    return settings.PAYMENT_INTENT_ASYNC["ENABLED"]
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                config = settings.PAYMENT_INTENT_ASYNC
+                _slots = threading.BoundedSemaphore(config["MAX_PENDING"])
+                _executor = ThreadPoolExecutor(
+                    max_workers=config["WORKERS"], thread_name_prefix="payment-intent"
+                )
+    return _executor, _slots
+
+
+def submit(request_id):
+    """
+    Planifie le traitement d'une demande. Retourne False si le pool est
+    sature (demandes en cours + en attente >= MAX_PENDING).
+    """
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        return False
+    with _lock:
+        _done[request_id] = threading.Event()
+    executor.submit(_run, request_id)
+    return True
+
+
+def _run(request_id):
+    try:
+        process(request_id)
+    except Exception:
+        logger.exception("Demande de PaymentIntent %s en echec", request_id)
+    finally:
+        close_old_connections()
+        _pool()[1].release()
+        with _lock:
+            event = _done.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+
+def process(request_id):
+    """Execute une demande en attente et enregistre son resultat"""
+    intent_request = PaymentIntentRequest.objects.select_related('order').get(id=request_id)
+    if intent_request.status != PaymentIntentRequest.PENDING:
+        return intent_request
+    order = intent_request.order
+    if order.status != 'pending':
+        intent_request.status = PaymentIntentRequest.FAILED
+        intent_request.error = "Cette commande ne peut pas etre payee"
+    else:
+        try:
+            ensure_intent(order, intent_request.user_id)
+            intent_request.status = PaymentIntentRequest.SUCCEEDED
+        except stripe.StripeError:
+            intent_request.status = PaymentIntentRequest.FAILED
+            intent_request.error = "Erreur de paiement"
+    intent_request.save(update_fields=['status', 'error', 'updated_at'])
+    return intent_request
+
+
+def wait(intent_request, timeout):
+    """
+    Attend au plus `timeout` secondes la fin d'une demande. Reveil immediat si
+    elle est traitee par ce processus, sinon relecture periodique en base.
+    Une demande restee en attente au-dela de STALE_SECONDS (processus arrete)
+    est marquee en echec pour que le client recommence.
+    """
+    deadline = time.monotonic() + timeout
+    while intent_request.status == PaymentIntentRequest.PENDING:
+        stale_before = timezone.now() - timedelta(seconds=settings.PAYMENT_INTENT_ASYNC["STALE_SECONDS"])
+        if intent_request.created_at < stale_before:
+            PaymentIntentRequest.objects.filter(
+                id=intent_request.id, status=PaymentIntentRequest.PENDING
+            ).update(status=PaymentIntentRequest.FAILED, error="Demande expiree", updated_at=timezone.now())
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with _lock:
+                event = _done.get(intent_request.id)
+            if event is not None:
+                event.wait(min(remaining, 1.0))
+            else:
+                time.sleep(min(remaining, 0.25))
+        intent_request.refresh_from_db()
+    return intent_request
@@ -0,0 +1,8 @@
+from backend_py.jobs.registry import job
+from . import webhooks
+
+
+@job(name='payments.apply_stripe_events', max_attempts=10)
+def apply_stripe_events(batch_size=500):
+    """Met a jour les commandes a partir des webhooks Stripe recus"""
+    webhooks.apply_pending(batch_size)
@@ -0,0 +1,49 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.payments import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Rapproche les PaymentIntents Stripe (pages de 100) avec les commandes et ecrit "
+        "un rapport des ecarts. Incremental: reprend au curseur enregistre."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="Fichier du rapport ('-' pour la sortie standard)")
+        parser.add_argument("--fmt", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--cursor", default="default", help="Nom du curseur (un par rapprochement planifie)")
+        parser.add_argument("--full", action="store_true", help="Ignorer le curseur et tout relire")
+        parser.add_argument(
+            "--lookback-hours",
+            type=float,
+            default=24,
+            help="Marge relue avant le curseur (paiements confirmes apres la creation de l'intent)",
+        )
+
+    def handle(self, *args, **options):
+        if options["lookback_hours"] < 0:
+            raise CommandError("--lookback-hours doit etre positif")
+
+        report = self.stdout if options["output"] == "-" else open(options["output"], "w", newline="")
+        try:
+            if options["fmt"] == "csv":
+                writer = csv.DictWriter(report, fieldnames=reconcile.COLUMNS)
+                writer.writeheader()
+                write = writer.writerow
+            else:
+                def write(row):
+                    report.write(json.dumps(row) + "\n")
+
+            seen, found = reconcile.run(
+                cursor_name=options["cursor"],
+                full=options["full"],
+                lookback_seconds=int(options["lookback_hours"] * 3600),
+                on_mismatch=write,
+            )
+        finally:
+            if report is not self.stdout:
+                report.close()
+
+        self.stderr.write(f"{seen} intents examines, {found} ecarts")
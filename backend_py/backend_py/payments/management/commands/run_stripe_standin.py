@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.payments.standin import StripeStandin
+
+
+class Command(BaseCommand):
+    help = (
+        "Lance un serveur Stripe local (PaymentIntents, webhooks) avec injection de latence, "
+        "d'erreurs et de timeouts. Pointer STRIPE_API_BASE sur son adresse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument("--latency-ms", type=float, default=0, help="Latence ajoutee a chaque requete")
+        parser.add_argument("--jitter-ms", type=float, default=0, help="Variation aleatoire de la latence")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Part des requetes en erreur 500 (0-1)")
+        parser.add_argument("--timeout-rate", type=float, default=0.0, help="Part des requetes sans reponse (0-1)")
+        parser.add_argument("--timeout-seconds", type=float, default=30.0, help="Duree d'une requete 'sans reponse'")
+        parser.add_argument(
+            "--webhook-url",
+            default="http://127.0.0.1:8000/payment/webhook/",
+            help="Destination des webhooks ('' pour desactiver)",
+        )
+        parser.add_argument(
+            "--auto-confirm-ms",
+            type=float,
+            default=None,
+            help="Confirmer chaque intent apres ce delai (simule le paiement client)",
+        )
+        parser.add_argument("--verbose", action="store_true", help="Journaliser chaque requete")
+
+    def handle(self, *args, **options):
+        for rate in ("error_rate", "timeout_rate"):
+            if not 0 <= options[rate] <= 1:
+                raise CommandError(f"--{rate.replace('_', '-')} doit etre compris entre 0 et 1")
+
+        server = StripeStandin(
+            (options["host"], options["port"]),
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            timeout_rate=options["timeout_rate"],
+            timeout_seconds=options["timeout_seconds"],
+            webhook_url=options["webhook_url"] or None,
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+            auto_confirm_ms=options["auto_confirm_ms"],
+            verbose=options["verbose"],
+        )
+        self.stdout.write(f"Stripe local sur {server.url} (STRIPE_API_BASE={server.url})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_intent_requests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_created', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
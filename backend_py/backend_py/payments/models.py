@@ -0,0 +1,44 @@
+import uuid
+from django.conf import settings
+from django.db import models
+
+
+class StripeEvent(models.Model):
+    """
+    Evenement webhook Stripe recu (cle unique: id Stripe de l'evenement).
+    Les doublons renvoyes par Stripe sont ignores a l'insertion.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["processed_at", "id"])]
+
+
+class PaymentIntentRequest(models.Model):
+    """
+    Demande de PaymentIntent traitee en arriere-plan (mode asynchrone):
+    le client interroge son statut pour obtenir le client_secret.
+    """
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = [(PENDING, "En cours"), (SUCCEEDED, "Reussie"), (FAILED, "Echouee")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey("orders.Order", on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    error = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ReconciliationCursor(models.Model):
+    """Date de creation (timestamp Stripe) des derniers intents rapproches"""
+    name = models.CharField(max_length=100, unique=True)
+    last_created = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
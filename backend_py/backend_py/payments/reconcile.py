@@ -0,0 +1,112 @@
+"""
+Rapprochement des PaymentIntents Stripe avec les commandes.
+
+La liste des intents est parcourue par pages de 100 (un appel par page,
+pas par commande); chaque page est jointe aux commandes en deux requetes
+(par payment_intent_id, puis par metadata.order_id pour les intents non
+enregistres). Le curseur stocke la date de creation du plus recent intent
+vu: une execution suivante ne relit que les intents crees depuis, moins une
+marge (`lookback`) pour les paiements confirmes apres leur creation.
+"""
+from decimal import Decimal
+from backend_py.orders.models import Order, ArchivedOrder
+from . import stripe_client
+from .models import ReconciliationCursor
+
+PAID_STATUSES = {'confirmed', 'shipped', 'delivered'}
+
+COLUMNS = ('kind', 'intent_id', 'intent_status', 'intent_amount', 'order_id', 'order_status', 'order_amount')
+
+
+def _cents(total):
+    return int((Decimal(total) * 100).to_integral_value())
+
+
+def _order_id(intent):
+    value = str((intent.get('metadata') or {}).get('order_id', ''))
+    return int(value) if value.isdigit() else None
+
+
+def _load_orders(intents):
+    """Commandes des intents de la page: {intent_id: order}, {order_id: order}"""
+    fields = ('id', 'status', 'total', 'payment_intent_id')
+    intent_ids = [i['id'] for i in intents]
+    by_intent = {}
+    # Commandes terminees deplacees dans l'archive: memes champs de paiement
+    for model in (ArchivedOrder, Order):
+        by_intent.update(
+            (row['payment_intent_id'], row)
+            for row in model.objects.filter(payment_intent_id__in=intent_ids).values(*fields)
+        )
+    wanted = {_order_id(i) for i in intents if i['id'] not in by_intent} - {None}
+    by_id = {row['id']: row for row in Order.objects.filter(id__in=wanted).values(*fields)}
+    # Archivees avant l'ajout des champs de paiement: intent inconnu
+    by_id.update(
+        (row['id'], dict(row, payment_intent_id=row['payment_intent_id'] or None))
+        for row in ArchivedOrder.objects.filter(id__in=wanted - set(by_id)).values(*fields)
+    )
+    return by_intent, by_id
+
+
+def check_page(intents):
+    """Ecarts detectes pour une page d'intents"""
+    by_intent, by_id = _load_orders(intents)
+    mismatches = []
+    for intent in intents:
+        order = by_intent.get(intent['id']) or by_id.get(_order_id(intent))
+        succeeded = intent['status'] == 'succeeded'
+        kind = None
+        if order is None:
+            kind = 'order_missing' if succeeded else None
+        elif succeeded and order['payment_intent_id'] not in (None, intent['id']):
+            # Paye sur un intent remplace: double paiement possible
+            kind = 'intent_superseded'
+        elif succeeded and order['status'] not in PAID_STATUSES:
+            kind = 'paid_order_not_confirmed'
+        elif succeeded and intent['amount'] != _cents(order['total']):
+            kind = 'amount_mismatch'
+        elif not succeeded and order['payment_intent_id'] == intent['id'] and order['status'] in PAID_STATUSES:
+            kind = 'confirmed_without_payment'
+        if kind:
+            mismatches.append({
+                'kind': kind,
+                'intent_id': intent['id'],
+                'intent_status': intent['status'],
+                'intent_amount': intent['amount'],
+                'order_id': order['id'] if order else _order_id(intent),
+                'order_status': order['status'] if order else None,
+                'order_amount': _cents(order['total']) if order else None,
+            })
+    return mismatches
+
+
+def run(cursor_name='default', full=False, lookback_seconds=86400, page_size=100, on_mismatch=None):
+    """
+    Parcourt les intents depuis le curseur et appelle `on_mismatch(row)` pour
+    chaque ecart. Le curseur n'avance qu'en fin de parcours complet.
+    Retourne (intents examines, nombre d'ecarts).
+    """
+    cursor, _ = ReconciliationCursor.objects.get_or_create(name=cursor_name)
+    created_gte = None if full or not cursor.last_created else max(cursor.last_created - lookback_seconds, 0)
+
+    seen = found = 0
+    newest = cursor.last_created
+    starting_after = None
+    while True:
+        page = stripe_client.list_payment_intents(created_gte, starting_after, page_size)
+        intents = [intent.to_dict() for intent in page.data]
+        if not intents:
+            break
+        for row in check_page(intents):
+            found += 1
+            if on_mismatch:
+                on_mismatch(row)
+        seen += len(intents)
+        newest = max([newest] + [intent['created'] for intent in intents])
+        if not page.has_more:
+            break
+        starting_after = intents[-1]['id']
+
+    cursor.last_created = newest
+    cursor.save(update_fields=['last_created', 'updated_at'])
+    return seen, found
@@ -0,0 +1,269 @@
+"""
+Serveur local imitant l'API Stripe (PaymentIntents et webhooks).
+
+Permet de tester en charge le parcours commande -> paiement sans Stripe:
+pointer `STRIPE_API_BASE` sur le serveur (`run_stripe_standin`). Latence,
+taux d'erreurs 5xx et timeouts sont injectables pour exercer le pool et
+les retries du client (payments.stripe_client).
+
+Endpoints:
+- POST /v1/payment_intents                  creation (Idempotency-Key respectee)
+- GET  /v1/payment_intents                  liste (limit, starting_after, created[gte])
+- GET  /v1/payment_intents/<id>             lecture
+- POST /v1/payment_intents/<id>             mise a jour (amount, metadata)
+- POST /v1/payment_intents/<id>/confirm     paiement reussi + webhook payment_intent.succeeded
+
+Les webhooks sont signes comme ceux de Stripe (en-tete Stripe-Signature)
+avec le secret fourni, et envoyes depuis un petit pool de threads.
+"""
+import hashlib
+import hmac
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import requests
+
+_INTENT_PATH = re.compile(r'^/v1/payment_intents/(?P<id>pi_\w+)(?P<confirm>/confirm)?$')
+
+
+def _parse_form(body):
+    """Corps form-encoded Stripe (`metadata[order_id]=1`) vers un dict imbrique"""
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        match = re.match(r'^(\w+)\[(\w+)\]$', key)
+        if match:
+            data.setdefault(match.group(1), {})[match.group(2)] = value
+        else:
+            data[key] = value
+    return data
+
+
+def sign(payload, secret, timestamp=None):
+    """Valeur de l'en-tete Stripe-Signature pour `payload` (str)"""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        server = self.server
+        with server._lock:
+            server.request_count += 1
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._error(401, 'invalid_request_error', "Cle API manquante")
+
+        failure = server.inject()
+        if failure == 'timeout':
+            # Ne jamais repondre avant le timeout de lecture du client
+            time.sleep(server.timeout_seconds)
+            return self._error(504, 'api_error', "Timeout simule")
+        if failure == 'error':
+            return self._error(500, 'api_error', "Erreur simulee")
+
+        url = urlsplit(self.path)
+        if url.path == '/v1/payment_intents':
+            if method == 'POST':
+                return self._send(200, server.create_intent(_parse_form(body), self.headers.get('Idempotency-Key')))
+            return self._send(200, server.list_intents(_parse_form(url.query)))
+
+        match = _INTENT_PATH.match(url.path)
+        intent = server.intents.get(match.group('id')) if match else None
+        if intent is None:
+            return self._error(404, 'invalid_request_error', "PaymentIntent introuvable")
+        if method == 'GET' and not match.group('confirm'):
+            return self._send(200, intent)
+        if method == 'POST' and match.group('confirm'):
+            return self._send(200, server.confirm_intent(intent['id']))
+        if method == 'POST':
+            return self._send(200, server.update_intent(intent['id'], _parse_form(body)))
+        return self._error(404, 'invalid_request_error', "Route inconnue")
+
+    def _error(self, code, error_type, message):
+        self._send(code, {"error": {"type": error_type, "message": message}})
+
+    def _send(self, code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Request-Id', f"req_{secrets.token_hex(8)}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+class StripeStandin(ThreadingHTTPServer):
+    """
+    Serveur Stripe local. `latency_ms` (+/- `jitter_ms`) est ajoute a chaque
+    requete; `error_rate` et `timeout_rate` sont des probabilites (0 a 1).
+    `fail_next` force les N prochaines requetes en erreur 500 (tests).
+    `auto_confirm_ms`: confirme chaque intent cree apres ce delai (client simule).
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 12111), latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 timeout_rate=0.0, timeout_seconds=30.0, webhook_url=None, webhook_secret=None,
+                 auto_confirm_ms=None, verbose=False):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.auto_confirm_ms = auto_confirm_ms
+        self.verbose = verbose
+        self.fail_next = 0
+        self.request_count = 0
+        self.intents = {}
+        self._order = []
+        self._idempotency = {}
+        self._lock = threading.Lock()
+        self._webhooks = ThreadPoolExecutor(max_workers=4, thread_name_prefix='standin-webhook')
+        self._session = requests.Session()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Sert dans un thread de fond (tests, scripts de charge)"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._webhooks.shutdown(wait=True)
+
+    def reset(self):
+        """Oublie intents, cles d'idempotence et compteurs"""
+        with self._lock:
+            self.intents.clear()
+            self._order.clear()
+            self._idempotency.clear()
+            self.request_count = 0
+            self.fail_next = 0
+
+    def inject(self):
+        """Latence puis, selon les taux configures, 'error', 'timeout' ou None"""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return 'error'
+        roll = random.random()
+        if roll < self.timeout_rate:
+            return 'timeout'
+        if roll < self.timeout_rate + self.error_rate:
+            return 'error'
+        return None
+
+    def create_intent(self, params, idempotency_key=None):
+        with self._lock:
+            if idempotency_key and idempotency_key in self._idempotency:
+                return self.intents[self._idempotency[idempotency_key]]
+            intent_id = f"pi_{secrets.token_hex(12)}"
+            intent = {
+                "id": intent_id,
+                "object": "payment_intent",
+                "amount": int(params.get('amount', 0)),
+                "currency": params.get('currency', 'eur'),
+                "metadata": params.get('metadata', {}),
+                "client_secret": f"{intent_id}_secret_{secrets.token_hex(8)}",
+                "status": "requires_payment_method",
+                "created": int(time.time()),
+                "livemode": False,
+            }
+            self.intents[intent_id] = intent
+            self._order.append(intent_id)
+            if idempotency_key:
+                self._idempotency[idempotency_key] = intent_id
+        if self.auto_confirm_ms is not None:
+            timer = threading.Timer(self.auto_confirm_ms / 1000, self.confirm_intent, args=[intent_id])
+            timer.daemon = True
+            timer.start()
+        return intent
+
+    def update_intent(self, intent_id, params):
+        with self._lock:
+            intent = self.intents[intent_id]
+            if 'amount' in params:
+                intent['amount'] = int(params['amount'])
+            intent['metadata'].update(params.get('metadata', {}))
+            return intent
+
+    def confirm_intent(self, intent_id):
+        with self._lock:
+            intent = self.intents[intent_id]
+            intent['status'] = 'succeeded'
+            intent['amount_received'] = intent['amount']
+        self.emit('payment_intent.succeeded', intent)
+        return intent
+
+    def list_intents(self, params):
+        """Plus recents d'abord, comme Stripe; pagination par `starting_after`"""
+        limit = min(int(params.get('limit', 10)), 100)
+        created = params.get('created')
+        created_gte = int(created.get('gte', 0)) if isinstance(created, dict) else 0
+        with self._lock:
+            ids = list(reversed(self._order))
+            if params.get('starting_after') in self.intents:
+                ids = ids[ids.index(params['starting_after']) + 1:]
+            matching = [self.intents[i] for i in ids if self.intents[i]['created'] >= created_gte]
+        return {
+            "object": "list",
+            "url": "/v1/payment_intents",
+            "data": matching[:limit],
+            "has_more": len(matching) > limit,
+        }
+
+    def emit(self, event_type, intent):
+        """Envoie l'evenement signe au webhook configure (en arriere-plan)"""
+        if not self.webhook_url:
+            return None
+        event = {
+            "id": f"evt_{secrets.token_hex(12)}",
+            "object": "event",
+            "type": event_type,
+            "created": int(time.time()),
+            "data": {"object": dict(intent)},
+        }
+        return self._webhooks.submit(self._deliver, event)
+
+    def _deliver(self, event):
+        payload = json.dumps(event)
+        headers = {'Content-Type': 'application/json'}
+        if self.webhook_secret:
+            headers['Stripe-Signature'] = sign(payload, self.webhook_secret)
+        try:
+            return self._session.post(self.webhook_url, data=payload, headers=headers, timeout=(3, 10)).status_code
+        except requests.RequestException:
+            return None
@@ -0,0 +1,100 @@
+"""
+Client Stripe partage par le processus.
+
+Un seul StripeClient (cle, timeouts, retries) et une seule session HTTP
+(pool keep-alive) par processus, au lieu de `stripe.api_key` global et des
+valeurs par defaut de la librairie. Les retries sont ceux de la librairie:
+backoff exponentiel avec jitter, sur erreurs reseau, 409, 429 et 5xx; les
+POST portent une cle d'idempotence pour etre rejoues sans doublon.
+Chaque appel alimente l'histogramme `stripe_request_seconds` par operation.
+`STRIPE_API_BASE` permet de cibler un serveur Stripe local (voir tests).
+"""
+import threading
+import requests
+import stripe
+from django.conf import settings
+from backend_py import metrics
+
+_lock = threading.Lock()
+_client = None
+
+
+def _build():
+    config = settings.STRIPE_CLIENT
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=config["POOL_SIZE"], max_retries=0
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    options = {}
+    if settings.STRIPE_API_BASE:
+        options["base_addresses"] = {"api": settings.STRIPE_API_BASE}
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        http_client=stripe.RequestsClient(
+            session=session,
+            timeout=(config["CONNECT_TIMEOUT"], config["READ_TIMEOUT"]),
+        ),
+        max_network_retries=config["MAX_RETRIES"],
+        **options
+    )
+
+
+def get_client():
+    """Client du processus, cree au premier appel"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build()
+    return _client
+
+
+def reset():
+    """Oublie le client (changement de configuration, tests)"""
+    global _client
+    with _lock:
+        _client = None
+
+
+def call(operation, func, *args, **kwargs):
+    """Appelle `func` en mesurant sa latence et en comptant les erreurs par type"""
+    try:
+        with metrics.timed("stripe_request_seconds", operation=operation):
+            return func(*args, **kwargs)
+    except stripe.StripeError as exc:
+        metrics.increment("stripe_errors_total", operation=operation, error=type(exc).__name__)
+        raise
+
+
+def create_payment_intent(amount, currency, metadata, idempotency_key):
+    client = get_client()
+    return call(
+        "payment_intents.create",
+        client.v1.payment_intents.create,
+        params={"amount": amount, "currency": currency, "metadata": metadata},
+        options={"idempotency_key": idempotency_key},
+    )
+
+
+def update_payment_intent(intent_id, amount, idempotency_key):
+    client = get_client()
+    return call(
+        "payment_intents.update",
+        client.v1.payment_intents.update,
+        intent_id,
+        params={"amount": amount},
+        options={"idempotency_key": idempotency_key},
+    )
+
+
+def list_payment_intents(created_gte=None, starting_after=None, limit=100):
+    """Une page de la liste des intents (plus recents d'abord)"""
+    params = {"limit": limit}
+    if created_gte:
+        params["created"] = {"gte": created_gte}
+    if starting_after:
+        params["starting_after"] = starting_after
+    return call("payment_intents.list", get_client().v1.payment_intents.list, params=params)
@@ -0,0 +1,310 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+import stripe
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from backend_py import metrics
+from backend_py.jobs.models import Job
+from backend_py.orders.models import Order, ArchivedOrder
+from backend_py.users.models import User
+from . import stripe_client
+from .models import PaymentIntentRequest, ReconciliationCursor, StripeEvent
+from .standin import StripeStandin, sign
+
+
+class StripeClientTests(TestCase):
+    """Tests du client Stripe partage contre le serveur Stripe local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StripeStandin(('127.0.0.1', 0)).start()
+        cls.settings = override_settings(STRIPE_SECRET_KEY='sk_test_local', STRIPE_API_BASE=cls.server.url)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.stop()
+        stripe_client.reset()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        stripe_client.reset()
+        self.server.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+        self.order = Order.objects.create(user=self.user, total='20.00', status='pending')
+
+    def _post_intent(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/payment/intent/', {'order_id': self.order.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_intent_created_through_shared_client(self):
+        """Le client unique est utilise et chaque appel est mesure"""
+        response = self._post_intent()
+
+        self.assertIs(stripe_client.get_client(), stripe_client.get_client())
+        intent = next(iter(self.server.intents.values()))
+        self.assertEqual(response.data['client_secret'], intent['client_secret'])
+        self.assertEqual(intent['amount'], 2000)
+        self.assertEqual(intent['metadata'], {'order_id': str(self.order.id), 'user_id': str(self.user.id)})
+
+        histogram = metrics.snapshot()['histograms'][0]
+        self.assertEqual(histogram['name'], 'stripe_request_seconds')
+        self.assertEqual(histogram['labels'], {'operation': 'payment_intents.create'})
+        self.assertEqual(histogram['count'], 1)
+
+    def test_intent_reused_until_amount_changes(self):
+        """Un rechargement reutilise l'intent; un nouveau montant le met a jour"""
+        first = self._post_intent()
+        second = self._post_intent()
+        self.assertEqual(first.data['client_secret'], second.data['client_secret'])
+        self.assertEqual(self.server.request_count, 1)
+
+        Order.objects.filter(id=self.order.id).update(total='25.00')
+        self._post_intent()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_amount, 2500)
+        self.assertEqual(len(self.server.intents), 1)
+        self.assertEqual(self.server.intents[self.order.payment_intent_id]['amount'], 2500)
+
+    @override_settings(STRIPE_CLIENT={'CONNECT_TIMEOUT': 1, 'READ_TIMEOUT': 2, 'MAX_RETRIES': 1, 'POOL_SIZE': 2})
+    def test_server_error_retried_with_same_idempotency_key(self):
+        """Une erreur 5xx est rejouee; la cle d'idempotence evite un doublon"""
+        self.server.fail_next = 1
+        intent = stripe_client.create_payment_intent(2000, 'eur', {'order_id': 1}, 'order-1-intent-2000')
+        again = stripe_client.create_payment_intent(2000, 'eur', {'order_id': 1}, 'order-1-intent-2000')
+
+        self.assertEqual(intent.id, again.id)
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(len(self.server.intents), 1)
+
+    def test_confirm_emits_signed_webhook(self):
+        """La confirmation envoie un webhook signe, verifiable par la librairie Stripe"""
+        received = []
+
+        class Receiver(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                received.append((body, self.headers['Stripe-Signature']))
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        receiver = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+        threading.Thread(target=receiver.serve_forever, daemon=True).start()
+        self.server.webhook_url = f'http://127.0.0.1:{receiver.server_address[1]}/'
+        self.server.webhook_secret = 'whsec_test'
+        try:
+            intent = self.server.create_intent({'amount': '500'})
+            self.server.confirm_intent(intent['id'])
+            for _ in range(100):
+                if received:
+                    break
+                time.sleep(0.02)
+        finally:
+            self.server.webhook_url = None
+            receiver.shutdown()
+            receiver.server_close()
+
+        body, signature = received[0]
+        event = stripe.Webhook.construct_event(body, signature, 'whsec_test')
+        self.assertEqual(event['type'], 'payment_intent.succeeded')
+        self.assertEqual(event['data']['object']['id'], intent['id'])
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class StripeWebhookTests(TestCase):
+    """Tests du webhook Stripe et de l'application par lots"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+        self.orders = [
+            Order.objects.create(user=self.user, total='20.00', status='pending', payment_intent_id=f'pi_{i}')
+            for i in range(3)
+        ]
+
+    def _send(self, event_id, intent_id, event_type='payment_intent.succeeded', secret='whsec_test'):
+        payload = json.dumps({
+            "id": event_id, "object": "event", "type": event_type,
+            "data": {"object": {"id": intent_id, "object": "payment_intent", "metadata": {}}},
+        })
+        return self.client.post(
+            '/payment/webhook/', payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign(payload, secret)
+        )
+
+    def test_events_deduplicated_and_applied_in_batch(self):
+        """Les evenements sont enregistres une fois et appliques par le worker"""
+        for i in range(2):
+            self.assertEqual(self._send(f'evt_{i}', f'pi_{i}').status_code, status.HTTP_200_OK)
+        self.assertEqual(self._send('evt_0', 'pi_0').status_code, status.HTTP_200_OK)
+        self._send('evt_failed', 'pi_2', event_type='payment_intent.payment_failed')
+
+        self.assertEqual(StripeEvent.objects.count(), 3)
+        self.assertEqual(Job.objects.filter(name='payments.apply_stripe_events').count(), 1)
+        self.assertEqual(Order.objects.filter(status='pending').count(), 3)
+
+        Job.objects.update(run_after=timezone.now())
+        call_command('run_jobs', once=True, concurrency=1, poll=0.01, stdout=StringIO())
+
+        statuses = dict(Order.objects.values_list('payment_intent_id', 'status'))
+        self.assertEqual(statuses, {'pi_0': 'confirmed', 'pi_1': 'confirmed', 'pi_2': 'pending'})
+        self.assertFalse(StripeEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_invalid_signature_rejected(self):
+        """Une signature invalide est refusee sans rien enregistrer"""
+        response = self._send('evt_x', 'pi_0', secret='whsec_other')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+
+
+ASYNC_SETTINGS = {'ENABLED': True, 'WORKERS': 2, 'MAX_PENDING': 4, 'MAX_WAIT_SECONDS': 5, 'STALE_SECONDS': 120}
+
+
+@override_settings(PAYMENT_INTENT_ASYNC=ASYNC_SETTINGS, STRIPE_SECRET_KEY='sk_test_local')
+class AsyncPaymentIntentTests(TransactionTestCase):
+    """Tests du mode asynchrone (pool de threads, donnees commitees)"""
+
+    def setUp(self):
+        cache.clear()
+        stripe_client.reset()
+        self.server = StripeStandin(('127.0.0.1', 0), latency_ms=50).start()
+        self.settings = override_settings(STRIPE_API_BASE=self.server.url)
+        self.settings.enable()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+        self.order = Order.objects.create(user=self.user, total='20.00', status='pending')
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.server.stop()
+        stripe_client.reset()
+
+    def test_accepted_then_long_polled(self):
+        """202 immediat, puis le client_secret est obtenu par long polling"""
+        response = self.client.post('/payment/intent/', {'order_id': self.order.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+
+        response = self.client.get(response.data['poll'], {'wait': 5})
+        self.assertEqual(response.data['status'], 'succeeded')
+        intent = next(iter(self.server.intents.values()))
+        self.assertEqual(response.data['client_secret'], intent['client_secret'])
+
+        # Rechargement: l'intent enregistre est renvoye directement
+        response = self.client.post('/payment/intent/', {'order_id': self.order.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['client_secret'], intent['client_secret'])
+
+    def test_stale_request_reported_failed(self):
+        """Une demande jamais traitee (processus arrete) finit en echec"""
+        intent_request = PaymentIntentRequest.objects.create(order=self.order, user=self.user)
+        PaymentIntentRequest.objects.filter(id=intent_request.id).update(
+            created_at=timezone.now() - timedelta(minutes=10)
+        )
+        response = self.client.get(f'/payment/intent/{intent_request.id}/')
+        self.assertEqual(response.data, {
+            'request_id': str(intent_request.id), 'status': 'failed', 'error': 'Demande expiree'
+        })
+
+        other = User.objects.create_user(username='other', email='other@test.com', password='userpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/payment/intent/{intent_request.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ReconcilePaymentsTests(TestCase):
+    """Tests du rapprochement des intents avec les commandes"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StripeStandin(('127.0.0.1', 0)).start()
+        cls.settings = override_settings(STRIPE_SECRET_KEY='sk_test_local', STRIPE_API_BASE=cls.server.url)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.stop()
+        stripe_client.reset()
+        super().tearDownClass()
+
+    def setUp(self):
+        stripe_client.reset()
+        self.server.reset()
+        self.user = User.objects.create_user(username='user', email='user@test.com', password='userpass123')
+
+    def _paid(self, order, amount=2000):
+        intent = self.server.create_intent({'amount': str(amount), 'metadata': {'order_id': str(order.id)}})
+        self.server.confirm_intent(intent['id'])
+        Order.objects.filter(id=order.id).update(payment_intent_id=intent['id'], payment_amount=amount)
+        return intent
+
+    def _run(self, **options):
+        out = StringIO()
+        call_command('reconcile_payments', fmt='ndjson', stdout=out, stderr=StringIO(), **options)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_report_lists_mismatches(self):
+        """Chaque type d'ecart est detecte; les commandes correctes n'apparaissent pas"""
+        pending = Order.objects.create(user=self.user, total='20.00', status='pending')
+        confirmed = Order.objects.create(user=self.user, total='20.00', status='confirmed')
+        wrong_amount = Order.objects.create(user=self.user, total='20.00', status='confirmed')
+        self._paid(pending)
+        self._paid(confirmed)
+        self._paid(wrong_amount, amount=999)
+        orphan = self.server.create_intent({'amount': '500', 'metadata': {'order_id': '999999'}})
+        self.server.confirm_intent(orphan['id'])
+
+        rows = {row['kind']: row for row in self._run()}
+        self.assertEqual(set(rows), {'paid_order_not_confirmed', 'amount_mismatch', 'order_missing'})
+        self.assertEqual(rows['paid_order_not_confirmed']['order_id'], pending.id)
+        self.assertEqual(rows['amount_mismatch']['order_amount'], 2000)
+        self.assertEqual(rows['order_missing']['intent_id'], orphan['id'])
+
+    def test_archived_order_keeps_payment_fields(self):
+        """L'intent d'une commande archivee reste rapproche, y compris un intent remplace paye"""
+        order = Order.objects.create(user=self.user, total='20.00', status='delivered')
+        superseded = self.server.create_intent({'amount': '2000', 'metadata': {'order_id': str(order.id)}})
+        self.server.confirm_intent(superseded['id'])
+        current = self._paid(order)
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - timedelta(days=200))
+        call_command('archive_orders', older_than_days=180, stdout=StringIO())
+
+        archived = ArchivedOrder.objects.get(id=order.id)
+        self.assertEqual((archived.payment_intent_id, archived.payment_amount), (current['id'], 2000))
+        rows = self._run()
+        self.assertEqual([(row['kind'], row['intent_id']) for row in rows], [('intent_superseded', superseded['id'])])
+
+    def test_incremental_run_uses_stored_cursor(self):
+        """Une execution suivante ne relit que les intents recents"""
+        old = Order.objects.create(user=self.user, total='20.00', status='pending')
+        self.server.intents[self._paid(old)['id']]['created'] -= 3600
+        self.assertEqual(len(self._run()), 1)
+        self.assertTrue(ReconciliationCursor.objects.get(name='default').last_created > 0)
+
+        recent = Order.objects.create(user=self.user, total='20.00', status='pending')
+        self._paid(recent)
+        ReconciliationCursor.objects.filter(name='default').update(last_created=int(time.time()) - 60)
+        rows = self._run(lookback_hours=0)
+        self.assertEqual([row['order_id'] for row in rows], [recent.id])
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import CreatePaymentIntent
+from .views import CreatePaymentIntent, PaymentIntentStatus, StripeWebhook
 
 urlpatterns = [
     path('intent/', CreatePaymentIntent.as_view(), name='payment_intent'),
+    path('intent/<uuid:request_id>/', PaymentIntentStatus.as_view(), name='payment_intent_status'),
+    path('webhook/', StripeWebhook.as_view(), name='stripe_webhook'),
 ]
@@ -2,9 +2,12 @@ import stripe
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.urls import reverse
 from rest_framework import permissions, status
 from rest_framework.throttling import UserRateThrottle
 from backend_py.orders.models import Order
+from . import intents, webhooks
+from .models import PaymentIntentRequest
 
 
 class PaymentThrottle(UserRateThrottle):
@@ -13,7 +16,7 @@ class PaymentThrottle(UserRateThrottle):
 
 
 class CreatePaymentIntent(APIView):
-    """Vue pour creer un PaymentIntent Stripe"""
+    """Vue pour creer (ou reutiliser) le PaymentIntent Stripe d'une commande"""
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [PaymentThrottle]
 
@@ -24,8 +27,6 @@ class CreatePaymentIntent(APIView):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        
         order_id = request.data.get('order_id')
         
         if not order_id:
@@ -48,7 +49,7 @@ class CreatePaymentIntent(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        amount = int(float(order.total) * 100)
+        amount = intents.amount_for(order)
         
         if amount <= 0:
             return Response(
@@ -56,22 +57,115 @@ class CreatePaymentIntent(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Rechargement du checkout: l'intent enregistre est reutilise sans appel Stripe
+        if intents.reusable(order, amount):
+            return Response(_intent_data(order))
+        
+        if intents.async_enabled():
+            return self._submit(order, request.user)
+        
         try:
-            intent = stripe.PaymentIntent.create(
-                amount=amount,
-                currency="eur",
-                metadata={
-                    'order_id': order.id,
-                    'user_id': request.user.id
-                }
-            )
-            return Response({
-                "client_secret": intent.client_secret,
-                "order_id": order.id,
-                "amount": float(order.total)
-            })
+            intents.ensure_intent(order, request.user.id)
         except stripe.error.StripeError:
             return Response(
                 {"error": "Erreur de paiement"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        return Response(_intent_data(order))
+
+    def _submit(self, order, user):
+        """Mode asynchrone: l'appel Stripe part dans le pool, le client interroge le statut"""
+        intent_request = PaymentIntentRequest.objects.create(order=order, user=user)
+        if not intents.submit(intent_request.id):
+            intent_request.delete()
+            response = Response(
+                {"error": "Service de paiement surcharge, reessayez"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '2'
+            return response
+        return Response(
+            {
+                "request_id": str(intent_request.id),
+                "status": intent_request.status,
+                "poll": reverse('payment_intent_status', args=[intent_request.id]),
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class PaymentIntentStatus(APIView):
+    """
+    Statut d'une demande de PaymentIntent asynchrone.
+    `?wait=N` (secondes, plafonne) attend la fin du traitement (long polling).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, request_id):
+        try:
+            intent_request = PaymentIntentRequest.objects.select_related('order').get(
+                id=request_id, user=request.user
+            )
+        except PaymentIntentRequest.DoesNotExist:
+            return Response(
+                {"error": "Demande introuvable"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return Response(
+                {"error": "wait invalide"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        wait = max(0.0, min(wait, settings.PAYMENT_INTENT_ASYNC["MAX_WAIT_SECONDS"]))
+        intent_request = intents.wait(intent_request, wait)
+        
+        data = {"request_id": str(intent_request.id), "status": intent_request.status}
+        if intent_request.status == PaymentIntentRequest.SUCCEEDED:
+            intent_request.order.refresh_from_db()
+            data.update(_intent_data(intent_request.order))
+        elif intent_request.status == PaymentIntentRequest.FAILED:
+            data["error"] = intent_request.error
+        return Response(data)
+
+
+def _intent_data(order):
+    return {
+        "client_secret": order.payment_client_secret,
+        "order_id": order.id,
+        "amount": float(order.total)
+    }
+
+
+class StripeWebhook(APIView):
+    """
+    Reception des webhooks Stripe: signature verifiee, evenement enregistre,
+    reponse immediate. Les commandes sont mises a jour par le worker de taches.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def post(self, request):
+        if not getattr(settings, 'STRIPE_WEBHOOK_SECRET', None):
+            return Response(
+                {"error": "Webhook non configure"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body,
+                request.META.get('HTTP_STRIPE_SIGNATURE', ''),
+                settings.STRIPE_WEBHOOK_SECRET
+            )
+        except (ValueError, stripe.SignatureVerificationError):
+            return Response(
+                {"error": "Signature invalide"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        webhooks.record(event.to_dict())
+        return Response({"received": True})
@@ -0,0 +1,77 @@
+"""
+Traitement des webhooks Stripe.
+
+La vue verifie la signature, enregistre l'evenement (dedoublonne par id)
+et planifie `apply_stripe_events`; les statuts de commande sont ensuite
+mis a jour par lots dans un worker (`run_jobs`), pas dans la requete.
+"""
+from django.db import transaction
+from django.utils import timezone
+from backend_py.orders.models import Order
+from backend_py.orders.transitions import bulk_transition
+from .models import StripeEvent
+
+# Evenements qui confirment le paiement d'une commande
+SUCCEEDED = 'payment_intent.succeeded'
+# Delai de regroupement des evenements d'une rafale dans un meme lot
+APPLY_COUNTDOWN = 1
+
+
+def record(event):
+    """Enregistre l'evenement et planifie son traitement (un evenement deja recu est ignore)"""
+    from .jobs import apply_stripe_events
+
+    with transaction.atomic():
+        StripeEvent.objects.bulk_create([
+            StripeEvent(event_id=event['id'], event_type=event['type'], payload=event)
+        ], ignore_conflicts=True)
+        # Une seule tache en attente pour toute une rafale d'evenements
+        apply_stripe_events.delay(dedup_key=apply_stripe_events.job_name, countdown=APPLY_COUNTDOWN)
+
+
+def _orders_for(intents):
+    """Ids des commandes correspondant aux PaymentIntents (id enregistre ou metadata.order_id)"""
+    intent_ids = [intent.get('id') for intent in intents if intent.get('id')]
+    order_ids = set(Order.objects.filter(payment_intent_id__in=intent_ids).values_list('id', flat=True))
+    for intent in intents:
+        order_id = str((intent.get('metadata') or {}).get('order_id', ''))
+        if order_id.isdigit():
+            order_ids.add(int(order_id))
+    return sorted(order_ids)
+
+
+def apply_batch(batch_size=500):
+    """
+    Applique un lot d'evenements non traites; retourne le nombre d'evenements.
+    Les lignes sont verrouillees (SKIP LOCKED): plusieurs workers se partagent les lots.
+    """
+    with transaction.atomic():
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        succeeded = [
+            event.payload.get('data', {}).get('object', {})
+            for event in events if event.event_type == SUCCEEDED
+        ]
+        order_ids = _orders_for(succeeded)
+        if order_ids:
+            # pending -> confirmed; les commandes deja confirmees ou annulees restent telles quelles
+            bulk_transition(Order.objects.filter(id__in=order_ids, status='pending'), 'confirmed')
+
+        StripeEvent.objects.filter(id__in=[event.id for event in events]).update(processed_at=timezone.now())
+    return len(events)
+
+
+def apply_pending(batch_size=500):
+    """Applique les evenements en attente jusqu'a epuisement"""
+    total = 0
+    while True:
+        count = apply_batch(batch_size)
+        total += count
+        if count < batch_size:
+            return total
@@ -0,0 +1,161 @@
+"""
+Gestion du stock, y compris le mode `slotted` pour les produits tres demandes.
+
+En mode `row` (defaut), le stock est porte par Product.stock et la commande
+verrouille la ligne produit. En mode `slotted`, le stock est reparti sur N
+lignes StockSlot: chaque commande decremente un compteur tire au hasard par
+un UPDATE conditionnel (quantity >= n), ce qui garantit l'absence de
+survente sans serialiser toutes les commandes sur une seule ligne.
+Product.stock devient alors une valeur d'affichage, resynchronisee par
+`rebalance_stock_slots`.
+
+En mode slotted, les unites reservees au checkout (cart.reservations)
+sont retirees des compteurs a la reservation et y sont rendues a sa
+liberation: Product.stock compte compteurs et unites mises de cote.
+"""
+import random
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from backend_py.cart.models import StockReservation
+from .models import Product, StockSlot
+
+DEFAULT_SLOTS = 8
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        super().__init__(f"Stock insuffisant (disponible: {available})")
+        self.available = available
+
+
+def _spread(total, slots):
+    """Repartit `total` aussi uniformement que possible sur `slots` compteurs"""
+    base, extra = divmod(total, slots)
+    return [base + (1 if i < extra else 0) for i in range(slots)]
+
+
+def slotted_stock(product_id):
+    """Stock reel d'un produit en mode slotted"""
+    return StockSlot.objects.filter(product_id=product_id).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def set_aside(product_id):
+    """Unites mises de cote par les reservations d'un produit slotted (verrouillees)"""
+    holds = StockReservation.objects.select_for_update().filter(product_id=product_id)
+    return sum(holds.values_list('quantity', flat=True))
+
+
+def available_stock(product):
+    if product.inventory_mode == Product.INVENTORY_SLOTTED:
+        return slotted_stock(product.id)
+    return product.stock
+
+
+@transaction.atomic
+def enable_slotted(product_id, slots=DEFAULT_SLOTS):
+    """Passe un produit en mode slotted en repartissant son stock"""
+    product = Product.objects.select_for_update().get(pk=product_id)
+    if product.inventory_mode == Product.INVENTORY_SLOTTED:
+        return rebalance(product_id, slots)
+    # Les reservations actives sont mises de cote; les expirees ne retiennent rien
+    StockReservation.objects.filter(product_id=product_id, expires_at__lte=timezone.now()).delete()
+    held = set_aside(product_id)
+    StockSlot.objects.bulk_create([
+        StockSlot(product=product, slot=i, quantity=quantity)
+        for i, quantity in enumerate(_spread(max(product.stock - held, 0), slots))
+    ])
+    Product.objects.filter(pk=product_id).update(inventory_mode=Product.INVENTORY_SLOTTED)
+    return product.stock
+
+
+@transaction.atomic
+def disable_slotted(product_id):
+    """
+    Revient au mode row: le stock des compteurs et les unites mises de cote
+    sont rapatries sur le produit (les reservations y restent deduites).
+    """
+    product = Product.objects.select_for_update().get(pk=product_id)
+    held = set_aside(product_id)
+    slots = list(StockSlot.objects.select_for_update().filter(product_id=product_id))
+    total = sum(slot.quantity for slot in slots) + held if slots else product.stock
+    StockSlot.objects.filter(product_id=product_id).delete()
+    Product.objects.filter(pk=product_id).update(stock=total, inventory_mode=Product.INVENTORY_ROW)
+    return total
+
+
+@transaction.atomic
+def rebalance(product_id, slots=None, total=None):
+    """
+    Compactage: reequilibre les compteurs et resynchronise Product.stock.
+    `total` permet de fixer un nouveau stock (mise a jour admin), unites
+    mises de cote par les reservations comprises.
+    """
+    held = set_aside(product_id)
+    current = list(StockSlot.objects.select_for_update().filter(product_id=product_id).order_by('slot'))
+    if total is None:
+        total = sum(slot.quantity for slot in current) + held
+    slots = slots or len(current) or DEFAULT_SLOTS
+    StockSlot.objects.filter(product_id=product_id).delete()
+    StockSlot.objects.bulk_create([
+        StockSlot(product_id=product_id, slot=i, quantity=quantity)
+        for i, quantity in enumerate(_spread(max(total - held, 0), slots))
+    ])
+    Product.objects.filter(pk=product_id).update(stock=total)
+    return total
+
+
+def decrement_slotted(product_id, quantity):
+    """
+    Retire `quantity` unites des compteurs d'un produit (dans la transaction
+    de l'appelant). Leve InsufficientStock si le stock total ne suffit pas.
+    """
+    candidates = list(
+        StockSlot.objects.filter(product_id=product_id, quantity__gte=quantity).values_list('slot', flat=True)
+    )
+    random.shuffle(candidates)
+    for slot in candidates:
+        # UPDATE conditionnel: jamais de survente, meme sans verrou prealable
+        if StockSlot.objects.filter(
+            product_id=product_id, slot=slot, quantity__gte=quantity
+        ).update(quantity=F('quantity') - quantity):
+            return
+
+    # Aucun compteur ne suffit seul: verrouiller tous les compteurs et les vider dans l'ordre
+    slots = list(StockSlot.objects.select_for_update().filter(product_id=product_id).order_by('slot'))
+    available = sum(slot.quantity for slot in slots)
+    if available < quantity:
+        raise InsufficientStock(available)
+    remaining = quantity
+    for slot in slots:
+        take = min(slot.quantity, remaining)
+        if take:
+            StockSlot.objects.filter(pk=slot.pk).update(quantity=F('quantity') - take)
+            remaining -= take
+        if not remaining:
+            break
+
+
+def restock_slotted(product_id, quantity):
+    """
+    Rend `quantity` unites a un compteur tire au hasard (reservation liberee).
+    Sans compteur (produit repasse en mode row), les unites ont deja ete
+    rapatriees par `disable_slotted`.
+    """
+    slots = list(StockSlot.objects.filter(product_id=product_id).values_list('slot', flat=True))
+    if slots:
+        StockSlot.objects.filter(product_id=product_id, slot=random.choice(slots)).update(
+            quantity=F('quantity') + quantity
+        )
+
+
+def decrement(product, quantity):
+    """
+    Retire `quantity` unites du stock d'un produit, quel que soit son mode,
+    sans verrou prealable. Leve InsufficientStock.
+    """
+    if product.inventory_mode == Product.INVENTORY_SLOTTED:
+        decrement_slotted(product.id, quantity)
+        return
+    if not Product.objects.filter(pk=product.pk, stock__gte=quantity).update(stock=F('stock') - quantity):
+        raise InsufficientStock(Product.objects.filter(pk=product.pk).values_list('stock', flat=True).first() or 0)
@@ -0,0 +1,110 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework import serializers
+from backend_py.orders import checkout, rollups
+from backend_py.orders.models import Order
+from backend_py.products.models import Product
+from backend_py.products import inventory
+from backend_py.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent du checkout complet (lock_products, place_order, save_stock) "
+        "sur un produit en mode row puis slotted. Necessite PostgreSQL; a lancer sur une base "
+        "dediee (les commandes creees publient des evenements outbox)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--stock", type=int, default=2000, help="Stock initial du produit")
+        parser.add_argument("--oversell", type=int, default=200, help="Commandes en plus du stock")
+        parser.add_argument("--slots", type=int, default=16)
+        parser.add_argument(
+            "--hold-ms",
+            type=float,
+            default=5.0,
+            help="Latence simulee dans la transaction apres la commande (aller-retours applicatifs)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("SQLite serialise toutes les ecritures: lancer ce benchmark sous PostgreSQL")
+
+        results = {}
+        for mode in (Product.INVENTORY_ROW, Product.INVENTORY_SLOTTED):
+            # Un acheteur par thread: les statistiques client ne sont pas un point chaud du SKU
+            users = [
+                User.objects.create_user(username=f"bench-{mode}-{i}-{time.time_ns()}", password=None)
+                for i in range(options["threads"])
+            ]
+            product = Product.objects.create(
+                title=f"bench-{mode}", description="benchmark", price="1.00", stock=options["stock"]
+            )
+            try:
+                if mode == Product.INVENTORY_SLOTTED:
+                    inventory.enable_slotted(product.id, options["slots"])
+                results[mode] = self._run(users, product, mode, options)
+            finally:
+                self._cleanup(users, product)
+
+        for mode, (rate, sold, elapsed) in results.items():
+            self.stdout.write(f"  {mode:8s} {rate:10.1f} commandes/s  ({sold} vendues en {elapsed:.2f}s)")
+        speedup = results[Product.INVENTORY_SLOTTED][0] / results[Product.INVENTORY_ROW][0]
+        self.stdout.write(self.style.SUCCESS(f"✅ slotted / row: x{speedup:.2f}"))
+
+    def _cleanup(self, users, product):
+        """Retire les commandes du benchmark des agregats puis les supprime"""
+        orders = Order.objects.filter(user__in=users)
+        with transaction.atomic():
+            rollups.apply_status_change(orders, "pending", rollups.CANCELLED)
+            orders.delete()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+        product.delete()
+
+    def _run(self, users, product, mode, options):
+        hold = options["hold_ms"] / 1000
+        attempts = iter(range(options["stock"] + options["oversell"]))
+        items = [{"product_id": product.pk, "quantity": 1}]
+        sold = 0
+        lock = threading.Lock()
+
+        def place(user):
+            # Meme parcours que OrderCreateSerializer.create: stock, commande,
+            # agregats de ventes, statistiques client et outbox dans la transaction
+            with transaction.atomic():
+                products = checkout.lock_products([product.pk])
+                _, touched = checkout.place_order(user, items, products)
+                checkout.save_stock(touched)
+                time.sleep(hold)
+
+        def worker(user):
+            nonlocal sold
+            try:
+                while True:
+                    with lock:
+                        if next(attempts, None) is None:
+                            return
+                    try:
+                        place(user)
+                    except serializers.ValidationError:
+                        continue
+                    with lock:
+                        sold += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        remaining = inventory.available_stock(Product.objects.get(pk=product.pk))
+        if sold != options["stock"] or remaining != 0:
+            raise CommandError(f"{mode}: {sold} vendues pour un stock de {options['stock']} (reste {remaining})")
+        return sold / elapsed, sold, elapsed
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from backend_py.products.models import Product
+from backend_py.products import inventory
+
+
+class Command(BaseCommand):
+    help = "Reequilibre les compteurs des produits en mode slotted et resynchronise Product.stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", type=int, help="Limiter a un produit")
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(inventory_mode=Product.INVENTORY_SLOTTED)
+        if options["product"]:
+            products = products.filter(pk=options["product"])
+
+        count = 0
+        for product_id in products.values_list("id", flat=True):
+            total = inventory.rebalance(product_id)
+            self.stdout.write(f"  Produit {product_id}: {total} unites")
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} produits reequilibres"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend_py.products.models import Product
+from backend_py.products import inventory
+
+
+class Command(BaseCommand):
+    help = "Change le mode de stock d'un produit (row ou slotted pour les produits tres demandes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("product_id", type=int)
+        parser.add_argument("mode", choices=[Product.INVENTORY_ROW, Product.INVENTORY_SLOTTED])
+        parser.add_argument(
+            "--slots",
+            type=int,
+            default=inventory.DEFAULT_SLOTS,
+            help="Nombre de compteurs en mode slotted",
+        )
+
+    def handle(self, *args, **options):
+        if not Product.objects.filter(pk=options["product_id"]).exists():
+            raise CommandError(f"Produit {options['product_id']} introuvable")
+        if options["slots"] < 1:
+            raise CommandError("--slots doit etre positif")
+
+        if options["mode"] == Product.INVENTORY_SLOTTED:
+            total = inventory.enable_slotted(options["product_id"], options["slots"])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Produit {options['product_id']}: {total} unites reparties sur {options['slots']} compteurs"
+            ))
+        else:
+            total = inventory.disable_slotted(options["product_id"])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Produit {options['product_id']}: stock de {total} unites rapatrie sur la ligne produit"
+            ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='inventory_mode',
+            field=models.CharField(choices=[('row', 'Stock sur la ligne produit'), ('slotted', 'Stock reparti sur des compteurs (produits tres demandes)')], default='row', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='StockSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_slots', to='products.product')),
+            ],
+            options={
+                'unique_together': {('product', 'slot')},
+            },
+        ),
+    ]
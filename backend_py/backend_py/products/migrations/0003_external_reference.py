@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_inventory_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='external_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='external_source',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(condition=models.Q(('external_id', ''), _negated=True), fields=('external_source', 'external_id'), name='products_external_ref_uniq'),
+        ),
+    ]
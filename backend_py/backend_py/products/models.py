@@ -1,13 +1,47 @@
 from django.db import models
 
 class Product(models.Model):
+    INVENTORY_ROW = "row"
+    INVENTORY_SLOTTED = "slotted"
+    INVENTORY_MODES = [
+        (INVENTORY_ROW, "Stock sur la ligne produit"),
+        (INVENTORY_SLOTTED, "Stock reparti sur des compteurs (produits tres demandes)"),
+    ]
+
     title = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.URLField(blank=True)
     stock = models.PositiveIntegerField(default=0)
+    inventory_mode = models.CharField(max_length=10, choices=INVENTORY_MODES, default=INVENTORY_ROW)
+    # Produits importes d'un catalogue externe (external/catalog.py); vides sinon
+    external_source = models.CharField(max_length=32, blank=True, default="")
+    external_id = models.CharField(max_length=64, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["external_source", "external_id"],
+                condition=~models.Q(external_id=""),
+                name="products_external_ref_uniq",
+            ),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class StockSlot(models.Model):
+    """
+    Fraction du stock d'un produit en mode `slotted`: les commandes
+    concurrentes decrementent des lignes differentes au lieu de toutes
+    verrouiller la ligne Product.
+    """
+    product = models.ForeignKey(Product, related_name="stock_slots", on_delete=models.CASCADE)
+    slot = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "slot")
@@ -1,7 +1,16 @@
 from rest_framework import serializers
 from .models import Product
+from . import inventory
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ["id", "title", "description", "price", "image", "stock", "created_at", "updated_at"]
+        fields = ["id", "title", "description", "price", "image", "stock", "inventory_mode", "created_at", "updated_at"]
+        read_only_fields = ["inventory_mode"]
+
+    def update(self, instance, validated_data):
+        product = super().update(instance, validated_data)
+        # En mode slotted, le stock fixe par l'admin est reparti sur les compteurs
+        if product.inventory_mode == Product.INVENTORY_SLOTTED and 'stock' in validated_data:
+            inventory.rebalance(product.id, total=validated_data['stock'])
+        return product
@@ -1,8 +1,10 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Product
+from .models import Product, StockSlot
+from . import inventory
 from backend_py.users.models import User
 
 
@@ -129,3 +131,70 @@ class ProductsApiTests(TestCase):
         }
         res = self.client.post(url, data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlottedInventoryTests(TestCase):
+    """Tests pour le mode de stock reparti (produits tres demandes)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@test.com',
+            password='userpass123'
+        )
+        self.product = Product.objects.create(
+            title="Produit Populaire",
+            description="Vente flash",
+            price="10.00",
+            stock=10
+        )
+        inventory.enable_slotted(self.product.id, slots=4)
+
+    def _order(self, quantity):
+        self.client.force_authenticate(user=self.user)
+        return self.client.post(
+            reverse('order-list'),
+            {'items': [{'product_id': self.product.id, 'quantity': quantity}]},
+            format='json'
+        )
+
+    def test_enable_spreads_stock(self):
+        """Le stock est reparti sur les compteurs"""
+        quantities = list(StockSlot.objects.filter(product=self.product).order_by('slot').values_list('quantity', flat=True))
+        self.assertEqual(quantities, [3, 3, 2, 2])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.inventory_mode, Product.INVENTORY_SLOTTED)
+
+    def test_order_decrements_slots(self):
+        """Une commande decremente les compteurs, y compris sur plusieurs compteurs"""
+        self.assertEqual(self._order(2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._order(7).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(inventory.slotted_stock(self.product.id), 1)
+
+    def test_no_oversell(self):
+        """Une commande superieure au stock restant est refusee sans rien decrementer"""
+        self.assertEqual(self._order(8).status_code, status.HTTP_201_CREATED)
+        response = self._order(3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(inventory.slotted_stock(self.product.id), 2)
+
+    def test_rebalance_syncs_display_stock(self):
+        """Le compactage reequilibre les compteurs et resynchronise Product.stock"""
+        self._order(5)
+        inventory.rebalance(self.product.id)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertEqual(
+            sorted(StockSlot.objects.filter(product=self.product).values_list('quantity', flat=True)),
+            [1, 1, 1, 2]
+        )
+
+    def test_disable_restores_row_mode(self):
+        """Le retour au mode row rapatrie le stock sur la ligne produit"""
+        self._order(4)
+        inventory.disable_slotted(self.product.id)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+        self.assertFalse(StockSlot.objects.filter(product=self.product).exists())
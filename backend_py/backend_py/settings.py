@@ -36,6 +36,8 @@ INSTALLED_APPS = [
     "backend_py.external",
     "backend_py.reviews",
     "backend_py.graphql_api",
+    "backend_py.outbox",
+    "backend_py.jobs",
 ]
 
 MIDDLEWARE = [
@@ -170,8 +172,103 @@ LOGGING = {
     },
 }
 
+# Nombre de lignes (shards) par agregat de ventes: les commandes concurrentes
+# incrementent des lignes differentes (voir orders/rollups.py)
+SALES_ROLLUP_SHARDS = env.int("SALES_ROLLUP_SHARDS", default=8)
+
+# Commit de groupe des commandes (pics de trafic): les POST /orders/ d'un
+# processus sont regroupes en une transaction. Utile avec gunicorn gthread ou ASGI.
+ORDER_GROUP_COMMIT = {
+    "ENABLED": env.bool("ORDER_GROUP_COMMIT", default=False),
+    "MAX_BATCH": env.int("ORDER_GROUP_COMMIT_MAX_BATCH", default=32),
+    "MAX_WAIT_MS": env.int("ORDER_GROUP_COMMIT_MAX_WAIT_MS", default=5),
+    "RESULT_TIMEOUT": 10,
+}
+
+# Cache partage entre workers (verrous single-flight des API externes...).
+# LocMemCache par defaut (un processus); ex. redis://redis:6379/1 ou
+# dbcache://django_cache (apres `python manage.py createcachetable`).
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# API externes: une session poolee par service (external/clients.py).
+# Les GET identiques en cours sont coalesces; COALESCE (optionnel) regle
+# LOCK_TIMEOUT / WAIT_TIMEOUT / RESULT_TTL en secondes. Disjoncteur par service,
+# BREAKER (optionnel): WINDOW (s), MIN_CALLS, FAILURE_RATE, OPEN_SECONDS
+# (defauts 30 / 5 / 0.5 / 30, voir external/breaker.py).
+EXTERNAL_HTTP = {
+    "fakestore": {
+        "BASE_URL": env("FAKESTORE_BASE_URL", default="https://fakestoreapi.com"),
+        "CONNECT_TIMEOUT": 3.0,
+        "READ_TIMEOUT": 5.0,
+        "POOL_SIZE": 10,
+        "RETRIES": 2,
+    },
+    "frankfurter": {
+        "BASE_URL": env("FRANKFURTER_BASE_URL", default="https://api.frankfurter.app"),
+        "CONNECT_TIMEOUT": 3.0,
+        "READ_TIMEOUT": 5.0,
+        "POOL_SIZE": 10,
+        "RETRIES": 2,
+    },
+    "nominatim": {
+        "BASE_URL": env("NOMINATIM_BASE_URL", default="https://nominatim.openstreetmap.org"),
+        "CONNECT_TIMEOUT": 3.0,
+        "READ_TIMEOUT": 8.0,
+        "POOL_SIZE": 4,
+        "RETRIES": 1,
+        # Politique d'usage Nominatim: User-Agent identifiant l'application
+        "HEADERS": {"User-Agent": "E-Commerce-API/1.0 (Educational Project)"},
+    },
+}
+
+# Taux de change: table EUR enregistree par `python manage.py refresh_rates`,
+# taux croises calcules localement; les workers relisent le dernier
+# snapshot au plus tous les RELOAD_INTERVAL secondes.
+RATES_CACHE = {
+    "REFRESH_INTERVAL": env.int("RATES_REFRESH_INTERVAL", default=3600),
+    "RELOAD_INTERVAL": env.int("RATES_RELOAD_INTERVAL", default=60),
+}
+
+# Cache des recherches du localisateur de magasins (secondes, degres)
+GEOCODE_CACHE = {
+    "TTL": env.int("GEOCODE_CACHE_TTL", default=7 * 24 * 3600),
+    "NEGATIVE_TTL": env.int("GEOCODE_CACHE_NEGATIVE_TTL", default=3600),
+    "GRID": 0.05,
+    "MEMORY_SIZE": 1024,
+}
+
+# Reservations de stock prises au debut du checkout (secondes)
+STOCK_RESERVATION_TTL = env.int("STOCK_RESERVATION_TTL", default=600)
+
+# Outbox: destination par defaut du relais (ex: file:/var/log/events.ndjson)
+OUTBOX_SINK = env("OUTBOX_SINK", default=None)
+OUTBOX_SINKS = {
+    "file": "backend_py.outbox.sinks.FileSink",
+    "http": "backend_py.outbox.sinks.HttpSink",
+    "https": "backend_py.outbox.sinks.HttpSink",
+}
+
 STRIPE_SECRET_KEY = env("STRIPE_SECRET_KEY", default=None)
 STRIPE_WEBHOOK_SECRET = env("STRIPE_WEBHOOK_SECRET", default=None)
+# Serveur Stripe alternatif (ex: http://127.0.0.1:12111 pour un serveur local de test)
+STRIPE_API_BASE = env("STRIPE_API_BASE", default=None)
+STRIPE_CLIENT = {
+    "CONNECT_TIMEOUT": env.float("STRIPE_CONNECT_TIMEOUT", default=3.0),
+    "READ_TIMEOUT": env.float("STRIPE_READ_TIMEOUT", default=10.0),
+    "MAX_RETRIES": env.int("STRIPE_MAX_RETRIES", default=2),
+    "POOL_SIZE": 10,
+}
+# Mode asynchrone de POST /payment/intent/: reponse 202 immediate, appel Stripe
+# dans un pool borne, statut interroge sur GET /payment/intent/<id>/
+PAYMENT_INTENT_ASYNC = {
+    "ENABLED": env.bool("PAYMENT_INTENT_ASYNC", default=False),
+    "WORKERS": env.int("PAYMENT_INTENT_ASYNC_WORKERS", default=8),
+    "MAX_PENDING": env.int("PAYMENT_INTENT_ASYNC_MAX_PENDING", default=64),
+    # Plafond de ?wait= sur GET /payment/intent/<id>/: l'attente occupe le worker,
+    # ne l'augmenter qu'avec des workers gthread ou un serveur ASGI
+    "MAX_WAIT_SECONDS": env.float("PAYMENT_INTENT_ASYNC_MAX_WAIT_SECONDS", default=2),
+    "STALE_SECONDS": 120,
+}
 
 # ========================================
 # CONFIGURATION GRAPHQL SÉCURISÉE
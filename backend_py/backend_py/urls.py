@@ -1,11 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
-from backend_py.external.views import Health
+from backend_py.external.views import Health, Metrics
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', Health.as_view(), name='health'),
+    path('metrics/', Metrics.as_view(), name='metrics'),
     path('auth/', include('backend_py.users.urls')),
     path('products/', include('backend_py.products.urls')),
     path('cart/', include('backend_py.cart.urls')),
@@ -1,16 +1,29 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from backend_py.orders import customer_stats
 from .models import User
 import re
 
 
+class OrderStatsSerializer(serializers.Serializer):
+    """Statistiques de commandes du client (maintenues incrementalement)"""
+    order_count = serializers.IntegerField()
+    lifetime_spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    last_order_at = serializers.DateTimeField(allow_null=True)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer pour afficher les infos utilisateur"""
+    order_stats = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ["id", "email", "username"]
+        fields = ["id", "email", "username", "order_stats"]
         read_only_fields = ["id", "email", "username"]
 
+    def get_order_stats(self, obj):
+        return OrderStatsSerializer(customer_stats.for_user(obj)).data
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Serializer pour le login avec email"""